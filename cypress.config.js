@@ -2,7 +2,8 @@ const { defineConfig } = require('cypress')
 
 module.exports = defineConfig({
   e2e: {
-    baseUrl: 'https://looseitp.github.io/looseitpcursor.io',
+    // Local server by default; point SANDBOXPRO_BASE_URL at GitHub Pages to test the live site
+    baseUrl: process.env.SANDBOXPRO_BASE_URL || 'http://localhost:8000',
     viewportWidth: 1280,
     viewportHeight: 720,
     video: false,
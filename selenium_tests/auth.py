@@ -0,0 +1,45 @@
+"""Log in by seeding the session directly instead of going through login.html
+
+login.js waits 1.5 s for its simulated API call and another 2 s before
+redirecting, so driving the form costs ~3.5 s per test. The dashboard only
+looks at the `sandboxProUser` entry in localStorage/sessionStorage, so the
+fast path writes that entry itself and opens dashboard.html straight away.
+The real form is still covered by SandBoxProLoginTest.
+"""
+import json
+from datetime import datetime, timezone
+
+STORAGE_KEY = "sandboxProUser"
+
+
+def session_user(email, name, role):
+    """Build the same user record login.js stores after a successful login"""
+    login_time = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    return {"email": email, "name": name, "role": role, "loginTime": login_time}
+
+
+def storage_script(base_url, user, storage="local"):
+    """Page script that stores `user` as the logged-in user on the app's origin
+
+    `storage` is "local" (login with "remember me") or "session".
+    """
+    if storage not in ("local", "session"):
+        raise ValueError(f"storage must be 'local' or 'session', not {storage!r}")
+
+    origin = "/".join(base_url.split("/")[:3])
+    return (
+        f"if (location.origin === {json.dumps(origin)}) {{"
+        f" window.{storage}Storage.setItem({json.dumps(STORAGE_KEY)}, {json.dumps(json.dumps(user))}); }}"
+    )
+
+
+def seed_session(driver, base_url, user, storage="local"):
+    """Store `user` as the logged-in user and open the dashboard"""
+    source = storage_script(base_url, user, storage)
+
+    # Write the entry before dashboard.js runs so it never redirects to the login page
+    script = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+    try:
+        driver.get(f"{base_url}/dashboard.html")
+    finally:
+        driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script["identifier"]})
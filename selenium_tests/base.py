@@ -0,0 +1,135 @@
+"""Shared setup for the SandBox Pro Selenium test classes"""
+import unittest
+
+import auth
+import coverage_index
+import dom_batch
+import driver_pool
+import network_trace
+import perf_report
+import result_cache
+import static_server
+from cdp import DevToolsUnreachable
+from pages import DashboardPage, LoginPage
+from role_matrix import ROLES, RoleMatrix
+from tiers import TIER_BROWSER
+from virtual_clock import VirtualClock
+from waits import Waiter
+
+# Test credentials
+CREDENTIALS = {
+    'admin': {'email': 'admin@sandboxpro.com', 'password': 'admin123', 'name': 'Admin User'},
+    'user': {'email': 'user@sandboxpro.com', 'password': 'user123', 'name': 'John Doe'},
+    'demo': {'email': 'demo@sandboxpro.com', 'password': 'demo123', 'name': 'Demo User'},
+    'test': {'email': 'test@sandboxpro.com', 'password': 'test123', 'name': 'Test User'}
+}
+
+
+class SandBoxProTestCase(unittest.TestCase):
+    """Test case that borrows a warm browser from the driver pool"""
+
+    tier = TIER_BROWSER
+
+    # Run page timers on a fake clock that tests move with self.clock.advance(ms)
+    virtual_clock = False
+
+    # Files besides the loaded page assets whose change invalidates a cached pass
+    cache_inputs = ()
+
+    # Set by skipTest: a test skipped half way did not pass and is not cached
+    _skipped = False
+
+    @classmethod
+    def tearDownClass(cls):
+        """Release pooled browsers when the pool is class scoped"""
+        driver_pool.end_class()
+
+    def setUp(self):
+        """Set up the test environment before each test"""
+        # A test that passed with the same sources and page assets is not run again
+        if result_cache.is_cached_pass(self):
+            self.skipTest(result_cache.CACHED_PASS)
+
+        perf_report.recorder.begin_test(self.id())
+        with perf_report.recorder.span("driver_acquire"):
+            self.driver = driver_pool.acquire()
+        try:
+            # Time every WebDriver command for the performance report
+            perf_report.instrument(self.driver)
+            result_cache.start_capture(self.driver)
+            if coverage_index.ENABLED:
+                coverage_index.start(self.driver)
+            # Explicit event-driven waits only; an implicit wait would stall every negative check
+            self.driver.implicitly_wait(0)
+            self.wait = Waiter(self.driver, 10)
+
+            self.role_matrices = []
+            self.clock = None
+            if self.virtual_clock:
+                self.clock = VirtualClock(self.driver)
+                self.clock.install()
+
+            self.credentials = CREDENTIALS
+            # Base URL (embedded local server unless SANDBOXPRO_BASE_URL is set)
+            self.base_url = static_server.base_url()
+        except BaseException:
+            # tearDown does not run when setUp fails; a half set up browser is not handed out again
+            driver_pool.discard(self.driver)
+            perf_report.recorder.end_test()
+            raise
+        perf_report.recorder.set_phase("body")
+
+    def tearDown(self):
+        """Clean up after each test"""
+        perf_report.recorder.set_phase("tearDown")
+        if hasattr(self, 'driver'):
+            assets = None
+            try:
+                requested, scripts = set(), []
+                for matrix in self.role_matrices:
+                    matrix.close()
+                    requested |= matrix.requested
+                    scripts.extend(matrix.scripts)
+                if self.clock is not None:
+                    self.clock.uninstall()
+                messages = network_trace.performance_messages(self.driver)
+                assets = result_cache.loaded_assets(messages, self.base_url, requested)
+                if assets is not None:
+                    assets.update(self.cache_inputs)
+                network_trace.record(self.id(), messages)
+                if coverage_index.ENABLED:
+                    coverage_index.collect(self.id(), self.driver, self.base_url, scripts)
+            finally:
+                driver_pool.release(self.driver)
+            result_cache.record(self, self._outcome.success and not self._skipped, assets)
+        perf_report.recorder.end_test()
+
+    def skipTest(self, reason):
+        self._skipped = True
+        super().skipTest(reason)
+
+    def login_as(self, role, storage='local'):
+        """Open the dashboard already logged in as `role`, skipping the login form"""
+        credentials = self.credentials[role]
+        user = auth.session_user(credentials['email'], credentials['name'], role)
+        with perf_report.recorder.span("login_as"):
+            auth.seed_session(self.driver, self.base_url, user, storage)
+        return DashboardPage(self.driver, self.base_url, self.id())
+
+    def open_login_page(self):
+        """Open login.html as a page object"""
+        return LoginPage(self.driver, self.base_url, self.id()).open()
+
+    def open_role_matrix(self, roles=ROLES):
+        """Open one isolated browser context per role in this test's browser, closed in tearDown"""
+        try:
+            matrix = RoleMatrix(self.driver, self.base_url, roles, coverage=coverage_index.ENABLED).open()
+        except DevToolsUnreachable as error:
+            # The contexts are driven over the browser's DevTools socket, which a remote grid node keeps to itself
+            self.skipTest(f"role matrix needs the browser's DevTools endpoint: {error}")
+        self.role_matrices.append(matrix)
+        return matrix
+
+    def query(self, probes):
+        """Resolve a map of dom_batch probes in a single round trip"""
+        return dom_batch.query(self.driver, probes, self.id())
@@ -0,0 +1,245 @@
+"""Page-load benchmark for login.html and dashboard.html
+
+Loads login.html and, for every role updateStatsForUser knows about,
+dashboard.html many times in a pooled headless Chrome and records per
+load:
+
+- Navigation Timing (TTFB, DOM interactive, DOMContentLoaded, load)
+- first-paint and first-contentful-paint
+- long tasks (count and total duration)
+- script evaluation and total main-thread task time (CDP Performance.getMetrics)
+
+The samples and their p50/p95/p99 are written to a JSON baseline file.
+`compare` runs a one-sided Mann-Whitney U test per page and metric and
+fails when a metric got significantly and noticeably slower.
+
+Usage:
+    python selenium_tests/bench_page_load.py run [-n 30] [--cold] [--output FILE]
+    python selenium_tests/bench_page_load.py compare BASELINE CANDIDATE [--alpha 0.05] [--min-change 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import auth
+import driver_pool
+import static_server
+from base import CREDENTIALS
+from bench_stats import current_commit, describe, mann_whitney_u, percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(HERE, ".benchmarks")
+
+ROLES = ("admin", "user", "demo", "test")
+
+# Lower is better for every metric
+METRICS = (
+    "ttfb_ms",
+    "dom_interactive_ms",
+    "dom_content_loaded_ms",
+    "load_ms",
+    "first_paint_ms",
+    "first_contentful_paint_ms",
+    "long_task_count",
+    "long_task_ms",
+    "script_ms",
+    "task_ms",
+)
+
+# Installed before any page script so long tasks from the very start are seen
+OBSERVER_SCRIPT = r"""
+window.__pageBench = { longTasks: [] };
+try {
+    new PerformanceObserver(list => {
+        for (const entry of list.getEntries()) window.__pageBench.longTasks.push(entry.duration);
+    }).observe({ type: 'longtask', buffered: true });
+} catch (error) {}
+"""
+
+COLLECT_SCRIPT = r"""
+const done = arguments[arguments.length - 1];
+function collect() {
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (!nav || nav.loadEventEnd === 0) { setTimeout(collect, 10); return; }
+    // One more frame so paint entries for the loaded page are in
+    requestAnimationFrame(() => setTimeout(() => {
+        const paints = {};
+        for (const entry of performance.getEntriesByType('paint')) paints[entry.name] = entry.startTime;
+        const longTasks = (window.__pageBench || { longTasks: [] }).longTasks;
+        done({
+            ttfb_ms: nav.responseStart - nav.startTime,
+            dom_interactive_ms: nav.domInteractive,
+            dom_content_loaded_ms: nav.domContentLoadedEventEnd,
+            load_ms: nav.loadEventEnd,
+            first_paint_ms: paints['first-paint'] ?? null,
+            first_contentful_paint_ms: paints['first-contentful-paint'] ?? null,
+            long_task_count: longTasks.length,
+            long_task_ms: longTasks.reduce((total, duration) => total + duration, 0),
+            transfer_bytes: nav.transferSize,
+        });
+    }, 0));
+}
+collect();
+"""
+
+
+def main_thread_times(driver):
+    metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    values = {metric["name"]: metric["value"] for metric in metrics}
+    return values.get("ScriptDuration", 0.0), values.get("TaskDuration", 0.0)
+
+
+def measure(driver, load):
+    """Run `load()` once from a blank page and return the metrics of that load"""
+    driver.get("about:blank")
+    script_before, task_before = main_thread_times(driver)
+    load()
+    sample = driver.execute_async_script(COLLECT_SCRIPT)
+    script_after, task_after = main_thread_times(driver)
+    sample["script_ms"] = (script_after - script_before) * 1000
+    sample["task_ms"] = (task_after - task_before) * 1000
+    return sample
+
+
+def page_loaders(driver, base_url):
+    """Map of page name to a callable that loads it"""
+    loaders = {"login": lambda: driver.get(f"{base_url}/login.html")}
+    for role in ROLES:
+        credentials = CREDENTIALS[role]
+
+        def load_dashboard(credentials=credentials, role=role):
+            user = auth.session_user(credentials["email"], credentials["name"], role)
+            auth.seed_session(driver, base_url, user)
+
+        loaders[f"dashboard:{role}"] = load_dashboard
+    return loaders
+
+
+def run(iterations, warmup, cold, pages=None):
+    """Benchmark every page and return {page: [sample, ...]}"""
+    driver = driver_pool.acquire()
+    observer = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": OBSERVER_SCRIPT})
+    driver.execute_cdp_cmd("Performance.enable", {"timeDomain": "threadTicks"})
+    driver.set_script_timeout(30)
+    try:
+        loaders = page_loaders(driver, static_server.base_url())
+        results = {}
+        for page, load in loaders.items():
+            if pages and page not in pages:
+                continue
+            samples = []
+            for iteration in range(warmup + iterations):
+                if cold:
+                    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+                sample = measure(driver, load)
+                if iteration >= warmup:
+                    samples.append(sample)
+            results[page] = samples
+            print(f"  {page:<16} {len(samples)} loads", file=sys.stderr)
+        return results
+    finally:
+        driver.execute_cdp_cmd("Performance.disable", {})
+        driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": observer["identifier"]})
+        driver_pool.release(driver)
+
+
+def summarize(results):
+    summary = {}
+    for page, samples in results.items():
+        summary[page] = {}
+        for metric in METRICS:
+            values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+            if values:
+                summary[page][metric] = describe(values)
+    return summary
+
+
+def compare(baseline, candidate, alpha=0.05, min_change_pct=5.0):
+    """Return rows for every page/metric pair and whether it regressed"""
+    rows = []
+    for page, samples in candidate["samples"].items():
+        before_samples = baseline["samples"].get(page)
+        if not before_samples:
+            continue
+        for metric in METRICS:
+            before = [sample[metric] for sample in before_samples if sample.get(metric) is not None]
+            after = [sample[metric] for sample in samples if sample.get(metric) is not None]
+            if not before or not after:
+                continue
+            _, p_value = mann_whitney_u(before, after)
+            median_before = percentile(before, 50)
+            median_after = percentile(after, 50)
+            if median_before:
+                change = (median_after - median_before) / median_before * 100
+            else:
+                change = 0.0 if median_after == median_before else float("inf")
+            rows.append({
+                "page": page,
+                "metric": metric,
+                "before_p50": median_before,
+                "after_p50": median_after,
+                "change_pct": change,
+                "p_value": p_value,
+                "regressed": p_value < alpha and change > min_change_pct,
+            })
+    return rows
+
+
+def print_summary(summary):
+    for page, metrics in summary.items():
+        print(page)
+        for metric, stats in metrics.items():
+            print(f"  {metric:<26} p50 {stats['p50']:9.1f}  p95 {stats['p95']:9.1f}  p99 {stats['p99']:9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="benchmark the pages and write a baseline file")
+    run_parser.add_argument("-n", "--iterations", type=int, default=30, help="measured loads per page")
+    run_parser.add_argument("--warmup", type=int, default=3, help="unmeasured loads per page")
+    run_parser.add_argument("--cold", action="store_true", help="clear the HTTP cache before every load")
+    run_parser.add_argument("--page", action="append", help="only this page (login, dashboard:admin, ...)")
+    run_parser.add_argument("--output", help="baseline file (default: .benchmarks/page_load-<commit>.json)")
+    compare_parser = commands.add_parser("compare", help="flag significant regressions between two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    compare_parser.add_argument("--min-change", type=float, default=5.0,
+                                help="ignore median slowdowns smaller than this percentage")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        commit = current_commit()
+        results = run(args.iterations, args.warmup, args.cold, args.page)
+        report = {
+            "commit": commit,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "iterations": args.iterations,
+            "cold_cache": args.cold,
+            "summary": summarize(results),
+            "samples": results,
+        }
+        output = args.output or os.path.join(BENCH_DIR, f"page_load-{commit}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as out:
+            json.dump(report, out, indent=2)
+        print_summary(report["summary"])
+        print(f"Wrote {output}")
+        return 0
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+    rows = compare(baseline, candidate, args.alpha, args.min_change)
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(f"  {row['page']:<16} {row['metric']:<26} {row['before_p50']:9.1f} -> {row['after_p50']:9.1f} "
+              f"({row['change_pct']:+6.1f}%, p={row['p_value']:.3f}) {flag}")
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
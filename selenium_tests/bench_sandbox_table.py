@@ -0,0 +1,239 @@
+"""Stress benchmark for the sandbox table at tenant scale
+
+The dashboard is built for its three seeded rows: searchSandboxes runs
+`td:first-child span` on every row per keystroke, startSandboxMonitoring
+walks every row each 5 s and addSandboxToTable inserts rows one at a
+time. This benchmark opens a logged-in dashboard on the virtual clock,
+grows #sandboxesTableBody through the real addSandboxToTable to each
+requested size and measures at every size:
+
+- insert throughput (rows/s, including the layout the inserts cause)
+- per-keystroke search latency: the input handler and the time to the next frame
+- frames dropped while monitoring ticks (each tick advances the clock 5 s)
+
+The points form a scaling curve; a fitted exponent per metric shows
+whether it grows linearly or worse.
+
+Usage:
+    python selenium_tests/bench_sandbox_table.py [--sizes 1000,10000,50000] [--query sandbox-123]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import auth
+import driver_pool
+import static_server
+from base import CREDENTIALS
+from bench_page_load import BENCH_DIR
+from bench_stats import current_commit, describe, scaling_exponent
+from virtual_clock import VirtualClock
+
+TEMPLATES = ("react", "node", "python", "vue", "angular")
+
+INSERT_BATCH = 500
+
+MONITOR_INTERVAL_MS = 5000
+
+INSERT_SCRIPT = r"""
+const [start, count, templates] = arguments;
+const started = performance.now();
+for (let i = start; i < start + count; i++) {
+    addSandboxToTable('sandbox-' + String(i).padStart(5, '0'), templates[i % templates.length]);
+}
+const inserted = performance.now();
+// Force the style and layout work the new rows cause
+document.body.offsetHeight;
+return { script_ms: inserted - started, layout_ms: performance.now() - inserted,
+         rows: document.querySelectorAll('#sandboxesTableBody tr').length };
+"""
+
+# Next rendered frame, then the task after it, so the time includes style, layout and paint
+NEXT_FRAME_JS = r"""
+const nextFrame = () => new Promise(resolve => requestAnimationFrame(() => {
+    const channel = new MessageChannel();
+    channel.port1.onmessage = () => resolve();
+    channel.port2.postMessage(null);
+}));
+"""
+
+SEARCH_SCRIPT = NEXT_FRAME_JS + r"""
+const [query] = arguments;
+const done = arguments[arguments.length - 1];
+const input = document.getElementById('searchSandboxes');
+(async () => {
+    const keystrokes = [];
+    for (let i = 1; i <= query.length; i++) {
+        await nextFrame();
+        const started = performance.now();
+        input.value = query.slice(0, i);
+        input.dispatchEvent(new Event('input', { bubbles: true }));
+        const handled = performance.now();
+        await nextFrame();
+        keystrokes.push({ handler_ms: handled - started, frame_ms: performance.now() - started });
+    }
+    const visible = Array.from(document.querySelectorAll('#sandboxesTableBody tr'))
+        .filter(row => row.style.display !== 'none').length;
+    input.value = '';
+    searchSandboxes('');
+    done({ keystrokes, visible });
+})();
+"""
+
+MONITOR_SCRIPT = r"""
+const [ticks, intervalMs, gapMs] = arguments;
+const done = arguments[arguments.length - 1];
+const clock = window.__sandboxClock;
+const pause = ms => new Promise(resolve => clock.realSetTimeout(resolve, ms));
+const frames = [];
+let recording = true;
+function frame(timestamp) {
+    frames.push(timestamp);
+    if (recording) requestAnimationFrame(frame);
+}
+requestAnimationFrame(frame);
+(async () => {
+    await pause(gapMs);
+    const tickMs = [];
+    for (let i = 0; i < ticks; i++) {
+        const started = performance.now();
+        await clock.advance(intervalMs);
+        tickMs.push(performance.now() - started);
+        await pause(gapMs);
+    }
+    recording = false;
+    const budget = 1000 / 60;
+    const gaps = frames.slice(1).map((timestamp, i) => timestamp - frames[i]);
+    const dropped = gaps.reduce((count, gap) => count + Math.max(0, Math.round(gap / budget) - 1), 0);
+    done({ tick_ms: tickMs, frames: frames.length, dropped_frames: dropped,
+           longest_frame_ms: gaps.length ? Math.max(...gaps) : 0 });
+})();
+"""
+
+
+def parse_sizes(value):
+    return sorted(int(size) for size in value.split(","))
+
+
+def open_dashboard(driver):
+    """Logged-in dashboard whose timers only run when the clock is advanced"""
+    clock = VirtualClock(driver)
+    clock.install()
+    credentials = CREDENTIALS["admin"]
+    auth.seed_session(driver, static_server.base_url(),
+                      auth.session_user(credentials["email"], credentials["name"], "admin"))
+    return clock
+
+
+def grow_table(driver, start, target):
+    """Insert rows start..target-1 in batches and return the insert timings"""
+    script_ms = layout_ms = 0.0
+    rows = None
+    for batch_start in range(start, target, INSERT_BATCH):
+        count = min(INSERT_BATCH, target - batch_start)
+        batch = driver.execute_script(INSERT_SCRIPT, batch_start, count, list(TEMPLATES))
+        script_ms += batch["script_ms"]
+        layout_ms += batch["layout_ms"]
+        rows = batch["rows"]
+    inserted = target - start
+    total_s = (script_ms + layout_ms) / 1000
+    return {
+        "inserted": inserted,
+        "rows": rows,
+        "script_ms": round(script_ms, 1),
+        "layout_ms": round(layout_ms, 1),
+        "rows_per_s": round(inserted / total_s, 1) if total_s else None,
+    }
+
+
+def run(sizes, query, ticks):
+    driver = driver_pool.acquire()
+    clock = None
+    try:
+        driver.set_script_timeout(300)
+        clock = open_dashboard(driver)
+        points = []
+        inserted = 0
+        for size in sizes:
+            insert = grow_table(driver, inserted, size)
+            inserted = size
+            search = driver.execute_async_script(SEARCH_SCRIPT, query)
+            monitor = driver.execute_async_script(MONITOR_SCRIPT, ticks, MONITOR_INTERVAL_MS, 100)
+            point = {
+                "rows": insert["rows"],
+                "insert": insert,
+                "search": {
+                    "keystrokes": len(search["keystrokes"]),
+                    "visible_rows": search["visible"],
+                    "handler_ms": describe([key["handler_ms"] for key in search["keystrokes"]]),
+                    "frame_ms": describe([key["frame_ms"] for key in search["keystrokes"]]),
+                },
+                "monitoring": {
+                    "ticks": ticks,
+                    "tick_ms": describe(monitor["tick_ms"]),
+                    "frames": monitor["frames"],
+                    "dropped_frames": monitor["dropped_frames"],
+                    "longest_frame_ms": monitor["longest_frame_ms"],
+                },
+            }
+            points.append(point)
+            print(f"  {point['rows']:>6} rows: insert {insert['rows_per_s']} rows/s, "
+                  f"search p95 {point['search']['frame_ms']['p95']:.1f}ms, "
+                  f"tick p95 {point['monitoring']['tick_ms']['p95']:.1f}ms, "
+                  f"{monitor['dropped_frames']} frames dropped", file=sys.stderr)
+        return points
+    finally:
+        if clock is not None:
+            clock.uninstall()
+        driver_pool.release(driver)
+
+
+def fit_curve(points):
+    """Scaling exponent of every metric against the row count"""
+    series = {
+        "insert_ms_per_row": [(p["rows"], (p["insert"]["script_ms"] + p["insert"]["layout_ms"]) / p["insert"]["inserted"])
+                              for p in points if p["insert"]["inserted"]],
+        "search_frame_p50_ms": [(p["rows"], p["search"]["frame_ms"]["p50"]) for p in points],
+        "search_handler_p50_ms": [(p["rows"], p["search"]["handler_ms"]["p50"]) for p in points],
+        "monitoring_tick_p50_ms": [(p["rows"], p["monitoring"]["tick_ms"]["p50"]) for p in points],
+    }
+    return {name: round(scaling_exponent(values), 2) for name, values in series.items() if len(values) > 1}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=parse_sizes, default=[1000, 10000, 50000], help="comma separated row counts")
+    parser.add_argument("--query", default="sandbox-123", help="search text typed one keystroke at a time")
+    parser.add_argument("--ticks", type=int, default=5, help="monitoring ticks measured per size")
+    parser.add_argument("--output", help="result file (default: .benchmarks/sandbox_table-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = current_commit()
+    points = run(args.sizes, args.query, args.ticks)
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "query": args.query,
+        "points": points,
+        "scaling_exponents": fit_curve(points),
+    }
+    output = args.output or os.path.join(BENCH_DIR, f"sandbox_table-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as out:
+        json.dump(report, out, indent=2)
+
+    print(f"{'rows':>7} {'insert rows/s':>14} {'search p50':>11} {'search p95':>11} {'tick p95':>9} {'dropped':>8}")
+    for point in points:
+        print(f"{point['rows']:>7} {point['insert']['rows_per_s'] or 0:>14.0f} "
+              f"{point['search']['frame_ms']['p50']:>9.1f}ms {point['search']['frame_ms']['p95']:>9.1f}ms "
+              f"{point['monitoring']['tick_ms']['p95']:>7.1f}ms {point['monitoring']['dropped_frames']:>8}")
+    for name, exponent in report["scaling_exponents"].items():
+        print(f"{name}: grows ~ rows^{exponent}")
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Startup-cost benchmark: empty profile against the primed profile template
+
+Starts a fresh headless Chrome per sample, alternating between an empty
+profile ("cold") and a copy of the profile template ("template"), and
+measures separately:
+
+- profile_ms: creating the profile directory (the template clone)
+- launch_ms: webdriver.Chrome until the session exists
+- interceptor_ms: installing the CDN cache interception, as the pool does
+- first_navigation_ms: driver.get of the page, plus its Navigation Timing
+  (TTFB, DOMContentLoaded, load)
+- first-contentful-paint and largest-contentful-paint, the paint the
+  user would call meaningful (Chrome dropped first-meaningful-paint)
+- fonts_ready_ms: when document.fonts.ready resolved
+- requests and http_cache_hits: requests of the navigation and how many
+  of them Chrome answered from its HTTP cache (or revalidated with a
+  304), counted from the DevTools network events in the performance log
+
+With the CDN cache on, CDN requests are answered by the interceptor and
+never count as hits; run with SANDBOXPRO_CDN_CACHE=0 to see what the
+template's cache serves for them.
+
+The samples, their p50/p95/p99 and a Mann-Whitney U p-value per metric
+(template against cold) are written to a JSON file.
+
+Usage:
+    python selenium_tests/bench_startup.py [-n 10] [--page login.html] [--output FILE]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from selenium import webdriver
+
+import cdn_cache
+import driver_pool
+import profile_template
+import static_server
+from bench_stats import current_commit, describe, mann_whitney_u
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(HERE, ".benchmarks")
+
+MODES = ("cold", "template")
+
+# Lower is better for every metric
+METRICS = (
+    "profile_ms",
+    "launch_ms",
+    "interceptor_ms",
+    "first_navigation_ms",
+    "ttfb_ms",
+    "dom_content_loaded_ms",
+    "load_ms",
+    "first_contentful_paint_ms",
+    "largest_contentful_paint_ms",
+    "fonts_ready_ms",
+)
+
+# Installed before the page's scripts so the largest paint from the very start is seen
+OBSERVER_SCRIPT = r"""
+window.__startupBench = { lcp: null, fontsReady: null };
+try {
+    new PerformanceObserver(list => {
+        for (const entry of list.getEntries()) window.__startupBench.lcp = entry.startTime;
+    }).observe({ type: 'largest-contentful-paint', buffered: true });
+} catch (error) {}
+document.fonts.ready.then(() => { window.__startupBench.fontsReady = performance.now(); });
+"""
+
+COLLECT_SCRIPT = r"""
+const done = arguments[arguments.length - 1];
+function collect() {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const bench = window.__startupBench;
+    if (!nav || nav.loadEventEnd === 0 || bench.fontsReady === null) { setTimeout(collect, 10); return; }
+    requestAnimationFrame(() => setTimeout(() => {
+        const paints = {};
+        for (const entry of performance.getEntriesByType('paint')) paints[entry.name] = entry.startTime;
+        done({
+            ttfb_ms: nav.responseStart - nav.startTime,
+            dom_content_loaded_ms: nav.domContentLoadedEventEnd,
+            load_ms: nav.loadEventEnd,
+            first_contentful_paint_ms: paints['first-contentful-paint'] ?? null,
+            largest_contentful_paint_ms: bench.lcp,
+            fonts_ready_ms: bench.fontsReady,
+        });
+    }, 0));
+}
+collect();
+"""
+
+
+def http_cache_hits(messages):
+    """(requests, requests served from the HTTP cache or revalidated) in a performance log"""
+    requests = set()
+    hits = set()
+    for message in messages:
+        event = json.loads(message["message"])["message"]
+        params = event.get("params", {})
+        if event.get("method") == "Network.requestWillBeSent":
+            requests.add(params["requestId"])
+        elif event.get("method") == "Network.requestServedFromCache":
+            hits.add(params["requestId"])
+        elif event.get("method") == "Network.responseReceived":
+            response = params["response"]
+            if response.get("fromDiskCache") or response.get("status") == 304:
+                hits.add(params["requestId"])
+    # Data URLs and the like have no requestWillBeSent
+    return len(requests), len(hits & requests)
+
+
+def sample(mode, url):
+    """Start one browser in `mode`, load `url` and return the measurements"""
+    started = time.perf_counter()
+    if mode == "template":
+        # Cloned even when the CDN interception keeps the cache from serving anything: the hit count shows it
+        profile = profile_template.clone(intercepted=False)
+        if profile is None:
+            raise RuntimeError("no profile template; run profile_template.py build")
+    else:
+        profile = tempfile.mkdtemp(prefix="sandboxpro-cold-")
+    measured = {"profile_ms": (time.perf_counter() - started) * 1000}
+    try:
+        started = time.perf_counter()
+        driver = webdriver.Chrome(options=driver_pool.chrome_options(profile))
+        measured["launch_ms"] = (time.perf_counter() - started) * 1000
+        try:
+            started = time.perf_counter()
+            cdn_cache.install(driver)
+            measured["interceptor_ms"] = (time.perf_counter() - started) * 1000
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": OBSERVER_SCRIPT})
+            driver.set_script_timeout(30)
+            started = time.perf_counter()
+            driver.get(url)
+            measured["first_navigation_ms"] = (time.perf_counter() - started) * 1000
+            measured.update(driver.execute_async_script(COLLECT_SCRIPT))
+            measured["requests"], measured["http_cache_hits"] = http_cache_hits(driver.get_log("performance"))
+        finally:
+            cdn_cache.uninstall(driver)
+            driver.quit()
+    finally:
+        profile_template.discard(profile)
+    return measured
+
+
+def run(iterations, page):
+    """Alternate the modes so drift in the machine's load hits both alike; returns {mode: [sample, ...]}"""
+    url = f"{static_server.base_url()}/{page}"
+    results = {mode: [] for mode in MODES}
+    for iteration in range(iterations):
+        for mode in MODES if iteration % 2 == 0 else MODES[::-1]:
+            results[mode].append(sample(mode, url))
+        print(f"  {iteration + 1}/{iterations}", file=sys.stderr)
+    return results
+
+
+def summarize(results):
+    summary = {}
+    for mode, samples in results.items():
+        summary[mode] = {}
+        for metric in (*METRICS, "requests", "http_cache_hits"):
+            values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+            if values:
+                summary[mode][metric] = describe(values)
+    return summary
+
+
+def compare(results):
+    """One-sided p-value that the template made each metric smaller"""
+    p_values = {}
+    for metric in METRICS:
+        cold = [sample[metric] for sample in results["cold"] if sample.get(metric) is not None]
+        template = [sample[metric] for sample in results["template"] if sample.get(metric) is not None]
+        if cold and template:
+            # mann_whitney_u tests whether the second group is larger
+            p_values[metric] = mann_whitney_u(template, cold)[1]
+    return p_values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--iterations", type=int, default=10, help="browsers started per mode")
+    parser.add_argument("--page", default="login.html", help="page of the first navigation")
+    parser.add_argument("--output", help="result file (default: .benchmarks/startup-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    if profile_template.ensure() is None:
+        print("no profile template: set SANDBOXPRO_PROFILE_TEMPLATE or check that Chrome starts", file=sys.stderr)
+        return 1
+    commit = current_commit()
+    results = run(args.iterations, args.page)
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "page": args.page,
+        "iterations": args.iterations,
+        "summary": summarize(results),
+        "p_values": compare(results),
+        "samples": results,
+    }
+    output = args.output or os.path.join(BENCH_DIR, f"startup-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as out:
+        json.dump(report, out, indent=2)
+
+    print(f"{'':<28} {'cold p50':>10} {'template p50':>13}  p")
+    for metric in (*METRICS, "requests", "http_cache_hits"):
+        cold = report["summary"]["cold"].get(metric)
+        template = report["summary"]["template"].get(metric)
+        if cold and template:
+            p_value = report["p_values"].get(metric)
+            print(f"  {metric:<26} {cold['p50']:10.1f} {template['p50']:13.1f}"
+                  f"  {'' if p_value is None else f'{p_value:.3f}'}")
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Percentiles, fits and significance tests shared by the benchmark scripts"""
+import math
+import os
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def current_commit():
+    """Short hash of HEAD, suffixed with -dirty when tracked files are modified"""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}-dirty" if dirty else sha
+
+
+def percentile(samples, pct):
+    """Linear-interpolated percentile of `samples` (pct in 0..100)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def describe(samples):
+    """p50/p95/p99, mean and extremes of a list of numbers"""
+    return {
+        "n": len(samples),
+        "mean": sum(samples) / len(samples) if samples else None,
+        "min": min(samples, default=None),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples, default=None),
+    }
+
+
+def mann_whitney_u(before, after):
+    """One-sided Mann-Whitney U test that `after` tends to be larger than `before`
+
+    Returns (U, p) using the normal approximation with tie correction,
+    which is accurate enough from about eight samples per side.
+    """
+    n1, n2 = len(before), len(after)
+    if not n1 or not n2:
+        return 0.0, 1.0
+    combined = sorted([(value, 0) for value in before] + [(value, 1) for value in after])
+
+    # Average ranks over ties
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    start = 0
+    while start < len(combined):
+        end = start
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[start][0]:
+            end += 1
+        for index in range(start, end + 1):
+            ranks[index] = (start + end) / 2 + 1
+        size = end - start + 1
+        tie_term += size ** 3 - size
+        start = end + 1
+
+    rank_sum_after = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 1)
+    u_after = rank_sum_after - n2 * (n2 + 1) / 2
+    mean = n1 * n2 / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u_after, 1.0
+    # Continuity correction towards the mean
+    z = (u_after - mean - 0.5) / math.sqrt(variance)
+    return u_after, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def slope(points):
+    """Least-squares slope of (x, y) points"""
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def scaling_exponent(points):
+    """Exponent k of y ~ x^k fitted on a log-log scale (1 is linear, 2 quadratic)"""
+    logs = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    return slope(logs)
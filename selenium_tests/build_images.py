@@ -0,0 +1,210 @@
+"""Responsive variants of the DSC*.JPG photos
+
+The camera photos in the repository root are 1.5 to 2.5 MB each, far more
+than any viewport needs. This build step resizes every photo to WIDTHS
+and encodes each width as AVIF (when Pillow can write it), WebP and a
+progressive JPEG fallback. Variants are written to images/ as
+<stem>-<sha>-<width>.<ext>, where <sha> is the start of the photo's
+SHA-256, so a changed photo also gets new URLs.
+
+images/responsive.json records, per photo, its digest, the srcset of
+every format and a ready-made <picture> element with `sizes` set. A photo
+whose digest and build settings match the manifest, and whose variants
+all exist, is not decoded again: a rerun with unchanged photos only hashes
+them. Photos that do need work are encoded in parallel on a process pool.
+
+Usage:
+    python selenium_tests/build_images.py [-j WORKERS] [--force]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ROOT = os.path.dirname(HERE)
+
+OUTPUT_DIR = os.environ.get("SANDBOXPRO_IMAGES_DIR", os.path.join(ROOT, "images"))
+
+MANIFEST = "responsive.json"
+
+# Candidate widths; the three smallest cover the 375/768/1280 viewports the responsive tests use
+WIDTHS = (400, 800, 1280, 1920)
+
+# Encoder settings per format, in <picture> preference order
+ENCODINGS = {
+    "avif": {"quality": 50, "speed": 6},
+    "webp": {"quality": 75, "method": 6},
+    "jpeg": {"quality": 80, "optimize": True, "progressive": True},
+}
+
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Layout width of the photos: the full viewport
+SIZES = "100vw"
+
+
+def sources():
+    return sorted(glob.glob(os.path.join(ROOT, "DSC*.JPG")))
+
+
+def formats():
+    """Formats this Pillow build can write, best first (AVIF needs Pillow 11.2+ or a plugin)"""
+    Image.init()
+    return tuple(name for name in ENCODINGS if name.upper() in Image.SAVE)
+
+
+def settings_digest(widths, encoded_formats):
+    """Changes whenever a rebuild would produce different variants"""
+    settings = {"widths": list(widths), "encodings": {name: ENCODINGS[name] for name in encoded_formats}}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def variant_name(stem, digest, width, name):
+    return f"{stem}-{digest[:12]}-{width}.{EXTENSIONS[name]}"
+
+
+def build_one(source, digest, output_dir, widths, encoded_formats):
+    """Encode every width and format of one photo; runs in a pool worker"""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    with Image.open(source) as original:
+        # Camera photos carry their rotation in EXIF; browsers apply it, resized copies must bake it in
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    # Never upscale: a photo narrower than a width only gets the widths it can fill, plus its own
+    targets = [width for width in widths if width < image.width] or [image.width]
+    variants = {name: [] for name in encoded_formats}
+    for width in targets:
+        resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for name in encoded_formats:
+            filename = variant_name(stem, digest, width, name)
+            temporary = os.path.join(output_dir, f".{filename}.{os.getpid()}")
+            resized.save(temporary, name.upper(), **ENCODINGS[name])
+            os.replace(temporary, os.path.join(output_dir, filename))
+            variants[name].append({"width": width, "file": filename,
+                                   "bytes": os.path.getsize(os.path.join(output_dir, filename))})
+    return {"sha256": digest, "width": image.width, "height": image.height,
+            "bytes": os.path.getsize(source), "variants": variants}
+
+
+def srcset(entry, name, prefix="images/"):
+    return ", ".join(f"{prefix}{variant['file']} {variant['width']}w" for variant in entry["variants"][name])
+
+
+def picture_html(source_name, entry, prefix="images/", alt=""):
+    """<picture> element offering every format, the browser picks the width for the viewport"""
+    names = list(entry["variants"])
+    fallback = entry["variants"][names[-1]]
+    lines = ["<picture>"]
+    for name in names[:-1]:
+        lines.append(f'  <source type="{MIME_TYPES[name]}" srcset="{srcset(entry, name, prefix)}" sizes="{SIZES}">')
+    lines.append(f'  <img src="{prefix}{fallback[-1]["file"]}" srcset="{srcset(entry, names[-1], prefix)}" '
+                 f'sizes="{SIZES}" width="{entry["width"]}" height="{entry["height"]}" alt="{alt}" '
+                 f'data-source="{source_name}" loading="lazy" decoding="async">')
+    lines.append("</picture>")
+    return "\n".join(lines)
+
+
+def pick_width(widths, viewport_width, device_pixel_ratio=1.0):
+    """Width a browser takes from a `sizes="100vw"` srcset: the narrowest one covering the viewport"""
+    needed = viewport_width * device_pixel_ratio
+    return next((width for width in sorted(widths) if width >= needed), max(widths))
+
+
+def load_manifest(output_dir=OUTPUT_DIR):
+    try:
+        with open(os.path.join(output_dir, MANIFEST)) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return {"settings": None, "images": {}}
+
+
+def _up_to_date(entry, digest, output_dir):
+    return (entry is not None and entry["sha256"] == digest
+            and all(os.path.exists(os.path.join(output_dir, variant["file"]))
+                    for variants in entry["variants"].values() for variant in variants))
+
+
+def _prune(output_dir, images):
+    """Remove variants no manifest entry refers to (photos that changed or were deleted)"""
+    referenced = {variant["file"] for entry in images.values()
+                  for variants in entry["variants"].values() for variant in variants}
+    for filename in os.listdir(output_dir):
+        if filename.startswith("DSC") and filename not in referenced:
+            os.remove(os.path.join(output_dir, filename))
+
+
+def build(paths=None, output_dir=OUTPUT_DIR, workers=None, force=False, widths=WIDTHS):
+    """Bring the variants and the manifest up to date; returns the manifest and the number of photos encoded"""
+    paths = sources() if paths is None else paths
+    encoded_formats = formats()
+    settings = settings_digest(widths, encoded_formats)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    previous = manifest["images"] if manifest["settings"] == settings and not force else {}
+
+    images, todo = {}, []
+    for path in paths:
+        name = os.path.basename(path)
+        digest = file_digest(path)
+        if _up_to_date(previous.get(name), digest, output_dir):
+            images[name] = previous[name]
+        else:
+            todo.append((name, path, digest))
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(todo))) as pool:
+            futures = {name: pool.submit(build_one, path, digest, output_dir, widths, encoded_formats)
+                       for name, path, digest in todo}
+            for name, future in futures.items():
+                images[name] = future.result()
+    for name, entry in images.items():
+        entry["html"] = picture_html(name, entry)
+
+    if todo or set(images) != set(manifest["images"]) or manifest["settings"] != settings:
+        manifest = {"settings": settings, "formats": list(encoded_formats), "sizes": SIZES,
+                    "images": dict(sorted(images.items()))}
+        temporary = os.path.join(output_dir, f".{MANIFEST}.{os.getpid()}")
+        with open(temporary, "w") as out:
+            json.dump(manifest, out, indent=2)
+        os.replace(temporary, os.path.join(output_dir, MANIFEST))
+        _prune(output_dir, images)
+    return manifest, len(todo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="encoder processes (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="re-encode every photo")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="where to write the variants and the manifest")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manifest, encoded = build(output_dir=args.output, workers=args.workers, force=args.force)
+    images = manifest["images"]
+    print(f"{encoded} of {len(images)} photos encoded ({', '.join(manifest['formats'])}) "
+          f"in {time.perf_counter() - started:.2f}s")
+    for name, entry in images.items():
+        smallest = min(variant["bytes"] for variants in entry["variants"].values() for variant in variants)
+        print(f"  {name:<14} {entry['bytes']:>9} bytes -> {smallest:>7} bytes at the smallest width")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
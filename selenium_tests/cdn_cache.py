@@ -0,0 +1,297 @@
+"""Offline cache for the CDN assets the pages pull in
+
+dashboard.html, login.html, index.html and HelloWorld.html load the
+Tailwind runtime, Font Awesome, Google Fonts and placehold.co images from
+the internet on every page load. Every pooled browser intercepts those
+requests through the CDP Fetch domain and answers them from a
+content-addressed cache on disk, which is shared by all browsers and
+worker processes of a run. A missing asset is fetched once and stored;
+in offline mode (SANDBOXPRO_OFFLINE=1) a deterministic stand-in is served
+instead so the suite never touches the network.
+
+Usage:
+    python selenium_tests/cdn_cache.py fill      # prime the cache from the pages
+    python selenium_tests/cdn_cache.py stats
+"""
+import argparse
+import atexit
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import trio
+
+from cdp import CdpChannel, DevToolsUnreachable
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# Intercept CDN requests in every pooled browser
+ENABLED = os.environ.get("SANDBOXPRO_CDN_CACHE", "1") != "0"
+
+# Never fetch from the network, serve stand-ins for anything not cached
+OFFLINE = os.environ.get("SANDBOXPRO_OFFLINE") == "1"
+
+CACHE_DIR = os.environ.get("SANDBOXPRO_ASSET_CACHE", os.path.join(HERE, ".asset_cache"))
+
+CDN_HOSTS = (
+    "cdn.tailwindcss.com",
+    "cdnjs.cloudflare.com",
+    "fonts.googleapis.com",
+    "fonts.gstatic.com",
+    "placehold.co",
+)
+
+PAGES = ("index.html", "login.html", "dashboard.html", "HelloWorld.html")
+
+FETCH_TIMEOUT = 20
+
+
+class AssetCache:
+    """Content-addressed store of CDN responses
+
+    Bodies live in objects/<sha256> and each URL has a small record in
+    urls/<sha256 of url>.json pointing at its body, so identical files are
+    stored once and concurrent writers never touch the same file.
+    """
+
+    def __init__(self, root=CACHE_DIR, offline=OFFLINE):
+        self.root = root
+        self.offline = offline
+        self.hits = 0
+        self.fetched = 0
+        self.stand_ins = 0
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _record_path(self, url):
+        return os.path.join(self.root, "urls", hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def lookup(self, url):
+        """Return (status, headers, body) of a cached URL, or None"""
+        try:
+            with open(self._record_path(url)) as record_file:
+                record = json.load(record_file)
+            with open(self._object_path(record["sha256"]), "rb") as body_file:
+                body = body_file.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return record["status"], record["headers"], body
+
+    def store(self, url, status, headers, body):
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            _atomic_write(object_path, body)
+        record = {"url": url, "status": status, "headers": headers, "sha256": digest}
+        _atomic_write(self._record_path(url), json.dumps(record).encode())
+
+    def fetch(self, url, request_headers=None):
+        """Download a URL and add it to the cache"""
+        headers = {"User-Agent": (request_headers or {}).get("User-Agent", "Mozilla/5.0")}
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            body = response.read()
+            # Everything but the content type is transport detail
+            kept = {"Content-Type": response.headers.get("Content-Type", "application/octet-stream")}
+            status = response.status
+        self.store(url, status, kept, body)
+        return status, kept, body
+
+    def resolve(self, url, request_headers=None):
+        """Answer a request from the cache, the network or a stand-in, in that order"""
+        cached = self.lookup(url)
+        if cached is not None:
+            self._count("hits")
+            return cached
+        if not self.offline:
+            try:
+                response = self.fetch(url, request_headers)
+                self._count("fetched")
+                return response
+            except (urllib.error.URLError, OSError):
+                pass
+        self._count("stand_ins")
+        return stand_in(url)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def summary(self):
+        return f"asset cache: {self.hits} hits, {self.fetched} fetched, {self.stand_ins} stand-ins"
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as out:
+        out.write(data)
+    os.replace(temporary, path)
+
+
+# The Tailwind utilities login.js and dashboard.js toggle to show and hide elements
+STAND_IN_CSS = ".hidden{display:none!important}.translate-y-full{transform:translateY(100%)}"
+
+# Offline Tailwind runtime: only the utilities above, so hidden elements stay hidden
+STAND_IN_TAILWIND = ("window.tailwind = window.tailwind || {};"
+                     "(function(){var style=document.createElement('style');"
+                     f"style.textContent={json.dumps(STAND_IN_CSS)};"
+                     "(document.head||document.documentElement).appendChild(style);})();")
+
+
+def stand_in(url):
+    """Deterministic replacement for an asset that is not cached"""
+    path = url.split("?")[0]
+    if "placehold.co" in url:
+        size = re.search(r"/(\d+)x(\d+)", url)
+        width, height = size.groups() if size else ("600", "400")
+        body = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+                f'<rect width="100%" height="100%" fill="#cccccc"/></svg>').encode()
+        return 200, {"Content-Type": "image/svg+xml"}, body
+    if "cdn.tailwindcss.com" in url or path.endswith(".js"):
+        return 200, {"Content-Type": "text/javascript"}, STAND_IN_TAILWIND.encode()
+    if "fonts.googleapis.com" in url or path.endswith(".css"):
+        return 200, {"Content-Type": "text/css"}, f"/* offline stand-in */{STAND_IN_CSS}".encode()
+    return 404, {"Content-Type": "text/plain"}, b""
+
+
+class CdnInterceptor:
+    """Answers CDN requests of every page in one browser from an AssetCache"""
+
+    def __init__(self, channel, cache):
+        self.channel = channel
+        self.cache = cache
+        self.patterns = [{"urlPattern": f"https://{host}/*", "requestStage": "Request"} for host in CDN_HOSTS]
+
+    def install(self):
+        self.channel.on("Target.attachedToTarget", self._on_attached)
+        self.channel.on("Fetch.requestPaused", self._on_paused)
+        # Attach to existing and future pages; new ones wait until interception is on
+        self.channel.call("Target.setAutoAttach", {
+            "autoAttach": True,
+            "waitForDebuggerOnStart": True,
+            "flatten": True,
+        })
+
+    async def _on_attached(self, params, _session_id):
+        session_id = params["sessionId"]
+        try:
+            if params["targetInfo"]["type"] in ("page", "iframe"):
+                await self.channel.execute("Fetch.enable", {"patterns": self.patterns}, session_id)
+        finally:
+            if params.get("waitingForDebugger"):
+                await self.channel.execute("Runtime.runIfWaitingForDebugger", None, session_id)
+
+    async def _on_paused(self, params, session_id):
+        request = params["request"]
+        status, headers, body = await trio.to_thread.run_sync(self.cache.resolve, request["url"], request.get("headers"))
+        response_headers = [{"name": name, "value": value} for name, value in headers.items()]
+        # Fonts are requested with crossorigin
+        response_headers.append({"name": "Access-Control-Allow-Origin", "value": "*"})
+        await self.channel.execute("Fetch.fulfillRequest", {
+            "requestId": params["requestId"],
+            "responseCode": status,
+            "responseHeaders": response_headers,
+            "body": base64.b64encode(body).decode(),
+        }, session_id)
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the cache shared by every browser of this process"""
+    global _cache
+    if _cache is None:
+        _cache = AssetCache()
+        atexit.register(lambda: print(_cache.summary(), file=sys.stderr))
+    return _cache
+
+
+def install(driver):
+    """Route the CDN requests of a newly started driver through the cache"""
+    if not ENABLED:
+        return
+    try:
+        channel = CdpChannel.for_driver(driver)
+    except DevToolsUnreachable as error:
+        # The DevTools port of a browser on a remote node is only reachable on that machine
+        print(f"asset cache: not intercepting, {error}", file=sys.stderr)
+        return
+    CdnInterceptor(channel, get_cache()).install()
+    driver.sandboxpro_cdn_channel = channel
+
+
+def uninstall(driver):
+    channel = getattr(driver, "sandboxpro_cdn_channel", None)
+    if channel is not None:
+        channel.close()
+
+
+def page_asset_urls(root=ROOT, pages=PAGES):
+    """CDN URLs the HTML pages load (preconnect hints are not requests)"""
+    tag_pattern = re.compile(r"<(?:script|link|img)\b[^>]*>")
+    url_pattern = re.compile(r"""(?:src|href)=["'](https://(?:%s)(?:/[^"']*)?)["']""" % "|".join(map(re.escape, CDN_HOSTS)))
+    urls = []
+    for page in pages:
+        with open(os.path.join(root, page), encoding="utf-8") as html:
+            for tag in tag_pattern.findall(html.read()):
+                match = url_pattern.search(tag)
+                if match and "preconnect" not in tag and match.group(1) not in urls:
+                    urls.append(match.group(1))
+    return urls
+
+
+def fill(cache, user_agent=None):
+    """Download every CDN asset the pages use, including fonts referenced from CSS"""
+    headers = {"User-Agent": user_agent} if user_agent else None
+    queue = page_asset_urls()
+    seen = set()
+    failed = 0
+    while queue:
+        url = queue.pop(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        try:
+            status, response_headers, body = cache.lookup(url) or cache.fetch(url, headers)
+        except (urllib.error.URLError, OSError) as error:
+            print(f"FAILED {url}: {error}")
+            failed += 1
+            continue
+        print(f"{status} {len(body):>9} {url}")
+        if "css" in response_headers.get("Content-Type", ""):
+            for ref in re.findall(r"url\(([^)]+)\)", body.decode("utf-8", "replace")):
+                ref = ref.strip("'\"")
+                if ref.startswith("https://"):
+                    queue.append(ref)
+                elif not ref.startswith("data:"):
+                    queue.append(urllib.request.urljoin(url, ref))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("fill", "stats"))
+    parser.add_argument("--user-agent", help="User-Agent to fetch with (Google Fonts serves per browser)")
+    args = parser.parse_args(argv)
+
+    cache = AssetCache(offline=False)
+    failed = fill(cache, args.user_agent) if args.command == "fill" else 0
+    records = os.path.join(cache.root, "urls")
+    count = len(os.listdir(records)) if os.path.isdir(records) else 0
+    print(f"{count} URLs cached in {cache.root}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
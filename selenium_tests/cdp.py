@@ -0,0 +1,154 @@
+"""Raw Chrome DevTools protocol channel to the browser behind a chromedriver session
+
+`driver.execute_cdp_cmd` can send commands but never sees events, which
+request interception and tracing need. CdpChannel opens the browser-level
+DevTools websocket that chromedriver exposes (goog:chromeOptions.debuggerAddress)
+and runs it on a background trio thread, which is what Selenium itself
+uses for its CDP support. Commands can be sent from the test thread with
+call(); event handlers are coroutines run on the channel thread.
+"""
+import itertools
+import json
+import sys
+import threading
+import urllib.request
+
+import trio
+import trio_websocket
+
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+
+class CdpError(Exception):
+    """A CDP command returned an error"""
+
+
+class DevToolsUnreachable(OSError):
+    """The browser's DevTools endpoint cannot be reached from here, as on a remote WebDriver node"""
+
+
+def browser_ws_url(driver):
+    """Return the browser-level DevTools websocket URL of a chromedriver session"""
+    try:
+        address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        # A remote node reports an address on its own machine
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=10) as response:
+            return json.load(response)["webSocketDebuggerUrl"]
+    except (OSError, KeyError) as error:
+        raise DevToolsUnreachable(f"no DevTools connection ({error!r})") from error
+
+
+class CdpChannel:
+    """Background websocket connection that can send CDP commands and dispatch events"""
+
+    def __init__(self, ws_url):
+        self.ws_url = ws_url
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._handlers = {}
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = None
+        self._token = None
+        self._cancel_scope = None
+        self._nursery = None
+        self._ws = None
+
+    @classmethod
+    def for_driver(cls, driver):
+        return cls(browser_ws_url(driver)).start()
+
+    def start(self):
+        self._thread = threading.Thread(target=trio.run, args=(self._main,), name="cdp-channel", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+        return self
+
+    def close(self):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            trio.from_thread.run_sync(self._cancel_scope.cancel, trio_token=self._token)
+        except trio.RunFinishedError:
+            pass
+        self._thread.join(timeout=5)
+
+    def on(self, method, handler):
+        """Register `async handler(params, session_id)` for an event"""
+        self._handlers.setdefault(method, []).append(handler)
+
+    def off(self, method, handler):
+        """Unregister a handler added with on()"""
+        handlers = self._handlers.get(method, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def call(self, method, params=None, session_id=None, timeout=30):
+        """Send a command from a non-trio thread and return its result"""
+        return trio.from_thread.run(self.execute, method, params, session_id, timeout, trio_token=self._token)
+
+    async def execute(self, method, params=None, session_id=None, timeout=30):
+        """Send a command from the channel thread and wait for its result"""
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        done = trio.Event()
+        self._pending[message_id] = [done, None]
+        try:
+            await self._ws.send_message(json.dumps(message))
+            with trio.fail_after(timeout):
+                await done.wait()
+        finally:
+            _, response = self._pending.pop(message_id)
+        if "error" in response:
+            raise CdpError(f"{method}: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    def run(self, async_fn, *args):
+        """Run a coroutine on the channel thread from a non-trio thread and return its result"""
+        return trio.from_thread.run(async_fn, *args, trio_token=self._token)
+
+    def spawn(self, async_fn, *args):
+        """Run a coroutine in the background on the channel thread"""
+        self._nursery.start_soon(async_fn, *args)
+
+    async def _main(self):
+        try:
+            async with trio_websocket.open_websocket_url(self.ws_url, max_message_size=MAX_MESSAGE_SIZE) as ws:
+                self._ws = ws
+                self._token = trio.lowlevel.current_trio_token()
+                async with trio.open_nursery() as nursery:
+                    self._nursery = nursery
+                    self._cancel_scope = nursery.cancel_scope
+                    self._ready.set()
+                    await self._read(ws)
+        except Exception as error:
+            self._error = error
+        finally:
+            self._ready.set()
+
+    async def _read(self, ws):
+        try:
+            while True:
+                message = json.loads(await ws.get_message())
+                if "id" in message:
+                    pending = self._pending.get(message["id"])
+                    if pending:
+                        pending[1] = message
+                        pending[0].set()
+                    continue
+                for handler in self._handlers.get(message.get("method"), ()):
+                    self._nursery.start_soon(self._dispatch, handler, message.get("params", {}), message.get("sessionId"))
+        except trio_websocket.ConnectionClosed:
+            self._cancel_scope.cancel()
+
+    @staticmethod
+    async def _dispatch(handler, params, session_id):
+        # A failing handler must not tear down the whole channel
+        try:
+            await handler(params, session_id)
+        except (CdpError, trio.TooSlowError, trio_websocket.ConnectionClosed) as error:
+            print(f"cdp: {handler.__qualname__} failed: {error}", file=sys.stderr)
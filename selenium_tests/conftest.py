@@ -0,0 +1,132 @@
+"""pytest hooks for the Selenium suite"""
+import pytest
+from _pytest.runner import runtestprotocol
+
+import history
+import network_trace
+import perf_report
+import result_cache
+from tiers import tier_of
+
+# nodeid -> history test id (module.Class.test_name, as parallel_runner names them)
+history_ids = {}
+
+# Outcomes of this session, added to the history store when it finishes
+history_records = []
+
+
+def pytest_addoption(parser):
+    parser.addoption("--force-run", action="store_true", help="run tests even when the result cache has a pass")
+    parser.addoption("--tier", type=int, default=None, help="only run tests up to this tier (0: static, no browser)")
+    parser.addoption("--reruns", type=int, default=history.RERUNS,
+                     help="times a failed browser test is run again right away (default: %(default)s)")
+
+
+def pytest_configure(config):
+    if config.getoption("--force-run", default=False):
+        result_cache.FORCE = True
+    network_trace.run_id()
+
+
+def _tier(item):
+    test_case = getattr(item, "_testcase", None)
+    if test_case is None and getattr(item, "cls", None) is not None:
+        test_case = item.cls(item.name)
+    return tier_of(test_case) if test_case is not None else 0
+
+
+def _history_id(item):
+    parts = [item.module.__name__ if item.module else None, item.cls.__name__ if item.cls else None, item.name]
+    return ".".join(part for part in parts if part)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Run the static tier before any test that starts a browser; quarantined tests may fail"""
+    with history.History() as store:
+        quarantined = store.quarantined()
+    for item in items:
+        history_ids[item.nodeid] = test_id = _history_id(item)
+        if test_id in quarantined:
+            item.add_marker(pytest.mark.xfail(reason=f"quarantined: {quarantined[test_id]}", strict=False))
+    max_tier = config.getoption("--tier", default=None)
+    tiers = {item: _tier(item) for item in items}
+    if max_tier is not None:
+        deselected = [item for item in items if tiers[item] > max_tier]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = [item for item in items if tiers[item] <= max_tier]
+    items.sort(key=lambda item: tiers[item])
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_protocol(item, nextitem):
+    """Run a browser test whose test body failed again at once; the pooled browser it released is still warm"""
+    reruns = item.config.getoption("--reruns", default=0)
+    if reruns <= 0 or _tier(item) == 0:
+        return None
+    item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+    for attempt in range(1, reruns + 2):
+        reports = runtestprotocol(item, nextitem=nextitem, log=False)
+        # Setup and teardown errors are the harness's, not a flaky test body
+        rerun = attempt <= reruns and any(report.when == "call" and report.failed for report in reports)
+        for report in reports:
+            report.attempt = attempt
+            if rerun and report.when == "call":
+                report.outcome = "rerun"
+            item.ihook.pytest_runtest_logreport(report=report)
+        if not rerun:
+            break
+    item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+    return True
+
+
+def pytest_report_teststatus(report):
+    if report.outcome == "rerun":
+        return "rerun", "R", ("RERUN", {"yellow": True})
+    return None
+
+
+def pytest_runtest_logreport(report):
+    test_id = history_ids.get(report.nodeid)
+    if test_id is None or not (report.when == "call" or report.failed):
+        return
+    if report.outcome == "rerun":
+        outcome = "failed"
+    elif hasattr(report, "wasxfail"):
+        outcome = "failed" if report.skipped else "passed"
+    elif report.skipped:
+        outcome = "skipped"
+    elif report.failed:
+        outcome = "failed" if report.when == "call" else "error"
+    else:
+        outcome = "passed"
+    history_records.append({"id": test_id, "outcome": outcome, "duration": round(report.duration, 3),
+                            "attempt": getattr(report, "attempt", 1)})
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Store the outcomes; fail the run when a test got slower than its threshold or a page outgrew its budget"""
+    reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+    if history_records:
+        with history.History() as store:
+            store.record(history_records)
+            added, released = store.update_quarantine()
+        for test_id, reason in added:
+            reporter.write_line(f"QUARANTINE: {test_id} ({reason})", yellow=True)
+        for test_id in released:
+            reporter.write_line(f"RELEASED: {test_id} ran clean {history.RELEASE_RUNS} times", green=True)
+    violations = network_trace.check(network_trace.recorded) if network_trace.recorded else []
+    for violation in violations:
+        reporter.write_line(f"BUDGET: {violation}", red=True)
+    if violations:
+        session.exitstatus = 1
+
+    thresholds = perf_report.load_thresholds()
+    if not thresholds:
+        return
+    perf_report.recorder.end_test()
+    regressions = perf_report.check_thresholds(perf_report.build_report(perf_report.recorder.as_dict()), thresholds)
+    if regressions:
+        for regression in regressions:
+            reporter.write_line(f"REGRESSION: {regression}", red=True)
+        session.exitstatus = 1
@@ -0,0 +1,313 @@
+"""JavaScript coverage index: which tests execute which functions
+
+With SANDBOXPRO_COVERAGE_INDEX=1 every test collects precise function
+coverage through CDP (Profiler.startPreciseCoverage / takePreciseCoverage)
+for the scripts served from the local server. At exit the coverage is
+folded into a gzipped JSON index that maps every function of
+dashboard.js, login.js and script.js to the tests that executed it; a test
+that runs again replaces its previous row, so the index is updated
+incrementally by partial runs and parallel workers alike.
+
+`select` maps the line ranges of a git diff to the innermost function
+containing them and prints (or runs) only the tests that executed those
+functions. Anything it cannot map precisely selects conservatively:
+changes outside any function select every test that loaded the file,
+a file version the index has not seen selects everything that loaded
+it, and changes to HTML, CSS or the harness select the whole suite.
+
+Usage:
+    python selenium_tests/coverage_index.py select [--base REV] [--run [-n WORKERS]]
+    python selenium_tests/coverage_index.py stats
+"""
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+
+from selenium.common.exceptions import WebDriverException
+
+from util import locked
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+ENABLED = os.environ.get("SANDBOXPRO_COVERAGE_INDEX") == "1"
+
+INDEX_FILE = os.environ.get("SANDBOXPRO_COVERAGE_INDEX_FILE", os.path.join(HERE, ".coverage_index.json.gz"))
+
+# Changes to these never affect a test run
+IGNORED_SUFFIXES = (".md", ".txt", ".JPG", ".jpg", ".png")
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@")
+
+# Coverage of the tests run by this process, folded into the index at exit
+_collected = {}
+
+
+def _sha(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def line_starts(text):
+    """UTF-16 offsets at which each line starts, as V8 reports source positions in UTF-16 units"""
+    starts = [0]
+    offset = 0
+    for character in text:
+        offset += 2 if ord(character) > 0xFFFF else 1
+        if character == "\n":
+            starts.append(offset)
+    return starts
+
+
+def offset_to_line(starts, offset):
+    """1-based line of a UTF-16 offset"""
+    low, high = 0, len(starts) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if starts[middle] <= offset:
+            low = middle
+        else:
+            high = middle - 1
+    return low + 1
+
+
+def start(driver):
+    """Begin collecting function call counts for the next test"""
+    driver.execute_cdp_cmd("Profiler.enable", {})
+    driver.execute_cdp_cmd("Profiler.startPreciseCoverage", {"callCount": True, "detailed": False})
+
+
+def collect(test_id, driver, base_url, extra_scripts=()):
+    """Take the coverage of the finished test and stop collecting
+
+    `extra_scripts` is coverage taken from other pages of the test, e.g. by a RoleMatrix.
+    """
+    try:
+        result = driver.execute_cdp_cmd("Profiler.takePreciseCoverage", {})["result"] + list(extra_scripts)
+        driver.execute_cdp_cmd("Profiler.stopPreciseCoverage", {})
+        driver.execute_cdp_cmd("Profiler.disable", {})
+    except WebDriverException:
+        return
+    if not _collected:
+        atexit.register(save)
+    _collected[test_id] = file_coverage(result, base_url)
+
+
+def file_coverage(result, base_url):
+    """{path: {"sha", "functions": [[name, start_line, end_line, count], ...]}} for local scripts"""
+    prefix = base_url.rstrip("/") + "/"
+    files = {}
+    for script in result:
+        url = script["url"].split("?")[0].split("#")[0]
+        if not url.startswith(prefix) or not url.endswith(".js"):
+            continue
+        path = url[len(prefix):]
+        try:
+            with open(os.path.join(ROOT, path), "rb") as source:
+                data = source.read()
+        except OSError:
+            continue
+        starts = line_starts(data.decode("utf-8", "replace"))
+        entry = files.setdefault(path, {"sha": _sha(data), "functions": []})
+        for function in script["functions"]:
+            extent = function["ranges"][0]
+            # The script's top-level code spans the whole file and is not a function
+            if extent["startOffset"] == 0 and not function["functionName"]:
+                continue
+            entry["functions"].append([
+                function["functionName"],
+                offset_to_line(starts, extent["startOffset"]),
+                offset_to_line(starts, max(extent["startOffset"], extent["endOffset"] - 1)),
+                extent["count"],
+            ])
+    return files
+
+
+class CoverageIndex:
+    """Function tables per file version and, per file, the functions each test executed
+
+    Stored as {"tests": [test ids], "files": {path: {"sha", "functions": [[name, first, last]],
+    "stale": [test numbers]}}, "coverage": {path: {test number: [function numbers]}}}.
+    """
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.tests = data.get("tests", [])
+        self.files = data.get("files", {})
+        self.coverage = data.get("coverage", {})
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        try:
+            with gzip.open(path, "rt") as index:
+                return cls(json.load(index))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=INDEX_FILE):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(temporary, "wt") as out:
+            json.dump({"tests": self.tests, "files": self.files, "coverage": self.coverage}, out,
+                      separators=(",", ":"))
+        os.replace(temporary, path)
+
+    def _test_number(self, test_id):
+        if test_id not in self.tests:
+            self.tests.append(test_id)
+        return str(self.tests.index(test_id))
+
+    def update(self, test_id, files):
+        """Replace the row of `test_id` with the coverage of its latest run"""
+        number = self._test_number(test_id)
+        for path, rows in self.coverage.items():
+            rows.pop(number, None)
+        for entry in self.files.values():
+            if int(number) in entry["stale"]:
+                entry["stale"].remove(int(number))
+
+        for path, current in files.items():
+            entry = self.files.get(path)
+            if entry is None or entry["sha"] != current["sha"]:
+                # Rows recorded against the previous version no longer line up with its lines
+                stale = sorted(set(entry["stale"] if entry else []) |
+                               {int(test) for test in self.coverage.get(path, {})})
+                entry = self.files[path] = {"sha": current["sha"], "functions": [], "stale": stale}
+                self.coverage[path] = {}
+            table = {tuple(function): position for position, function in enumerate(entry["functions"])}
+            executed = set()
+            for name, first, last, count in current["functions"]:
+                key = (name, first, last)
+                if key not in table:
+                    table[key] = len(entry["functions"])
+                    entry["functions"].append([name, first, last])
+                if count:
+                    executed.add(table[key])
+            self.coverage.setdefault(path, {})[number] = sorted(executed)
+
+    def innermost(self, path, line):
+        """Number of the smallest known function spanning `line`, or None at top level"""
+        best = None
+        for number, (_, first, last) in enumerate(self.files[path]["functions"]):
+            if first <= line <= last and (best is None or last - first < best[1]):
+                best = (number, last - first)
+        return None if best is None else best[0]
+
+    def tests_for_change(self, path, sha, lines):
+        """Test ids affected by changing `lines` of the version of `path` with hash `sha`"""
+        entry = self.files.get(path)
+        if entry is None:
+            return None
+        rows = self.coverage.get(path, {})
+        selected = set(entry["stale"])
+        loaded = {int(test) for test in rows}
+        if entry["sha"] != sha:
+            selected |= loaded
+        else:
+            for line in lines:
+                function = self.innermost(path, line)
+                if function is None:
+                    selected |= loaded
+                else:
+                    selected |= {int(test) for test, functions in rows.items() if function in functions}
+        return {self.tests[number] for number in selected}
+
+
+def save(path=INDEX_FILE):
+    with locked(path):
+        index = CoverageIndex.load(path)
+        for test_id, files in _collected.items():
+            index.update(test_id, files)
+        index.save(path)
+    print(f"coverage index: {len(_collected)} tests updated, {len(index.tests)} indexed", file=sys.stderr)
+
+
+def changed_lines(diff):
+    """{path: [old-side line numbers]} from `git diff -U0` output"""
+    changes = {}
+    path = None
+    for line in diff.splitlines():
+        if line.startswith("--- "):
+            path = None if line[4:] == "/dev/null" else line[4:].removeprefix("a/")
+            if path is not None:
+                changes.setdefault(path, [])
+        elif line.startswith("+++ ") and path is None:
+            # A new file; there is nothing to look up, but it still changed
+            path = line[4:].removeprefix("b/")
+            changes.setdefault(path, [])
+            path = None
+        elif path is not None:
+            match = HUNK_HEADER.match(line)
+            if match:
+                first = int(match.group(1))
+                count = 1 if match.group(2) is None else int(match.group(2))
+                # A pure insertion sits between line `first` and the next one
+                changes[path].extend([first, first + 1] if count == 0 else range(first, first + count))
+    return changes
+
+
+def _git(*args):
+    return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, check=True).stdout
+
+
+def select(index, base, all_tests):
+    """Test ids impacted by the changes between `base` and the working tree"""
+    changes = changed_lines(_git("diff", "-U0", "--no-color", base).decode("utf-8", "replace"))
+    selected = set()
+    for path, lines in changes.items():
+        if path.endswith(IGNORED_SUFFIXES):
+            continue
+        module = os.path.basename(path)[:-3] if path.endswith(".py") else None
+        if module and module.startswith("test_") and path.startswith("selenium_tests/"):
+            selected |= {test_id for test_id in all_tests if test_id.startswith(module + ".")}
+            continue
+        tests = None
+        if path.endswith(".js") and path in index.files:
+            try:
+                sha = _sha(_git("show", f"{base}:{path}"))
+            except subprocess.CalledProcessError:
+                sha = None
+            tests = index.tests_for_change(path, sha, lines)
+        if tests is None:
+            print(f"  {path}: not mapped by the coverage index, selecting every test", file=sys.stderr)
+            return set(all_tests)
+        print(f"  {path}: {len(tests)} tests", file=sys.stderr)
+        selected |= tests
+    return selected & set(all_tests)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("select", "stats"))
+    parser.add_argument("--base", default="HEAD", help="revision the working tree is compared with")
+    parser.add_argument("--run", action="store_true", help="run the selected tests with the parallel runner")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+    # Imported here: base.py imports this module in every test process, which has no use for the runner
+    import parallel_runner
+
+    index = CoverageIndex.load()
+    if args.command == "stats":
+        size = os.path.getsize(INDEX_FILE) if os.path.exists(INDEX_FILE) else 0
+        print(f"{len(index.tests)} tests, {size} bytes in {INDEX_FILE}")
+        for path, entry in sorted(index.files.items()):
+            print(f"  {path}: {len(entry['functions'])} functions, {len(index.coverage.get(path, {}))} tests, "
+                  f"{len(entry['stale'])} stale")
+        return 0
+
+    tests = sorted(select(index, args.base, parallel_runner.discover()))
+    if not args.run:
+        print("\n".join(tests))
+        return 0
+    if not tests:
+        print("No tests are affected by the changes")
+        return 0
+    return parallel_runner.main(["-n", str(args.workers), *tests])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
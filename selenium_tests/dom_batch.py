@@ -0,0 +1,121 @@
+"""Resolve many element properties in one WebDriver round trip
+
+Every find_element / .text / .is_displayed() call is a separate HTTP
+request to chromedriver. query() takes a map of names to probes
+(locator + property) and answers all of them with a single
+execute_script call:
+
+    values = dom_batch.query(driver, {
+        'sandboxes': dom_batch.text(By.ID, "activeSandboxes"),
+        'menu_open': dom_batch.displayed(By.ID, "userDropdown"),
+        'badge': dom_batch.css(By.ID, "notificationBadge", "display"),
+    })
+
+A probe whose element does not exist resolves to None (False for
+`exists`).
+"""
+import atexit
+import sys
+from collections import namedtuple
+
+Probe = namedtuple("Probe", "by value prop arg")
+
+
+def text(by, value):
+    return Probe(by, value, "text", None)
+
+
+def displayed(by, value):
+    return Probe(by, value, "displayed", None)
+
+
+def selected(by, value):
+    return Probe(by, value, "selected", None)
+
+
+def exists(by, value):
+    return Probe(by, value, "exists", None)
+
+
+def attribute(by, value, name):
+    return Probe(by, value, "attribute", name)
+
+
+def css(by, value, name):
+    return Probe(by, value, "css", name)
+
+
+# WebDriver commands the same probe costs when done one by one (find + read)
+UNBATCHED_COST = {"text": 2, "displayed": 2, "selected": 2, "exists": 1, "attribute": 2, "css": 2}
+
+# Locator and displayedness helpers shared with the wait engine
+ELEMENT_JS = r"""
+function find(by, value) {
+    switch (by) {
+        case 'id': return document.getElementById(value);
+        case 'css selector': return document.querySelector(value);
+        case 'tag name': return document.getElementsByTagName(value)[0] || null;
+        case 'class name': return document.getElementsByClassName(value)[0] || null;
+        case 'name': return document.getElementsByName(value)[0] || null;
+        case 'link text':
+            return Array.from(document.links).find(link => link.innerText.trim() === value) || null;
+        case 'xpath':
+            return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    throw new Error('unsupported locator strategy: ' + by);
+}
+
+// Same rules as WebDriver's displayedness check for the cases these pages use
+function isDisplayed(element) {
+    if (!element.isConnected) return false;
+    for (let node = element; node && node.nodeType === 1; node = node.parentElement) {
+        const style = getComputedStyle(node);
+        if (style.display === 'none') return false;
+        if (node === element && (style.visibility === 'hidden' || style.visibility === 'collapse')) return false;
+        if (style.opacity === '0') return false;
+    }
+    const rect = element.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+}
+"""
+
+QUERY_SCRIPT = ELEMENT_JS + r"""
+const probes = arguments[0];
+const results = {};
+for (const [name, [by, value, prop, arg]] of Object.entries(probes)) {
+    const element = find(by, value);
+    if (prop === 'exists') { results[name] = element !== null; continue; }
+    if (element === null) { results[name] = null; continue; }
+    switch (prop) {
+        case 'text': results[name] = isDisplayed(element) ? element.innerText.trim() : ''; break;
+        case 'displayed': results[name] = isDisplayed(element); break;
+        case 'selected': results[name] = Boolean(element.checked || element.selected); break;
+        case 'attribute':
+            results[name] = (arg === 'value' || arg === 'checked') ? String(element[arg]) : element.getAttribute(arg);
+            break;
+        case 'css': results[name] = getComputedStyle(element).getPropertyValue(arg); break;
+    }
+}
+return results;
+"""
+
+# Round trips saved per test id
+saved_round_trips = {}
+
+
+def query(driver, probes, test_id=None):
+    """Resolve every probe with one execute_script call and return {name: value}"""
+    results = driver.execute_script(QUERY_SCRIPT, {name: list(probe) for name, probe in probes.items()})
+    if test_id is not None:
+        saved = sum(UNBATCHED_COST[probe.prop] for probe in probes.values()) - 1
+        if not saved_round_trips:
+            atexit.register(_report)
+        saved_round_trips[test_id] = saved_round_trips.get(test_id, 0) + saved
+    return results
+
+
+def _report():
+    total = sum(saved_round_trips.values())
+    print(f"dom batch: {total} WebDriver round trips saved in {len(saved_round_trips)} tests", file=sys.stderr)
+    for test_id, saved in sorted(saved_round_trips.items(), key=lambda item: -item[1]):
+        print(f"  {saved:>4}  {test_id}", file=sys.stderr)
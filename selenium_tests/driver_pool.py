@@ -0,0 +1,255 @@
+"""Pool of warm headless Chrome drivers shared by the Selenium test classes
+
+Starting Chrome is the most expensive thing a test does, so drivers are
+kept alive between tests and handed out again after their browser state
+has been reset. The pool lives for the whole session by default; set
+SANDBOXPRO_POOL_SCOPE=class to drain it after every test class instead.
+A browser that does have to be started gets a copy of the primed profile
+template (profile_template.py) when that cache can serve it anything.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+import cdn_cache
+import profile_template
+
+# Number of idle drivers kept warm between tests
+POOL_SIZE = int(os.environ.get("SANDBOXPRO_POOL_SIZE", "2"))
+
+# "session" keeps drivers until the interpreter exits, "class" drains after each test class
+POOL_SCOPE = os.environ.get("SANDBOXPRO_POOL_SCOPE", "session")
+
+# Optional path the pool statistics are written to as JSON on exit
+POOL_REPORT = os.environ.get("SANDBOXPRO_POOL_REPORT")
+
+# Start browsers on this WebDriver endpoint (chromedriver or a grid node) instead of locally
+WEBDRIVER_URL = os.environ.get("SANDBOXPRO_WEBDRIVER_URL")
+
+WINDOW_SIZE = (1280, 720)
+
+# Async script timeout in seconds (chromedriver's default); waits and benchmarks raise it for themselves
+SCRIPT_TIMEOUT = 30
+
+
+def chrome_options(profile_dir=None):
+    """Build the Chrome options every pooled browser is started with"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}")
+    if profile_dir:
+        # A copy of the primed profile template instead of an empty profile
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    # Network events tell the result cache which page assets a test loaded
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return chrome_options
+
+
+class RemoteChrome(webdriver.Remote):
+    """Chrome on a WebDriver endpoint, with the execute_cdp_cmd the harness relies on"""
+
+    def __init__(self, url, options):
+        super().__init__(command_executor=ChromiumRemoteConnection(url, "goog", "chrome"), options=options)
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.execute("executeCdpCommand", {"cmd": cmd, "params": cmd_args})["value"]
+
+
+def start_driver():
+    """Start a new headless Chrome driver"""
+    if WEBDRIVER_URL:
+        driver = RemoteChrome(WEBDRIVER_URL, chrome_options())
+    else:
+        profile_dir = profile_template.clone()
+        try:
+            driver = webdriver.Chrome(options=chrome_options(profile_dir))
+        except WebDriverException:
+            profile_template.discard(profile_dir)
+            raise
+        driver.sandboxpro_profile_dir = profile_dir
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+    # Serve Tailwind, Font Awesome and Google Fonts from the local asset cache
+    cdn_cache.install(driver)
+    return driver
+
+
+def reset_state(driver):
+    """Bring a used driver back to a clean state so the next test can reuse it"""
+    # Dismiss any alert left open (e.g. the empty sandbox name alert)
+    try:
+        driver.switch_to.alert.dismiss()
+    except NoAlertPresentException:
+        pass
+
+    # Close extra windows and tabs opened by the test
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    # Clear the stored session (sandboxProUser) and cookies for the current origin
+    if driver.current_url.startswith("http"):
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        driver.delete_all_cookies()
+
+    # Leaving the page drops open modals, toasts and running timers
+    driver.get("about:blank")
+    driver.set_window_size(*WINDOW_SIZE)
+    # Waiter.until and the benchmarks change it; the next borrower gets the default back
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+
+
+class PoolStats:
+    """Counters describing how well the pool is doing"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.startup_times = []
+        self.reset_times = []
+
+    @property
+    def total_startup(self):
+        return sum(self.startup_times)
+
+    @property
+    def mean_startup(self):
+        return self.total_startup / len(self.startup_times) if self.startup_times else 0.0
+
+    @property
+    def estimated_saving(self):
+        """Startup time avoided by reusing warm drivers, minus the time spent resetting them"""
+        return self.hits * self.mean_startup - sum(self.reset_times)
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "startup_count": len(self.startup_times),
+            "startup_total_s": round(self.total_startup, 3),
+            "startup_mean_s": round(self.mean_startup, 3),
+            "startup_max_s": round(max(self.startup_times, default=0.0), 3),
+            "reset_total_s": round(sum(self.reset_times), 3),
+            "estimated_saving_s": round(self.estimated_saving, 3),
+        }
+
+    def summary(self):
+        return (
+            f"driver pool: {self.hits} hits, {self.misses} misses, {self.discarded} discarded; "
+            f"startup mean {self.mean_startup:.2f}s (total {self.total_startup:.2f}s); "
+            f"estimated saving {self.estimated_saving:.2f}s"
+        )
+
+
+class DriverPool:
+    """Hands out warm drivers and takes them back after each test"""
+
+    def __init__(self, size=POOL_SIZE, factory=start_driver):
+        self.size = size
+        self.factory = factory
+        self.stats = PoolStats()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Return an idle driver, starting a new browser when none is available"""
+        with self._lock:
+            if self._idle:
+                self.stats.hits += 1
+                return self._idle.pop()
+            self.stats.misses += 1
+
+        started = time.perf_counter()
+        driver = self.factory()
+        self.stats.startup_times.append(time.perf_counter() - started)
+        return driver
+
+    def release(self, driver):
+        """Reset a driver and keep it warm, or quit it if it is broken or the pool is full"""
+        started = time.perf_counter()
+        try:
+            reset_state(driver)
+        except WebDriverException:
+            self.stats.discarded += 1
+            self._quit(driver)
+            return
+        self.stats.reset_times.append(time.perf_counter() - started)
+
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(driver)
+                return
+        self._quit(driver)
+
+    def discard(self, driver):
+        """Quit a driver that must not be reused, e.g. after its test failed to set up"""
+        self.stats.discarded += 1
+        self._quit(driver)
+
+    def drain(self):
+        """Quit every idle driver"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+    @staticmethod
+    def _quit(driver):
+        cdn_cache.uninstall(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+        profile_template.discard(getattr(driver, "sandboxpro_profile_dir", None))
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = DriverPool()
+        atexit.register(_shutdown)
+    return _pool
+
+
+def acquire():
+    return get_pool().acquire()
+
+
+def release(driver):
+    get_pool().release(driver)
+
+
+def discard(driver):
+    get_pool().discard(driver)
+
+
+def end_class():
+    """Called from tearDownClass; drains the pool when it is class scoped"""
+    if POOL_SCOPE == "class" and _pool is not None:
+        _pool.drain()
+
+
+def _shutdown():
+    _pool.drain()
+    print(_pool.stats.summary(), file=sys.stderr)
+    if POOL_REPORT:
+        with open(POOL_REPORT, "w") as report:
+            json.dump(_pool.stats.as_dict(), report, indent=2)
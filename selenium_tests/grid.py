@@ -0,0 +1,426 @@
+"""Distribute the browser tests over remote WebDriver nodes
+
+parallel_runner.py is bounded by the cores of one machine. grid.py runs
+the browser tests on a list of WebDriver endpoints (chromedriver
+instances or Selenium Grid nodes), each with a number of browser slots:
+
+- every node is health checked through GET /status before it gets work,
+  and periodically while the run lasts
+- every slot is a worker process whose browsers are started on its node
+  (SANDBOXPRO_WEBDRIVER_URL) and kept warm between its tests; a test that
+  fails is run again right away in its slot (parallel_runner --reruns)
+- tests are planned longest-first onto one queue per slot; a slot that
+  runs out of work steals from the back of the queue with the most
+  estimated time left
+- when a node stops answering, the tests it was running are requeued (up
+  to MAX_ATTEMPTS runs per test) and its queued tests are stolen by the
+  slots of the remaining nodes
+
+`standin` starts several local chromedriver instances on consecutive
+ports, a stand-in grid to try the distribution on one Linux box.
+
+Remote nodes must be able to load the pages: point SANDBOXPRO_BASE_URL at
+a deployment they can reach, the embedded server only listens on 127.0.0.1.
+
+Usage:
+    python selenium_tests/grid.py run --node http://host-a:9515*4 --node http://host-b:9515*2 [TEST_ID ...]
+    python selenium_tests/grid.py run --standin 3 [--capacity 2] [TEST_ID ...]
+    python selenium_tests/grid.py standin [--nodes 3] [--port 9515]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+
+import parallel_runner
+import perf_report
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Comma separated nodes, each "URL" or "URL*CAPACITY", used when no --node is given
+GRID_NODES = os.environ.get("SANDBOXPRO_GRID_NODES", "")
+
+# Seconds between health checks of the nodes
+HEALTH_INTERVAL = float(os.environ.get("SANDBOXPRO_GRID_HEALTH_INTERVAL", "5"))
+
+HEALTH_TIMEOUT = 3
+
+# Runs of a test before it is reported as lost with its nodes
+MAX_ATTEMPTS = 3
+
+STANDIN_PORT = 9515
+
+
+class Node:
+    """A WebDriver endpoint and the number of browsers it may run at once"""
+
+    def __init__(self, url, capacity=1):
+        self.url = url.rstrip("/")
+        self.capacity = capacity
+        self.alive = True
+        self.completed = 0
+        self.stolen = 0
+        self.requeued = 0
+
+    def healthy(self):
+        """True when GET /status answers that the node accepts new sessions"""
+        try:
+            with urllib.request.urlopen(f"{self.url}/status", timeout=HEALTH_TIMEOUT) as response:
+                status = json.load(response)
+        except (OSError, ValueError):
+            return False
+        return bool(status.get("value", {}).get("ready"))
+
+    def as_dict(self):
+        return {"url": self.url, "capacity": self.capacity, "alive": self.alive, "completed": self.completed,
+                "stolen": self.stolen, "requeued": self.requeued}
+
+
+def parse_node(spec):
+    """Node from "URL" or "URL*CAPACITY" """
+    url, _, capacity = spec.partition("*")
+    return Node(url, int(capacity) if capacity else 1)
+
+
+class WorkQueues:
+    """Longest-first queue per slot; idle slots steal, lost tests are retried first"""
+
+    def __init__(self, slots, test_ids, durations):
+        shards = parallel_runner.plan_shards(test_ids, len(slots), durations)
+        shards += [[] for _ in range(len(slots) - len(shards))]
+        self.queues = {slot: deque(shard) for slot, shard in zip(slots, shards)}
+        known = sorted(durations.values())
+        fallback = known[len(known) // 2] if known else parallel_runner.DEFAULT_DURATION
+        self._estimate = lambda test_id: durations.get(test_id, fallback)
+        self.retry = deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def _load(self, queue):
+        return sum(self._estimate(test_id) for test_id in queue)
+
+    def _take(self, slot):
+        if self.retry:
+            return self.retry.popleft(), False
+        if self.queues[slot]:
+            return self.queues[slot].popleft(), False
+        victim = max((queue for queue in self.queues.values() if queue), key=self._load, default=None)
+        if victim is None:
+            return None, False
+        # The back of a longest-first queue holds its shortest tests
+        return victim.pop(), True
+
+    def next(self, slot):
+        """(test id, stolen) for `slot`; waits while lost tests may still come back, None when done"""
+        with self._condition:
+            while True:
+                test_id, stolen = self._take(slot)
+                if test_id is not None:
+                    self._in_flight += 1
+                    return test_id, stolen
+                if not self._in_flight:
+                    return None, False
+                self._condition.wait()
+
+    def done(self, test_id, requeue=False):
+        with self._condition:
+            self._in_flight -= 1
+            if requeue:
+                self.retry.append(test_id)
+            self._condition.notify_all()
+
+    def wake(self):
+        """Let slots waiting for requeued tests look again"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def remaining(self):
+        with self._condition:
+            left = list(self.retry)
+            for queue in self.queues.values():
+                left.extend(queue)
+            return left
+
+
+class WorkerLost(Exception):
+    """The worker process or its node went away while running a test"""
+
+
+def _slot_main(url, connection):
+    """Worker process of one slot: run each test id it receives, send back the records"""
+    # Read by driver_pool when the tests import it
+    os.environ["SANDBOXPRO_WEBDRIVER_URL"] = url
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    while True:
+        test_id = connection.recv()
+        if test_id is None:
+            connection.send(perf_report.recorder.as_dict())
+            return
+        records, _ = parallel_runner.run_shard([test_id])
+        connection.send(records)
+
+
+class SlotWorker:
+    """Worker process that starts its browsers on one node and runs one test at a time"""
+
+    def __init__(self, node):
+        self.node = node
+        context = multiprocessing.get_context("spawn")
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_slot_main, args=(node.url, child), daemon=True)
+        self.process.start()
+        child.close()
+
+    def run(self, test_id):
+        """Records of running `test_id`; raises WorkerLost if the process or the node goes away"""
+        try:
+            self.connection.send(test_id)
+            while not self.connection.poll(0.5):
+                if not self.node.alive or not self.process.is_alive():
+                    raise WorkerLost(f"{test_id} lost on {self.node.url}")
+            return self.connection.recv()
+        except (EOFError, OSError) as error:
+            raise WorkerLost(f"{test_id} lost on {self.node.url}: {error}") from error
+
+    def kill(self):
+        """Stop a worker whose test was lost; its timings are dropped"""
+        self.process.terminate()
+        self.process.join(5)
+
+    def close(self):
+        """Stop the worker and return its timing data, or None if it is gone"""
+        timings = None
+        try:
+            if self.process.is_alive():
+                self.connection.send(None)
+                if self.connection.poll(30):
+                    timings = self.connection.recv()
+        except (EOFError, OSError):
+            pass
+        finally:
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process.join(5)
+        return timings
+
+
+class GridRun:
+    """Runs test ids over the slots of the healthy nodes until every test ran or all nodes died"""
+
+    def __init__(self, nodes, worker_factory=SlotWorker, health_interval=HEALTH_INTERVAL, max_attempts=MAX_ATTEMPTS):
+        self.nodes = nodes
+        self.worker_factory = worker_factory
+        self.health_interval = health_interval
+        self.max_attempts = max_attempts
+        self.records = []
+        self.timings = []
+        self.attempts = {}
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def run(self, test_ids, durations):
+        for node in self.nodes:
+            node.alive = node.healthy()
+            if not node.alive:
+                print(f"grid: {node.url} failed its health check, not using it", file=sys.stderr)
+        slots = [(node, index) for node in self.nodes if node.alive for index in range(node.capacity)]
+        if not slots:
+            print("grid: no healthy WebDriver node", file=sys.stderr)
+            return [self._not_run(test_id) for test_id in test_ids], perf_report.merge([])
+        self.queues = WorkQueues(slots, test_ids, durations)
+
+        monitor = threading.Thread(target=self._monitor, name="grid-health", daemon=True)
+        monitor.start()
+        threads = [threading.Thread(target=self._drive, args=(slot,), name=f"grid-{slot[0].url}-{slot[1]}")
+                   for slot in slots]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._finished.set()
+
+        self.records.extend(self._not_run(test_id) for test_id in self.queues.remaining())
+        return self.records, perf_report.merge(self.timings)
+
+    @staticmethod
+    def _not_run(test_id):
+        return {"id": test_id, "outcome": "error", "duration": 0.0, "message": "not run: no live WebDriver node left",
+                "worker": None}
+
+    def _monitor(self):
+        while not self._finished.wait(self.health_interval):
+            for node in self.nodes:
+                if node.alive and not node.healthy():
+                    self._lose(node)
+
+    def _lose(self, node):
+        if node.alive:
+            node.alive = False
+            print(f"grid: {node.url} stopped answering, requeueing its tests", file=sys.stderr)
+            # Slots waiting for requeued work have to notice the node is gone
+            self.queues.wake()
+
+    def _drive(self, slot):
+        node, _ = slot
+        worker = self.worker_factory(node)
+        try:
+            while node.alive:
+                test_id, stolen = self.queues.next(slot)
+                if test_id is None:
+                    break
+                if not node.alive:
+                    # Never started here, so it does not count as an attempt
+                    self.queues.done(test_id, requeue=True)
+                    break
+                try:
+                    records = worker.run(test_id)
+                except WorkerLost as error:
+                    worker.kill()
+                    # A crashed worker on a live node gets a fresh process
+                    if node.alive and node.healthy():
+                        print(f"grid: {error}, restarting the worker", file=sys.stderr)
+                        worker = self.worker_factory(node)
+                    else:
+                        self._lose(node)
+                    self._requeue(node, test_id)
+                    continue
+                # Errors caused by the node going down are not the test's fault
+                if any(record["outcome"] == "error" for record in records) and not node.healthy():
+                    self._lose(node)
+                    self._requeue(node, test_id)
+                    continue
+                with self._lock:
+                    for record in records:
+                        record["node"] = node.url
+                    self.records.extend(records)
+                    node.completed += 1
+                    node.stolen += stolen
+                self.queues.done(test_id)
+        finally:
+            timings = worker.close()
+            if timings:
+                with self._lock:
+                    self.timings.append(timings)
+
+    def _requeue(self, node, test_id):
+        with self._lock:
+            attempts = self.attempts[test_id] = self.attempts.get(test_id, 0) + 1
+            node.requeued += 1
+            if attempts >= self.max_attempts:
+                self.records.append({"id": test_id, "outcome": "error", "duration": 0.0, "worker": None,
+                                     "message": f"lost with its node {attempts} times", "node": node.url})
+        self.queues.done(test_id, requeue=attempts < self.max_attempts)
+
+
+def chromedriver_path():
+    """chromedriver for the stand-in grid: SANDBOXPRO_CHROMEDRIVER, PATH, then Selenium Manager"""
+    path = os.environ.get("SANDBOXPRO_CHROMEDRIVER") or shutil.which("chromedriver")
+    if path:
+        return path
+    from selenium.webdriver.common.selenium_manager import SeleniumManager
+    import driver_pool
+    return SeleniumManager().driver_location(driver_pool.chrome_options())
+
+
+class StandinGrid:
+    """Several chromedriver processes on consecutive local ports, one node each"""
+
+    def __init__(self, count=3, port=STANDIN_PORT, capacity=2):
+        self.nodes = [Node(f"http://127.0.0.1:{port + index}", capacity) for index in range(count)]
+        self.processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        path = chromedriver_path()
+        for node in self.nodes:
+            port = node.url.rsplit(":", 1)[1]
+            self.processes.append(subprocess.Popen([path, f"--port={port}"], stdout=subprocess.DEVNULL,
+                                                   stderr=subprocess.DEVNULL))
+        deadline = time.monotonic() + 20
+        for node in self.nodes:
+            while not node.healthy():
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"stand-in node {node.url} did not come up")
+                time.sleep(0.1)
+        return self
+
+    def kill(self, index):
+        """Take a node down abruptly, as a crashed machine would"""
+        self.processes[index].kill()
+
+    def stop(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+
+
+def run_on_nodes(nodes, test_ids):
+    """Browser test executor for parallel_runner.main; prints the per-node summary"""
+    grid = GridRun(nodes)
+    records, timings = grid.run(test_ids, parallel_runner.load_durations())
+    for node in nodes:
+        print(f"  {node.url}: {node.completed} tests ({node.stolen} stolen), {node.requeued} requeued"
+              f"{'' if node.alive else ', lost'}")
+    return records, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    run = subcommands.add_parser("run", help="run the suite on WebDriver nodes")
+    run.add_argument("--node", action="append", default=[], help="URL or URL*CAPACITY (repeatable)")
+    run.add_argument("--standin", type=int, default=0, help="start this many local chromedriver nodes")
+    run.add_argument("--capacity", type=int, default=2, help="browsers per stand-in node")
+    run.add_argument("--port", type=int, default=STANDIN_PORT, help="first port of the stand-in nodes")
+    standin = subcommands.add_parser("standin", help="start a stand-in grid and wait")
+    standin.add_argument("--nodes", type=int, default=3)
+    standin.add_argument("--capacity", type=int, default=2)
+    standin.add_argument("--port", type=int, default=STANDIN_PORT)
+    args, rest = parser.parse_known_args(argv)
+
+    if args.command == "standin":
+        with StandinGrid(args.nodes, args.port, args.capacity) as grid:
+            print(" ".join(f"--node {node.url}*{node.capacity}" for node in grid.nodes))
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                return 0
+
+    nodes = [parse_node(spec) for spec in args.node or filter(None, GRID_NODES.split(","))]
+    grid = StandinGrid(args.standin, args.port, args.capacity).start() if args.standin else None
+    try:
+        if grid is not None:
+            nodes += grid.nodes
+        if not nodes:
+            parser.error("no nodes: pass --node, --standin or set SANDBOXPRO_GRID_NODES")
+        capacity = sum(node.capacity for node in nodes)
+        return parallel_runner.main(["-n", str(capacity), *rest],
+                                    execute=lambda test_ids, _workers: run_on_nodes(nodes, test_ids))
+    finally:
+        if grid is not None:
+            grid.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
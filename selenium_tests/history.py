@@ -0,0 +1,239 @@
+"""Per-test outcome and duration history, flake scores and the quarantine lane
+
+Every run of the suite (parallel_runner.py, grid.py or pytest) stores one
+row per test attempt in selenium_tests/.test_history.sqlite
+(SANDBOXPRO_HISTORY). The last WINDOW runs of each test give
+- its duration: the median of its recent runs, used to plan the shards;
+- its flake rate: the share of its recent runs that were flaky, i.e. it
+  failed and then passed on a rerun in the same run, or its outcome
+  differs from both the run before and the run after (a lone failure
+  between passes, or a lone pass between failures). A test that broke
+  and stays broken is not flaky.
+
+A test whose flake rate reaches QUARANTINE_RATE over at least MIN_RUNS
+runs is quarantined: the parallel runner runs it in a separate lane after
+the fast path, and its failures do not fail the run; under pytest it is
+marked xfail. It is released once its last RELEASE_RUNS runs passed at
+the first attempt, and from then on only runs after the release count.
+Tests quarantined by hand stay until released by hand.
+
+Usage:
+    python selenium_tests/history.py report [--window N] [--all]
+    python selenium_tests/history.py quarantine TEST_ID ...
+    python selenium_tests/history.py release TEST_ID ...
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HISTORY_FILE = os.environ.get("SANDBOXPRO_HISTORY", os.path.join(HERE, ".test_history.sqlite"))
+
+# Runs of each test that its duration and flake rate are computed from
+WINDOW = int(os.environ.get("SANDBOXPRO_HISTORY_WINDOW", "20"))
+
+# Flake rate that sends a test to the quarantine lane, once it has at least MIN_RUNS runs
+QUARANTINE_RATE = float(os.environ.get("SANDBOXPRO_QUARANTINE_RATE", "0.2"))
+MIN_RUNS = 5
+
+# Consecutive clean runs after which a quarantined test returns to the fast path
+RELEASE_RUNS = 10
+
+# Times a failed browser test is run again right away, by pytest and the parallel runner
+RERUNS = int(os.environ.get("SANDBOXPRO_RERUNS", "1"))
+
+# Older runs are deleted
+KEEP_RUNS = 500
+
+# Outcomes of tests that actually ran; skipped and cached tests say nothing about flakiness
+RAN = ("passed", "failed", "error")
+FAILED = ("failed", "error")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL,
+    test_id TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    lane TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_test ON results (test_id, run);
+CREATE TABLE IF NOT EXISTS quarantine (
+    test_id TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    pinned INTEGER NOT NULL,
+    released_run INTEGER
+);
+"""
+
+Flakiness = namedtuple("Flakiness", "runs flaky rate")
+
+
+def flakiness(runs):
+    """Flake score of a test from its runs, oldest first, each the list of its attempts' outcomes"""
+    failed = [attempts[-1] in FAILED for attempts in runs]
+    flaky = 0
+    for index, attempts in enumerate(runs):
+        recovered = attempts[-1] == "passed" and any(outcome in FAILED for outcome in attempts)
+        lone = 0 < index < len(runs) - 1 and failed[index - 1] == failed[index + 1] != failed[index]
+        flaky += recovered or lone
+    return Flakiness(len(runs), flaky, flaky / len(runs) if runs else 0.0)
+
+
+class History:
+    """Connection to the history database"""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, records):
+        """Store the records of one run (`attempt` and `lane` default to 1 and "fast"); returns the run id"""
+        with self.connection:
+            run = self.connection.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+            self.connection.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                [(run, record["id"], record.get("attempt", 1), record["outcome"], record["duration"],
+                  record.get("lane", "fast")) for record in records])
+            self.connection.execute("DELETE FROM results WHERE run <= ?", (run - KEEP_RUNS,))
+            self.connection.execute("DELETE FROM runs WHERE id <= ?", (run - KEEP_RUNS,))
+        return run
+
+    def recent(self, window=WINDOW):
+        """{test id: [(run, [outcome of each attempt]) for its last `window` runs, oldest first]}"""
+        placeholders = ", ".join("?" * len(RAN))
+        rows = self.connection.execute(
+            f"SELECT test_id, run, outcome FROM results WHERE outcome IN ({placeholders}) "
+            "ORDER BY test_id, run DESC, attempt", RAN)
+        runs = {}
+        for test_id, run, outcome in rows:
+            test_runs = runs.setdefault(test_id, [])
+            if test_runs and test_runs[-1][0] == run:
+                test_runs[-1][1].append(outcome)
+            elif len(test_runs) < window:
+                test_runs.append((run, [outcome]))
+        return {test_id: test_runs[::-1] for test_id, test_runs in runs.items()}
+
+    def durations(self, window=WINDOW):
+        """Median duration of every attempt in each test's last `window` runs"""
+        placeholders = ", ".join("?" * len(RAN))
+        rows = self.connection.execute(
+            f"SELECT test_id, run, duration FROM results WHERE outcome IN ({placeholders}) "
+            "ORDER BY test_id, run DESC", RAN)
+        durations = {}
+        runs = {}
+        for test_id, run, duration in rows:
+            seen = runs.setdefault(test_id, set())
+            if run not in seen and len(seen) >= window:
+                continue
+            seen.add(run)
+            durations.setdefault(test_id, []).append(duration)
+        return {test_id: round(statistics.median(values), 3) for test_id, values in durations.items()}
+
+    def flake_rates(self, window=WINDOW):
+        released = self._released()
+        return {test_id: flakiness([attempts for run, attempts in test_runs if run > released.get(test_id, 0)])
+                for test_id, test_runs in self.recent(window).items()}
+
+    def _released(self):
+        return dict(self.connection.execute(
+            "SELECT test_id, released_run FROM quarantine WHERE released_run IS NOT NULL"))
+
+    def quarantined(self):
+        """{test id: reason} of the tests in the quarantine lane"""
+        return dict(self.connection.execute("SELECT test_id, reason FROM quarantine WHERE released_run IS NULL"))
+
+    def quarantine(self, test_ids, reason="quarantined by hand"):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO quarantine VALUES (?, ?, 1, NULL)",
+                                        [(test_id, reason) for test_id in test_ids])
+
+    def release(self, test_ids):
+        """Return tests to the fast path; only their runs from now on count towards quarantine"""
+        last_run = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO quarantine VALUES (?, 'released', 0, ?)",
+                [(test_id, last_run) for test_id in test_ids])
+
+    def update_quarantine(self, window=WINDOW):
+        """Quarantine the tests that got too flaky and release the ones that ran clean; returns both"""
+        pinned = dict(self.connection.execute(
+            "SELECT test_id, pinned FROM quarantine WHERE released_run IS NULL"))
+        released = self._released()
+        added, freed = [], []
+        for test_id, test_runs in self.recent(window).items():
+            runs = [attempts for run, attempts in test_runs if run > released.get(test_id, 0)]
+            if test_id not in pinned:
+                score = flakiness(runs)
+                if score.runs >= MIN_RUNS and score.rate >= QUARANTINE_RATE:
+                    added.append((test_id, f"flake rate {score.rate:.0%} over {score.runs} runs"))
+            elif not pinned[test_id] and len(runs) >= RELEASE_RUNS \
+                    and all(attempts == ["passed"] for attempts in runs[-RELEASE_RUNS:]):
+                freed.append(test_id)
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO quarantine VALUES (?, ?, 0, NULL)", added)
+        self.release(freed)
+        return added, freed
+
+
+def report(store, window=WINDOW, everything=False):
+    """One line per test with its flake rate and median duration, flakiest first"""
+    rates = store.flake_rates(window)
+    durations = store.durations(window)
+    quarantined = store.quarantined()
+    lines = []
+    for test_id, score in sorted(rates.items(), key=lambda item: (-item[1].rate, item[0])):
+        if not (everything or score.flaky or test_id in quarantined):
+            continue
+        line = (f"{score.rate:5.0%}  {score.flaky:>2}/{score.runs:<2} runs  {durations.get(test_id, 0.0):7.2f}s  "
+                f"{test_id}")
+        if test_id in quarantined:
+            line += f"  [quarantined: {quarantined[test_id]}]"
+        lines.append(line)
+    return "\n".join(lines) or "no flaky tests"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    report_parser = subcommands.add_parser("report", help="flake rates and durations of the recent runs")
+    report_parser.add_argument("--window", type=int, default=WINDOW, help="runs per test to look at")
+    report_parser.add_argument("--all", action="store_true", help="list the tests that were never flaky too")
+    quarantine_parser = subcommands.add_parser("quarantine", help="move tests to the quarantine lane for good")
+    quarantine_parser.add_argument("tests", nargs="+")
+    release_parser = subcommands.add_parser("release", help="return tests to the fast path")
+    release_parser.add_argument("tests", nargs="+")
+    args = parser.parse_args(argv)
+
+    with History() as store:
+        if args.command == "report":
+            print(report(store, args.window, args.all))
+        elif args.command == "quarantine":
+            store.quarantine(args.tests)
+        else:
+            store.release(args.tests)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Keyboard and mouse scripts sent to the page in one batch through CDP
+
+Every send_keys is a chromedriver round trip, and the Konami code test
+alone needed ten. An InputScript collects a whole sequence of key presses,
+chords, text insertion, focus changes, clicks and pauses, then sends it
+at once:
+
+    InputScript(self.driver).keys(Keys.ARROW_UP, Keys.ARROW_UP, ..., "b", "a").send()
+    InputScript(self.driver).focus("#email").insert("admin@sandboxpro.com").chord(Keys.CONTROL, Keys.ENTER).send()
+
+Events go through Input.dispatchKeyEvent / Input.insertText /
+Input.dispatchMouseEvent. They are trusted browser input, so the
+`keydown` listeners of dashboard.js and login.js see the same key, code
+and modifier flags as from a real keyboard. When the driver already has
+a DevTools channel open (the CDN interceptor's), the script runs on it in
+a session attached to the current tab. That costs one WebDriver command,
+to find the tab, however long the script is. Without a channel, e.g. on
+a remote node, every event is sent through execute_cdp_cmd instead.
+
+A step may carry `delay_ms`; the engine waits that long before sending it.
+"""
+import atexit
+import json
+import sys
+import time
+from collections import namedtuple
+
+import trio
+from selenium.webdriver.common.keys import Keys
+
+Step = namedtuple("Step", "method params delay_ms")
+
+# Input.dispatchKeyEvent modifier bits
+MODIFIERS = {"Alt": 1, "Control": 2, "Meta": 4, "Shift": 8}
+
+# key -> (code, windowsVirtualKeyCode, text)
+KEYS = {
+    "Alt": ("AltLeft", 18, ""),
+    "Control": ("ControlLeft", 17, ""),
+    "Meta": ("MetaLeft", 91, ""),
+    "Shift": ("ShiftLeft", 16, ""),
+    "Enter": ("Enter", 13, "\r"),
+    "Escape": ("Escape", 27, ""),
+    "Tab": ("Tab", 9, ""),
+    "Backspace": ("Backspace", 8, ""),
+    "Delete": ("Delete", 46, ""),
+    " ": ("Space", 32, " "),
+    "ArrowUp": ("ArrowUp", 38, ""),
+    "ArrowDown": ("ArrowDown", 40, ""),
+    "ArrowLeft": ("ArrowLeft", 37, ""),
+    "ArrowRight": ("ArrowRight", 39, ""),
+    "Home": ("Home", 36, ""),
+    "End": ("End", 35, ""),
+}
+
+# Selenium's private-use key characters, so tests can keep writing Keys.ARROW_UP
+SELENIUM_KEYS = {
+    Keys.ALT: "Alt", Keys.CONTROL: "Control", Keys.META: "Meta", Keys.SHIFT: "Shift",
+    Keys.ENTER: "Enter", Keys.RETURN: "Enter", Keys.ESCAPE: "Escape", Keys.TAB: "Tab",
+    Keys.BACKSPACE: "Backspace", Keys.DELETE: "Delete", Keys.SPACE: " ",
+    Keys.ARROW_UP: "ArrowUp", Keys.ARROW_DOWN: "ArrowDown", Keys.ARROW_LEFT: "ArrowLeft",
+    Keys.ARROW_RIGHT: "ArrowRight", Keys.HOME: "Home", Keys.END: "End",
+}
+
+stats = {"scripts": 0, "events": 0, "webdriver_commands": 0}
+
+
+def key_name(key):
+    return SELENIUM_KEYS.get(key, key)
+
+
+def key_event(kind, key, modifiers=0):
+    """Params of one keyDown/keyUp; a character key with Control, Alt or Meta held types nothing"""
+    key = key_name(key)
+    if key in KEYS:
+        code, virtual_key, text = KEYS[key]
+    elif len(key) == 1:
+        character = key.upper() if modifiers & MODIFIERS["Shift"] else key
+        if key.isalpha():
+            code, virtual_key = f"Key{key.upper()}", ord(key.upper())
+        elif key.isdigit():
+            code, virtual_key = f"Digit{key}", ord(key)
+        else:
+            code, virtual_key = "", 0
+        key, text = character, character
+    else:
+        raise ValueError(f"unknown key {key!r}")
+    if modifiers & (MODIFIERS["Control"] | MODIFIERS["Alt"] | MODIFIERS["Meta"]):
+        text = ""
+    params = {"type": kind, "key": key, "code": code, "modifiers": modifiers,
+              "windowsVirtualKeyCode": virtual_key, "nativeVirtualKeyCode": virtual_key}
+    if kind == "keyDown":
+        if text:
+            params["text"] = params["unmodifiedText"] = text
+        else:
+            params["type"] = "rawKeyDown"
+    return params
+
+
+class InputScript:
+    """A batch of input events for the page the driver is on"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.steps = []
+
+    def _add(self, method, params, delay_ms=0):
+        self.steps.append(Step(method, params, delay_ms))
+        return self
+
+    def chord(self, *keys, delay_ms=0):
+        """Hold every key but the last, press the last, release in reverse (e.g. Control, Shift, "l")"""
+        names = [key_name(key) for key in keys]
+        modifiers = 0
+        for name in names[:-1]:
+            modifiers |= MODIFIERS[name]
+            self._add("Input.dispatchKeyEvent", key_event("keyDown", name, modifiers), delay_ms)
+            delay_ms = 0
+        self._add("Input.dispatchKeyEvent", key_event("keyDown", names[-1], modifiers), delay_ms)
+        self._add("Input.dispatchKeyEvent", key_event("keyUp", names[-1], modifiers))
+        for name in reversed(names[:-1]):
+            modifiers &= ~MODIFIERS[name]
+            self._add("Input.dispatchKeyEvent", key_event("keyUp", name, modifiers))
+        return self
+
+    def press(self, key, delay_ms=0):
+        return self.chord(key, delay_ms=delay_ms)
+
+    def keys(self, *keys, delay_ms=0):
+        """Press each key in turn, `delay_ms` before each"""
+        for key in keys:
+            self.press(key, delay_ms)
+        return self
+
+    def type(self, text, delay_ms=0):
+        """Type `text` key by key, for pages that listen to the individual keystrokes"""
+        return self.keys(*text, delay_ms=delay_ms)
+
+    def insert(self, text, delay_ms=0):
+        """Insert `text` into the focused field in one event (input events, no keydowns)"""
+        return self._add("Input.insertText", {"text": text}, delay_ms)
+
+    def focus(self, selector, delay_ms=0):
+        return self._add("Runtime.evaluate", {"expression": f"document.querySelector({json.dumps(selector)}).focus()"},
+                         delay_ms)
+
+    def click(self, x, y, delay_ms=0):
+        """Left click at viewport coordinates"""
+        self._add("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": x, "y": y}, delay_ms)
+        for kind in ("mousePressed", "mouseReleased"):
+            self._add("Input.dispatchMouseEvent",
+                      {"type": kind, "x": x, "y": y, "button": "left", "buttons": 1, "clickCount": 1})
+        return self
+
+    def pause(self, ms):
+        return self._add("Runtime.evaluate", {"expression": "0"}, ms)
+
+    def send(self):
+        """Dispatch every step in order; returns the number of events sent"""
+        send(self.driver, self.steps)
+        return len(self.steps)
+
+
+def _session(driver, channel):
+    """CDP session attached to the driver's current tab (chromedriver window handles are target ids)"""
+    sessions = getattr(driver, "sandboxpro_input_sessions", None)
+    if sessions is None:
+        sessions = driver.sandboxpro_input_sessions = {}
+    target_id = driver.current_window_handle
+    if target_id not in sessions:
+        attached = channel.call("Target.attachToTarget", {"targetId": target_id, "flatten": True})
+        sessions[target_id] = attached["sessionId"]
+    return sessions[target_id]
+
+
+async def _dispatch(channel, session_id, steps):
+    for step in steps:
+        if step.delay_ms:
+            await trio.sleep(step.delay_ms / 1000)
+        await channel.execute(step.method, step.params, session_id)
+
+
+def send(driver, steps):
+    if not stats["scripts"]:
+        atexit.register(_report)
+    stats["scripts"] += 1
+    stats["events"] += len(steps)
+    channel = getattr(driver, "sandboxpro_cdn_channel", None)
+    if channel is not None:
+        stats["webdriver_commands"] += 1
+        channel.run(_dispatch, channel, _session(driver, channel), steps)
+        return
+    for step in steps:
+        if step.delay_ms:
+            time.sleep(step.delay_ms / 1000)
+        stats["webdriver_commands"] += 1
+        driver.execute_cdp_cmd(step.method, step.params)
+
+
+def _report():
+    print(f"input engine: {stats['events']} events in {stats['scripts']} scripts, "
+          f"{stats['webdriver_commands']} WebDriver commands", file=sys.stderr)
@@ -0,0 +1,379 @@
+"""Virtual-user load generator built from the login -> dashboard -> create sandbox flow
+
+Each virtual user replays the scenario the Selenium tests cover: open
+login.html, submit the form and land on the dashboard, then create a
+sandbox and wait for its row. A user is a tab in its own browser context
+(own storage, like an incognito window), driven over the raw DevTools
+websocket with no chromedriver session. Hundreds of users therefore fit in
+a few headless Chrome processes, and a single trio event loop per browser
+handles every user in it, which is how cdp.py already drives the role matrix.
+
+Users start at --ramp users per second, spread round-robin over --browsers
+Chrome processes. Each one runs the scenario --iterations times. The
+report gives, per step, the number of completions and failures, the error
+rate, the throughput and the latency percentiles, and it is written as
+JSON. The target is the embedded server for the working tree, or
+SANDBOXPRO_BASE_URL / --base-url for a real deployment. submit_login
+includes login.js's ~3.5 s of simulated delays and create_sandbox includes
+dashboard.js's 2 s, so compare those steps between runs, not with zero.
+
+Usage:
+    python selenium_tests/load_test.py --users 200 --ramp 20 [--browsers 4] [--iterations 2]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import trio
+
+import profile_template
+import static_server
+from base import CREDENTIALS
+from bench_stats import describe, percentile
+from cdp import CdpChannel, CdpError
+from role_matrix import ROLES, SUBMIT_LOGIN_JS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+REPORT_PATH = os.path.join(HERE, "load_report.json")
+
+STEPS = ("open_login", "submit_login", "create_sandbox")
+
+# Seconds a step may take before it counts as failed
+STEP_TIMEOUT = 30
+
+# Seconds to wait for Chrome to print its DevTools address
+BROWSER_START_TIMEOUT = 30
+
+# Open the modal, fill it in and submit; resolves once the new row is in the table
+CREATE_SANDBOX_JS = """new Promise(resolve => {{
+    const name = {name};
+    const body = document.getElementById('sandboxesTableBody');
+    const observer = new MutationObserver(() => {{
+        if (body.textContent.includes(name)) {{
+            observer.disconnect();
+            resolve(body.querySelectorAll('tr').length);
+        }}
+    }});
+    observer.observe(body, {{ childList: true, subtree: true, characterData: true }});
+    document.getElementById('createSandboxBtn').click();
+    document.getElementById('sandboxName').value = name;
+    document.getElementById('sandboxTemplate').value = 'react';
+    document.getElementById('createSandboxForm').requestSubmit();
+}})"""
+
+
+def chrome_path():
+    """Chrome for the virtual users: SANDBOXPRO_CHROME, PATH, then Selenium Manager"""
+    path = os.environ.get("SANDBOXPRO_CHROME")
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+        path = path or shutil.which(name)
+    if path:
+        return path
+    from selenium.webdriver.common.selenium_manager import SeleniumManager
+    import driver_pool
+    options = driver_pool.chrome_options()
+    SeleniumManager().driver_location(options)
+    return options.binary_location
+
+
+def start_offsets(users, ramp):
+    """Seconds after the start at which each user begins, `ramp` users per second"""
+    return [index / ramp if ramp > 0 else 0.0 for index in range(users)]
+
+
+class Browser:
+    """Headless Chrome started without chromedriver, and a CDP channel to it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.process = None
+        self.profile = None
+        self.channel = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        # The template's primed HTTP cache, when one was built; this runner has no WebDriver to build it.
+        # These browsers do not intercept the CDN, so its assets are read from that cache.
+        self.profile = (profile_template.clone(build_missing=False, intercepted=False)
+                        or tempfile.mkdtemp(prefix="sandboxpro-load-"))
+        self.process = subprocess.Popen([
+            self.path, "--headless=new", "--remote-debugging-port=0", f"--user-data-dir={self.profile}",
+            "--no-first-run", "--no-default-browser-check", "--disable-gpu", "--disable-dev-shm-usage",
+            "--disable-background-timer-throttling", "--mute-audio", "about:blank",
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        ws_url = self._devtools_url()
+        # Keep reading stderr so a chatty Chrome never blocks on a full pipe
+        threading.Thread(target=self.process.stderr.read, daemon=True).start()
+        self.channel = CdpChannel(ws_url).start()
+        return self
+
+    def _devtools_url(self):
+        deadline = time.monotonic() + BROWSER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            line = self.process.stderr.readline()
+            if not line and self.process.poll() is not None:
+                break
+            if line.startswith("DevTools listening on "):
+                return line.split(" on ", 1)[1].strip()
+        self.stop()
+        raise RuntimeError(f"{self.path} did not open a DevTools port")
+
+    def stop(self):
+        if self.channel is not None:
+            self.channel.close()
+            self.channel = None
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.profile is not None:
+            shutil.rmtree(self.profile, ignore_errors=True)
+            self.profile = None
+
+
+class LoadStats:
+    """Step latencies and failures from every browser thread"""
+
+    def __init__(self, steps=STEPS):
+        self.latencies = {step: [] for step in steps}
+        self.errors = {step: {} for step in steps}
+        self.scenarios = 0
+        self.lock = threading.Lock()
+
+    def add(self, step, seconds):
+        with self.lock:
+            self.latencies[step].append(seconds * 1000)
+
+    def fail(self, step, error):
+        message = f"{type(error).__name__}: {error}"[:200]
+        with self.lock:
+            self.errors[step][message] = self.errors[step].get(message, 0) + 1
+
+    def scenario_done(self):
+        with self.lock:
+            self.scenarios += 1
+
+    def report(self, wall_time, users):
+        steps = {}
+        for step, latencies in self.latencies.items():
+            failed = sum(self.errors[step].values())
+            attempted = len(latencies) + failed
+            latency = dict(describe(latencies), p90=percentile(latencies, 90))
+            steps[step] = {
+                "ok": len(latencies),
+                "failed": failed,
+                "error_rate": round(failed / attempted, 4) if attempted else 0.0,
+                "per_second": round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+                "latency_ms": {key: round(value, 1) if isinstance(value, float) else value
+                               for key, value in latency.items()},
+                "errors": dict(sorted(self.errors[step].items(), key=lambda item: -item[1])),
+            }
+        attempted = sum(step["ok"] + step["failed"] for step in steps.values())
+        failed = sum(step["failed"] for step in steps.values())
+        return {
+            "users": users,
+            "wall_time_s": round(wall_time, 3),
+            "scenarios": self.scenarios,
+            "scenarios_per_second": round(self.scenarios / wall_time, 3) if wall_time else 0.0,
+            "error_rate": round(failed / attempted, 4) if attempted else 0.0,
+            "steps": steps,
+        }
+
+
+class VirtualUser:
+    """One tab in its own browser context replaying the scenario"""
+
+    def __init__(self, index, channel, base_url, stats, sessions, timeout=STEP_TIMEOUT):
+        self.index = index
+        self.role = ROLES[index % len(ROLES)]
+        self.channel = channel
+        self.base_url = base_url
+        self.stats = stats
+        # Users of this browser by CDP session, to route page events
+        self.sessions = sessions
+        self.timeout = timeout
+        self.context_id = None
+        self.session_id = None
+        self.loaded = trio.Event()
+
+    async def run(self, iterations):
+        execute = self.channel.execute
+        try:
+            created = await execute("Target.createBrowserContext", {"disposeOnDetach": True})
+            self.context_id = created["browserContextId"]
+            target = await execute("Target.createTarget", {"url": "about:blank", "browserContextId": self.context_id})
+            attached = await execute("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+            self.session_id = attached["sessionId"]
+            self.sessions[self.session_id] = self
+            await execute("Page.enable", None, self.session_id)
+        except (CdpError, trio.TooSlowError) as error:
+            self.stats.fail(STEPS[0], error)
+            return
+        try:
+            for iteration in range(iterations):
+                await self._scenario(iteration)
+        finally:
+            with trio.move_on_after(self.timeout) as cleanup:
+                cleanup.shield = True
+                try:
+                    await execute("Target.disposeBrowserContext", {"browserContextId": self.context_id})
+                except CdpError:
+                    pass
+            self.sessions.pop(self.session_id, None)
+
+    async def _scenario(self, iteration):
+        account = CREDENTIALS[self.role]
+        steps = (
+            ("open_login", self._navigate, "login.html"),
+            ("submit_login", self._submit_login, account),
+            ("create_sandbox", self._create_sandbox, f"load-{self.index}-{iteration}"),
+        )
+        for step, action, argument in steps:
+            started = time.perf_counter()
+            try:
+                with trio.fail_after(self.timeout):
+                    await action(argument)
+            except (CdpError, trio.TooSlowError, AssertionError) as error:
+                # The rest of the scenario depends on this step
+                self.stats.fail(step, error)
+                return
+            self.stats.add(step, time.perf_counter() - started)
+        self.stats.scenario_done()
+
+    async def _evaluate(self, expression, await_promise=False):
+        result = await self.channel.execute("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": await_promise,
+        }, self.session_id)
+        if "exceptionDetails" in result:
+            raise AssertionError(result["exceptionDetails"].get("text"))
+        return result["result"].get("value")
+
+    async def _wait_for_page(self, page):
+        while True:
+            await self.loaded.wait()
+            self.loaded = trio.Event()
+            # A load event of the previous document may still have been queued
+            if (await self._evaluate("location.pathname")).endswith("/" + page):
+                return
+
+    async def _navigate(self, page):
+        self.loaded = trio.Event()
+        navigation = await self.channel.execute("Page.navigate", {"url": f"{self.base_url}/{page}"}, self.session_id)
+        if navigation.get("errorText"):
+            raise AssertionError(f"{page}: {navigation['errorText']}")
+        await self._wait_for_page(page)
+
+    async def _submit_login(self, account):
+        await self._evaluate(SUBMIT_LOGIN_JS.format(email=json.dumps(account["email"]),
+                                                    password=json.dumps(account["password"])))
+        await self._wait_for_page("dashboard.html")
+
+    async def _create_sandbox(self, name):
+        await self._evaluate(CREATE_SANDBOX_JS.format(name=json.dumps(name)), await_promise=True)
+
+
+async def run_users(channel, base_url, indexes, offsets, started, iterations, stats, timeout=STEP_TIMEOUT):
+    """Run the users `indexes` of one browser, each from its ramp offset after `started` (time.monotonic)"""
+    sessions = {}
+
+    async def on_load(_params, session_id):
+        user = sessions.get(session_id)
+        if user is not None:
+            user.loaded.set()
+
+    async def one(user):
+        await trio.sleep(max(0.0, started + offsets[user.index] - time.monotonic()))
+        await user.run(iterations)
+
+    channel.on("Page.loadEventFired", on_load)
+    try:
+        async with trio.open_nursery() as nursery:
+            for index in indexes:
+                nursery.start_soon(one, VirtualUser(index, channel, base_url, stats, sessions, timeout))
+    finally:
+        channel.off("Page.loadEventFired", on_load)
+
+
+def run(users, ramp, browsers=1, iterations=1, base_url=None, timeout=STEP_TIMEOUT, chrome=None):
+    """Run the load test and return its report"""
+    base_url = (base_url or static_server.base_url()).rstrip("/")
+    stats = LoadStats()
+    offsets = start_offsets(users, ramp)
+    path = chrome or chrome_path()
+    instances = []
+    try:
+        for _ in range(min(browsers, users)):
+            instances.append(Browser(path).start())
+        started = time.monotonic()
+        threads = []
+        for number, browser in enumerate(instances):
+            indexes = range(number, users, len(instances))
+            thread = threading.Thread(target=browser.channel.run, name=f"load-browser-{number}", args=(
+                run_users, browser.channel, base_url, indexes, offsets, started, iterations, stats, timeout))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        wall_time = time.monotonic() - started
+    finally:
+        for browser in instances:
+            browser.stop()
+    report = stats.report(wall_time, users)
+    report.update({"target": base_url, "ramp_per_second": ramp, "browsers": len(instances), "iterations": iterations})
+    return report
+
+
+def summary(report):
+    lines = [f"{report['users']} users on {report['browsers']} browsers against {report['target']}: "
+             f"{report['scenarios']} scenarios in {report['wall_time_s']:.1f}s "
+             f"({report['scenarios_per_second']:.2f}/s), error rate {report['error_rate']:.2%}",
+             f"  {'step':<15} {'ok':>6} {'failed':>6} {'/s':>7} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+    for step, entry in report["steps"].items():
+        latency = entry["latency_ms"]
+        cells = " ".join(f"{value:>6.0f}ms" if value is not None else f"{'-':>8}"
+                         for value in (latency["p50"], latency["p90"], latency["p95"], latency["p99"], latency["max"]))
+        lines.append(f"  {step:<15} {entry['ok']:>6} {entry['failed']:>6} {entry['per_second']:>7.2f} {cells}")
+        for message, count in list(entry["errors"].items())[:3]:
+            lines.append(f"      {count} x {message}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="virtual users")
+    parser.add_argument("--ramp", type=float, default=10.0, help="users started per second (0: all at once)")
+    parser.add_argument("--browsers", type=int, default=1, help="headless Chrome processes to spread users over")
+    parser.add_argument("--iterations", type=int, default=1, help="scenario runs per user")
+    parser.add_argument("--timeout", type=float, default=STEP_TIMEOUT, help="seconds before a step counts as failed")
+    parser.add_argument("--base-url", help="site to load (default: SANDBOXPRO_BASE_URL or the embedded server)")
+    parser.add_argument("--chrome", help="Chrome binary (default: SANDBOXPRO_CHROME, PATH or Selenium Manager)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="exit with 1 above this error rate")
+    parser.add_argument("--report", default=REPORT_PATH, help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    report = run(args.users, args.ramp, args.browsers, args.iterations, args.base_url, args.timeout, args.chrome)
+    with open(args.report, "w") as out:
+        json.dump(report, out, indent=2)
+    print(summary(report))
+    return 1 if report["error_rate"] > args.max_error_rate else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
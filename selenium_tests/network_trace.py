@@ -0,0 +1,261 @@
+"""Network trace of every page visit and page-weight budgets
+
+Every browser test already has Chrome log its Network events (the
+performance log the result cache reads). At tearDown those events are
+folded into a HAR-like trace: one visit per document load, one entry per
+request with its status, MIME type, bytes on the wire, time blocked
+before it was sent (HAR "blocked": queueing and stalls), total time and
+whether it came from a cache (memory/disk cache or a 304 revalidation).
+
+Visits are appended to .network_traces/<run>/<pid>.jsonl as each test
+finishes, so the workers of the parallel runner need no coordination.
+At the end of a run the visits are aggregated per page and checked
+against the budgets in page_budgets.json (SANDBOXPRO_PAGE_BUDGETS):
+the heaviest visit of a page (normally its cold load) must stay within
+the page's byte, request, blocking-time and largest-asset limits, so a
+new 2 MB asset fails the run instead of quietly slowing the site down.
+
+Usage:
+    python selenium_tests/network_trace.py check [--run RUN]   # aggregate and enforce the budgets
+    python selenium_tests/network_trace.py show PAGE [--run RUN]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from util import page_name
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ENABLED = os.environ.get("SANDBOXPRO_NETWORK_TRACE", "1") != "0"
+
+TRACE_DIR = os.environ.get("SANDBOXPRO_NETWORK_TRACES", os.path.join(HERE, ".network_traces"))
+
+BUDGETS_PATH = os.environ.get("SANDBOXPRO_PAGE_BUDGETS", os.path.join(HERE, "page_budgets.json"))
+
+# Aggregates compared with the budget of the same name
+BUDGET_KEYS = ("bytes", "requests", "blocked_ms", "asset_bytes")
+
+# Visits recorded by this process
+recorded = []
+
+
+def run_id():
+    """Id of the current run, shared with the worker processes through the environment"""
+    if "SANDBOXPRO_NETWORK_RUN" not in os.environ:
+        os.environ["SANDBOXPRO_NETWORK_RUN"] = time.strftime("%Y%m%d-%H%M%S")
+    return os.environ["SANDBOXPRO_NETWORK_RUN"]
+
+
+def performance_messages(driver):
+    """CDP messages chromedriver logged since the last read, or None"""
+    try:
+        entries = driver.get_log("performance")
+    except WebDriverException:
+        return None
+    return [json.loads(entry["message"])["message"] for entry in entries]
+
+
+def _blocked_ms(timing):
+    """Time between the request being queued and its first network phase (HAR "blocked")"""
+    if not timing:
+        return 0.0
+    for phase in ("dnsStart", "connectStart", "sendStart"):
+        if timing.get(phase, -1) >= 0:
+            return round(timing[phase], 3)
+    return 0.0
+
+
+def visits(messages, test_id=None):
+    """HAR-like visits, one per document load, from Network events"""
+    pages = {}
+    requests = {}
+    for message in messages:
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            request_id = params["requestId"]
+            if params.get("type") == "Document" and params.get("loaderId") not in pages:
+                pages[params["loaderId"]] = {"test": test_id, "page": page_name(params["documentURL"]),
+                                             "url": params["documentURL"], "entries": []}
+            visit = pages.get(params.get("loaderId"))
+            if visit is None:
+                continue
+            entry = {
+                "url": params["request"]["url"],
+                "method": params["request"]["method"],
+                "type": params.get("type"),
+                "status": None,
+                "mime": None,
+                "bytes": 0,
+                "blocked_ms": 0.0,
+                "time_ms": None,
+                "cached": False,
+                "failed": False,
+                "_started": params["timestamp"],
+            }
+            # A redirect reuses the request id; the earlier hop keeps its own entry
+            requests[request_id] = entry
+            visit["entries"].append(entry)
+            continue
+        entry = requests.get(params.get("requestId"))
+        if entry is None:
+            continue
+        if method == "Network.responseReceived":
+            response = params["response"]
+            entry["status"] = response.get("status")
+            entry["mime"] = response.get("mimeType")
+            entry["blocked_ms"] = _blocked_ms(response.get("timing"))
+            if response.get("fromDiskCache") or response.get("fromPrefetchCache") or entry["status"] == 304:
+                entry["cached"] = True
+        elif method == "Network.requestServedFromCache":
+            entry["cached"] = True
+        elif method == "Network.loadingFinished":
+            entry["bytes"] = int(params.get("encodedDataLength", 0))
+            entry["time_ms"] = round((params["timestamp"] - entry["_started"]) * 1000, 3)
+        elif method == "Network.loadingFailed":
+            entry["failed"] = True
+    for visit in pages.values():
+        for entry in visit["entries"]:
+            entry.pop("_started", None)
+    return list(pages.values())
+
+
+def visit_totals(visit):
+    entries = visit["entries"]
+    largest = max(entries, key=lambda entry: entry["bytes"], default=None)
+    return {
+        "bytes": sum(entry["bytes"] for entry in entries),
+        "requests": len(entries),
+        "blocked_ms": round(sum(entry["blocked_ms"] for entry in entries), 3),
+        "asset_bytes": largest["bytes"] if largest else 0,
+        "largest_asset": largest["url"] if largest else None,
+        "cache_hits": sum(1 for entry in entries if entry["cached"]),
+        "failed": sum(1 for entry in entries if entry["failed"]),
+    }
+
+
+def summarize(all_visits):
+    """Per page: the totals of its heaviest visit and the cache hit rate over all visits"""
+    pages = {}
+    for visit in all_visits:
+        totals = visit_totals(visit)
+        page = pages.setdefault(visit["page"], {"visits": 0, "requests_total": 0, "cache_hits_total": 0,
+                                                "heaviest": None})
+        page["visits"] += 1
+        page["requests_total"] += totals["requests"]
+        page["cache_hits_total"] += totals["cache_hits"]
+        if page["heaviest"] is None or totals["bytes"] > page["heaviest"]["bytes"]:
+            page["heaviest"] = dict(totals, test=visit["test"])
+    for page in pages.values():
+        total = page["requests_total"]
+        page["cache_hit_rate"] = round(page["cache_hits_total"] / total, 3) if total else 0.0
+    return pages
+
+
+def load_budgets(path=BUDGETS_PATH):
+    try:
+        with open(path) as budgets:
+            return json.load(budgets)
+    except (OSError, ValueError):
+        return {}
+
+
+def check_budgets(pages, budgets):
+    """Budget violations as readable strings; pages without a budget use the "default" one"""
+    violations = []
+    for name, page in sorted(pages.items()):
+        limits = dict(budgets.get("default", {}), **budgets.get("pages", {}).get(name, {}))
+        heaviest = page["heaviest"]
+        for key in BUDGET_KEYS:
+            if key in limits and heaviest[key] > limits[key]:
+                detail = f" ({heaviest['largest_asset']})" if key == "asset_bytes" else ""
+                violations.append(f"{name}: {key} {heaviest[key]:g} > budget {limits[key]:g}{detail}")
+    return violations
+
+
+def _trace_path(run=None):
+    return os.path.join(TRACE_DIR, run or run_id(), f"{os.getpid()}.jsonl")
+
+
+def record(test_id, messages):
+    """Add the visits of a finished test to this process' trace file"""
+    if not ENABLED or messages is None:
+        return
+    test_visits = visits(messages, test_id)
+    if not test_visits:
+        return
+    recorded.extend(test_visits)
+    path = _trace_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as out:
+        for visit in test_visits:
+            out.write(json.dumps(visit, separators=(",", ":")) + "\n")
+
+
+def load_run(run=None):
+    """Visits written by every process of a run"""
+    directory = os.path.dirname(_trace_path(run))
+    loaded = []
+    if not os.path.isdir(directory):
+        return loaded
+    for filename in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, filename)) as trace:
+            loaded.extend(json.loads(line) for line in trace if line.strip())
+    return loaded
+
+
+def latest_run():
+    runs = sorted(os.listdir(TRACE_DIR)) if os.path.isdir(TRACE_DIR) else []
+    return runs[-1] if runs else None
+
+
+def report(pages):
+    lines = [f"{'page':<16} {'visits':>6} {'bytes':>10} {'requests':>8} {'blocked':>9} {'largest':>10} {'cache hits':>10}"]
+    for name, page in sorted(pages.items()):
+        heaviest = page["heaviest"]
+        lines.append(f"{name:<16} {page['visits']:>6} {heaviest['bytes']:>10} {heaviest['requests']:>8} "
+                     f"{heaviest['blocked_ms']:>7.1f}ms {heaviest['asset_bytes']:>10} {page['cache_hit_rate']:>10.0%}")
+    return "\n".join(lines)
+
+
+def check(all_visits, budgets=None):
+    """Print the per-page summary and return the budget violations"""
+    pages = summarize(all_visits)
+    if pages:
+        print(report(pages), file=sys.stderr)
+    return check_budgets(pages, load_budgets() if budgets is None else budgets)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("check", "show"))
+    parser.add_argument("page", nargs="?", help="page to show the heaviest visit of (show)")
+    parser.add_argument("--run", help="run id (default: the latest run)")
+    args = parser.parse_args(argv)
+
+    run = args.run or latest_run()
+    if run is None:
+        print(f"No traces in {TRACE_DIR}")
+        return 1
+    all_visits = load_run(run)
+    if args.command == "show":
+        page_visits = [visit for visit in all_visits if visit["page"] == args.page]
+        if not page_visits:
+            print(f"No visits of {args.page} in run {run}")
+            return 1
+        heaviest = max(page_visits, key=lambda visit: visit_totals(visit)["bytes"])
+        print(json.dumps(heaviest, indent=2))
+        return 0
+
+    violations = check(all_visits)
+    for violation in violations:
+        print(f"BUDGET: {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
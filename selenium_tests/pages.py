@@ -0,0 +1,221 @@
+"""Page objects for login.html and dashboard.html with cached element handles
+
+Each find_element is a chromedriver round trip, and the tests used to
+look up the same buttons and modals again for every step. A page object
+declares its elements once and keeps the WebElement handle of each one
+for the current page load:
+
+    dashboard = DashboardPage(self.driver, self.base_url)
+    dashboard.user_menu_btn.click()          # one lookup
+    self.assertTrue(dashboard.user_dropdown.is_displayed())
+    dashboard.user_menu_btn.click()          # handle reused, no lookup
+
+Handles are dropped when the driver navigates (get, back, forward,
+refresh, window or frame switch). A navigation the page makes itself,
+such as the login redirect, makes a handle stale: the call that hits the
+StaleElementReferenceException re-resolves the element and is retried
+once, so tests never see it. Hits, lookups and stale re-resolutions are
+counted per test and summarised on stderr at exit.
+"""
+import atexit
+import sys
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.command import Command
+
+from input_engine import InputScript
+
+# WebDriver commands after which no handle of the previous document is valid
+NAVIGATION_COMMANDS = {Command.GET, Command.GO_BACK, Command.GO_FORWARD, Command.REFRESH,
+                       Command.SWITCH_TO_WINDOW, Command.SWITCH_TO_FRAME, Command.SWITCH_TO_PARENT_FRAME}
+
+# Handle counters per test id
+stats = {}
+
+
+def track_navigation(driver):
+    """Count the driver's navigations so page objects know when their handles expire (idempotent)"""
+    if hasattr(driver, "sandboxpro_navigations"):
+        return driver
+    execute = driver.execute
+
+    def tracking_execute(driver_command, params=None):
+        if driver_command in NAVIGATION_COMMANDS:
+            driver.sandboxpro_navigations += 1
+        return execute(driver_command, params)
+
+    driver.sandboxpro_navigations = 0
+    driver.execute = tracking_execute
+    return driver
+
+
+def _count(test_id, counter):
+    if test_id is None:
+        return
+    if not stats:
+        atexit.register(_report)
+    counters = stats.setdefault(test_id, {"hits": 0, "lookups": 0, "stale": 0})
+    counters[counter] += 1
+
+
+class Element:
+    """Declares a page element; reading it from a page object gives a CachedElement"""
+
+    def __init__(self, by, value):
+        self.by = by
+        self.value = value
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, page, owner=None):
+        if page is None:
+            return self
+        return CachedElement(page, self)
+
+
+class CachedElement:
+    """Stands in for a WebElement, resolving it through the page's handle cache"""
+
+    def __init__(self, page, element):
+        self._page = page
+        self._element = element
+
+    @property
+    def element(self):
+        """The WebElement itself, e.g. to pass to execute_script"""
+        return self._page.resolve(self._element)
+
+    def __getattr__(self, attribute):
+        handle = self._page.resolve(self._element)
+        if not callable(getattr(type(handle), attribute, None)):
+            return self._page.call(self._element, lambda element: getattr(element, attribute), handle)
+
+        def call(*args, **kwargs):
+            return self._page.call(self._element, lambda element: getattr(element, attribute)(*args, **kwargs),
+                                   handle)
+        return call
+
+    def __repr__(self):
+        return f"<{type(self._page).__name__}.{self._element.name} {self._element.by}={self._element.value!r}>"
+
+
+class Page:
+    """Element handles of one page, valid until the driver navigates"""
+
+    path = None
+
+    body = Element(By.TAG_NAME, "body")
+
+    def __init__(self, driver, base_url, test_id=None):
+        self.driver = track_navigation(driver)
+        self.base_url = base_url
+        self.test_id = test_id
+        self.handles = {}
+        self.navigation = driver.sandboxpro_navigations
+        self.hits = self.lookups = self.stale = 0
+
+    def open(self):
+        self.driver.get(f"{self.base_url}/{self.path}")
+        return self
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.handles.clear()
+        else:
+            self.handles.pop(name, None)
+
+    def resolve(self, element):
+        if self.driver.sandboxpro_navigations != self.navigation:
+            self.navigation = self.driver.sandboxpro_navigations
+            self.handles.clear()
+        handle = self.handles.get(element.name)
+        if handle is not None:
+            self.hits += 1
+            _count(self.test_id, "hits")
+            return handle
+        self.lookups += 1
+        _count(self.test_id, "lookups")
+        handle = self.handles[element.name] = self.driver.find_element(element.by, element.value)
+        return handle
+
+    def call(self, element, action, handle=None):
+        """Run `action` on the element's handle (`handle` if already resolved), re-resolving it once if stale"""
+        try:
+            return action(self.resolve(element) if handle is None else handle)
+        except StaleElementReferenceException:
+            self.stale += 1
+            _count(self.test_id, "stale")
+            self.invalidate(element.name)
+            return action(self.resolve(element))
+
+    def input(self):
+        """An input_engine script for this page"""
+        return InputScript(self.driver)
+
+    def press(self, *keys):
+        """Press a key chord (e.g. Keys.CONTROL, Keys.ENTER) in one CDP batch"""
+        self.input().chord(*keys).send()
+
+
+class LoginPage(Page):
+    path = "login.html"
+
+    login_form = Element(By.ID, "loginForm")
+    email = Element(By.ID, "email")
+    password = Element(By.ID, "password")
+    login_button = Element(By.ID, "loginButton")
+    toggle_password = Element(By.ID, "togglePassword")
+    eye_icon = Element(By.ID, "eyeIcon")
+    remember = Element(By.ID, "remember")
+    error_message = Element(By.ID, "errorMessage")
+    demo_helper = Element(By.XPATH, "//div[contains(text(), 'Demo Credentials:')]")
+
+    def fill(self, email, password):
+        """Type both credentials in one CDP batch"""
+        self.fill_script(email, password).send()
+
+    def fill_script(self, email, password):
+        """Input script entering the credentials, to extend with e.g. a submit shortcut"""
+        return self.input().focus("#email").insert(email).focus("#password").insert(password)
+
+
+class DashboardPage(Page):
+    path = "dashboard.html"
+
+    welcome_user_name = Element(By.ID, "welcomeUserName")
+    user_menu_btn = Element(By.ID, "userMenuBtn")
+    user_dropdown = Element(By.ID, "userDropdown")
+    logout_btn = Element(By.ID, "logoutBtn")
+    notifications_btn = Element(By.ID, "notificationsBtn")
+    notification_badge = Element(By.ID, "notificationBadge")
+    create_sandbox_btn = Element(By.ID, "createSandboxBtn")
+    create_sandbox_modal = Element(By.ID, "createSandboxModal")
+    create_sandbox_form = Element(By.ID, "createSandboxForm")
+    create_sandbox_submit = Element(By.CSS_SELECTOR, "#createSandboxForm button[type='submit']")
+    sandbox_name = Element(By.ID, "sandboxName")
+    sandbox_template = Element(By.ID, "sandboxTemplate")
+    cancel_create = Element(By.ID, "cancelCreate")
+    search_sandboxes = Element(By.ID, "searchSandboxes")
+    sandboxes_table_body = Element(By.ID, "sandboxesTableBody")
+    refresh_activity = Element(By.ID, "refreshActivity")
+    invite_team_btn = Element(By.ID, "inviteTeamBtn")
+    view_analytics_btn = Element(By.ID, "viewAnalyticsBtn")
+    settings_btn = Element(By.ID, "settingsBtn")
+
+    def shortcut(self, key):
+        """Press Ctrl+Shift+<key>"""
+        self.press(Keys.CONTROL, Keys.SHIFT, key)
+
+
+def _report():
+    if not stats:
+        return
+    hits = sum(counters["hits"] for counters in stats.values())
+    lookups = sum(counters["lookups"] for counters in stats.values())
+    stale = sum(counters["stale"] for counters in stats.values())
+    share = hits / (hits + lookups) if hits + lookups else 0.0
+    print(f"page objects: {hits} cached handle hits, {lookups} lookups ({share:.0%} of find_element calls saved), "
+          f"{stale} stale handles re-resolved in {len(stats)} tests", file=sys.stderr)
@@ -0,0 +1,312 @@
+"""Run the Selenium suite in parallel shards, one headless Chrome per worker process
+
+The tier-0 (static markup) tests run first in this process; if one of
+them fails no browser is started. Every browser test method of
+SandBoxProLoginTest and SandBoxProDashboardTest is then collected and
+spread over N worker processes. Tests are assigned
+longest-first (LPT) using the durations in the history store
+(history.py), so the shards finish at roughly the same time. A browser
+test that fails is run again right away in the same worker, whose browser
+is already warm (--reruns, default 1); one that passes then is reported
+as flaky. Tests the history store has quarantined run in a separate lane
+after the fast path and do not fail the run. The results of all shards
+are merged into a single report, and every attempt is added to the
+history.
+
+Usage:
+    python selenium_tests/parallel_runner.py [-n WORKERS] [--report FILE] [--force] [--reruns N] [TEST_ID ...]
+"""
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import sys
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import history
+import network_trace
+import perf_report
+import result_cache
+from tiers import TIER_STATIC, split_by_tier
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TEST_MODULES = ("test_static_pages", "test_login", "test_dashboard", "test_visual",
+                "test_responsive_images")
+
+# Times a failed browser test is run again in its worker (inherited by the workers)
+RERUNS = history.RERUNS
+
+# Estimate used for tests that have never been timed
+DEFAULT_DURATION = 5.0
+
+
+def discover(modules=TEST_MODULES):
+    """Return the ids (module.Class.test_name) of every test method in the suite"""
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    loader = unittest.TestLoader()
+    test_ids = []
+    for module_name in modules:
+        module = __import__(module_name)
+        for name in dir(module):
+            obj = getattr(module, name)
+            if isinstance(obj, type) and issubclass(obj, unittest.TestCase) and obj.__module__ == module_name:
+                for method in loader.getTestCaseNames(obj):
+                    test_ids.append(f"{module_name}.{name}.{method}")
+    return test_ids
+
+
+def load_durations():
+    """Median recent duration of each test, from the history store"""
+    with history.History() as store:
+        return store.durations()
+
+
+def plan_shards(test_ids, workers, durations):
+    """Split tests into shards with the longest-processing-time-first heuristic"""
+    known = sorted(durations[test_id] for test_id in test_ids if test_id in durations)
+    fallback = known[len(known) // 2] if known else DEFAULT_DURATION
+
+    def estimate(test_id):
+        return durations.get(test_id, fallback)
+
+    shards = [[] for _ in range(max(1, min(workers, len(test_ids))))]
+    loads = [(0.0, index) for index in range(len(shards))]
+    for test_id in sorted(test_ids, key=estimate, reverse=True):
+        load, index = heapq.heappop(loads)
+        shards[index].append(test_id)
+        heapq.heappush(loads, (load + estimate(test_id), index))
+    return shards
+
+
+class RecordingResult(unittest.TestResult):
+    """Test result that keeps a plain record of every test outcome and duration"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.attempt = 1
+        self._started = {}
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._started[test.id()] = time.perf_counter()
+
+    def _record(self, test, outcome, message=""):
+        started = self._started.pop(test.id(), None)
+        duration = time.perf_counter() - started if started is not None else 0.0
+        self.records.append({
+            "id": test.id(),
+            "outcome": outcome,
+            "duration": round(duration, 3),
+            "message": message,
+            "worker": os.getpid(),
+            "attempt": self.attempt,
+        })
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, "passed")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, "failed", self._exc_info_to_string(err, test))
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, "error", self._exc_info_to_string(err, test))
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        if reason == result_cache.CACHED_PASS:
+            self._record(test, "cached-pass")
+        else:
+            self._record(test, "skipped", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, "passed", "expected failure")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, "failed", "unexpected success")
+
+
+def rerun_failures(result, test_ids, reruns=RERUNS):
+    """Run the tests that just failed again, in this process and its warm browser, up to `reruns` times"""
+    test_ids = set(test_ids)
+    for attempt in range(2, reruns + 2):
+        # Only test methods: a failed setUpClass is reported under another id
+        failed = [record["id"] for record in result.records
+                  if record["attempt"] == attempt - 1 and record["outcome"] in history.FAILED
+                  and record["id"] in test_ids]
+        if not failed:
+            return
+        result.attempt = attempt
+        unittest.TestLoader().loadTestsFromNames(failed).run(result)
+
+
+def run_shard(test_ids, reruns=RERUNS):
+    """Worker entry point: run the given tests with this process' own browser"""
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    # The parent merges the timings of all workers into one report
+    perf_report.recorder.write_on_exit = False
+    suite = unittest.TestLoader().loadTestsFromNames(test_ids)
+    result = RecordingResult()
+    suite.run(result)
+    rerun_failures(result, test_ids, reruns)
+    perf_report.recorder.end_test()
+    return result.records, perf_report.recorder.as_dict()
+
+
+def run_static_tier(test_ids):
+    """Run the tier-0 tests in this process and return their records and the remaining test ids"""
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    tiers = split_by_tier(unittest.TestLoader().loadTestsFromNames(test_ids))
+    result = RecordingResult()
+    unittest.TestSuite(tiers.pop(TIER_STATIC, [])).run(result)
+    remaining = [test.id() for level in sorted(tiers) for test in tiers[level]]
+    return result.records, remaining
+
+
+def run_parallel(test_ids, workers):
+    """Run the tests over a process pool and return the merged records and timings"""
+    shards = plan_shards(test_ids, workers, load_durations())
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        futures = [executor.submit(run_shard, shard) for shard in shards]
+        records = []
+        timings = []
+        for future in futures:
+            shard_records, shard_timings = future.result()
+            records.extend(shard_records)
+            timings.append(shard_timings)
+    return records, perf_report.merge(timings)
+
+
+def settle(records):
+    """One record per test: its last attempt, "flaky" if it passed after failing, with the time of all attempts"""
+    attempts = {}
+    for record in records:
+        attempts.setdefault(record["id"], []).append(record)
+    settled = []
+    for runs in attempts.values():
+        runs.sort(key=lambda record: record.get("attempt", 1))
+        last = dict(runs[-1], attempts=len(runs), duration=round(sum(record["duration"] for record in runs), 3))
+        if len(runs) > 1 and last["outcome"] == "passed":
+            last.update(outcome="flaky", message=runs[0]["message"])
+        settled.append(last)
+    return settled
+
+
+def summarize(records, wall_time, workers):
+    counts = {}
+    for record in records:
+        counts[record["outcome"]] = counts.get(record["outcome"], 0) + 1
+    serial_time = sum(record["duration"] for record in records)
+    return {
+        "workers": workers,
+        "tests": len(records),
+        "outcomes": counts,
+        "wall_time_s": round(wall_time, 3),
+        "serial_time_s": round(serial_time, 3),
+        "speedup": round(serial_time / wall_time, 2) if wall_time else 0.0,
+        "results": sorted(records, key=lambda record: record["id"]),
+    }
+
+
+def main(argv=None, execute=run_parallel):
+    """Run the suite; `execute(test_ids, workers)` runs the browser tests (grid.py passes its own)"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--report", default=os.path.join(HERE, "parallel_report.json"),
+                        help="where to write the merged JSON report")
+    parser.add_argument("--force", action="store_true", help="run tests even when the result cache has a pass")
+    parser.add_argument("--keep-going", action="store_true", help="start the browser tests even if a static test failed")
+    parser.add_argument("--reruns", type=int, default=RERUNS,
+                        help="times a failed browser test is run again in its warm worker (default: %(default)s)")
+    parser.add_argument("--skip-quarantined", action="store_true", help="do not run the quarantine lane")
+    parser.add_argument("tests", nargs="*", help="test ids to run (default: the whole suite)")
+    args = parser.parse_args(argv)
+
+    if args.force:
+        # Inherited by the spawned workers
+        os.environ["SANDBOXPRO_FORCE_RUN"] = "1"
+    os.environ["SANDBOXPRO_RERUNS"] = str(args.reruns)
+    # One trace directory for every worker of this run
+    run = network_trace.run_id()
+    with history.History() as store:
+        quarantined = store.quarantined()
+    test_ids = args.tests or discover()
+    lane_ids = [test_id for test_id in test_ids if test_id in quarantined]
+    test_ids = [test_id for test_id in test_ids if test_id not in quarantined]
+    started = time.perf_counter()
+    records, browser_ids = run_static_tier(test_ids)
+    static_failed = any(record["outcome"] in history.FAILED for record in records)
+    print(f"Static tier: {len(records)} tests in {time.perf_counter() - started:.2f}s"
+          f"{', failures' if static_failed else ''}")
+    timings = {"tests": {}, "commands": []}
+    if browser_ids and (args.keep_going or not static_failed):
+        browser_records, timings = execute(browser_ids, args.workers)
+        records.extend(browser_records)
+    elif browser_ids:
+        print(f"Not starting {len(browser_ids)} browser tests because the static tier failed")
+    report = summarize(settle(records), time.perf_counter() - started, args.workers)
+
+    # Quarantined tests run after the fast path is decided; their timings stay out of the thresholds
+    lane_records = []
+    if lane_ids and not args.skip_quarantined and (args.keep_going or not static_failed):
+        print(f"Quarantine lane: {len(lane_ids)} tests")
+        lane_records, _ = execute(lane_ids, args.workers)
+        for record in lane_records:
+            record["lane"] = "quarantine"
+    report["quarantine"] = sorted(settle(lane_records), key=lambda record: record["id"])
+    with history.History() as store:
+        store.record(records + lane_records)
+        added, released = store.update_quarantine()
+
+    timing_report = perf_report.build_report(timings)
+    if perf_report.REPORT_PATH:
+        perf_report.write_report(timing_report)
+    print(perf_report.summary(timing_report))
+    thresholds = perf_report.load_thresholds()
+    regressions = perf_report.check_thresholds(timing_report, thresholds) if thresholds else []
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    violations = network_trace.check(network_trace.load_run(run))
+    for violation in violations:
+        print(f"BUDGET: {violation}")
+
+    with open(args.report, "w") as out:
+        json.dump(report, out, indent=2)
+
+    for record in report["results"]:
+        if record["outcome"] in history.FAILED:
+            print(f"{record['outcome'].upper()}: {record['id']}\n{record['message']}")
+        elif record["outcome"] == "flaky":
+            print(f"FLAKY: {record['id']} passed on attempt {record['attempts']}")
+    for record in report["quarantine"]:
+        if record["outcome"] in history.FAILED:
+            print(f"QUARANTINED {record['outcome'].upper()}: {record['id']}")
+    for test_id, reason in added:
+        print(f"QUARANTINE: {test_id} ({reason})")
+    for test_id in released:
+        print(f"RELEASED: {test_id} ran clean {history.RELEASE_RUNS} times")
+    outcomes = ", ".join(f"{count} {outcome}" for outcome, count in sorted(report["outcomes"].items()))
+    print(f"Ran {report['tests']} tests on {args.workers} workers in {report['wall_time_s']:.2f}s "
+          f"({outcomes}); serial time {report['serial_time_s']:.2f}s, speedup x{report['speedup']}")
+    if report["quarantine"]:
+        lane_failed = sum(record["outcome"] in history.FAILED for record in report["quarantine"])
+        print(f"Quarantine lane: {len(report['quarantine'])} tests, {lane_failed} failed (not counted)")
+    return 1 if set(history.FAILED) & set(report["outcomes"]) or regressions or violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
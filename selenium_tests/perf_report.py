@@ -0,0 +1,265 @@
+"""Per-test and per-command timing of the Selenium suite
+
+Every WebDriver command a pooled driver sends goes through its `execute`
+method; instrument() wraps it so each command is timed and tagged with
+the running test and its phase (setUp, body, tearDown). Larger steps such
+as acquiring a driver or logging in are recorded as named spans. At the
+end of the run a JSON report is written together with a summary of the
+slowest tests and commands.
+
+An optional threshold file makes regressions fail the run:
+
+    {"default_tolerance_pct": 25,
+     "tests": {"test_dashboard.SandBoxProDashboardTest.test_search_sandboxes": {"baseline_s": 1.4}}}
+
+Usage:
+    python selenium_tests/perf_report.py check REPORT THRESHOLDS
+    python selenium_tests/perf_report.py baseline REPORT THRESHOLDS [--tolerance 25]
+"""
+import argparse
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Where the report is written at exit; empty disables it
+REPORT_PATH = os.environ.get("SANDBOXPRO_PERF_REPORT", os.path.join(HERE, "perf_report.json"))
+
+# Optional threshold file checked against the report
+THRESHOLDS_PATH = os.environ.get("SANDBOXPRO_PERF_THRESHOLDS")
+
+TOP_N = 10
+
+DEFAULT_TOLERANCE_PCT = 25
+
+COMMAND_CATEGORIES = {
+    "get": "navigation",
+    "goBack": "navigation",
+    "goForward": "navigation",
+    "refresh": "navigation",
+    "findElement": "find",
+    "findElements": "find",
+    "findChildElement": "find",
+    "findChildElements": "find",
+    "clickElement": "click",
+    "sendKeysToElement": "send_keys",
+    "w3cExecuteScript": "script",
+    "w3cExecuteScriptAsync": "script",
+    "executeCdpCommand": "cdp",
+    "getPageSource": "read",
+    "getElementText": "read",
+    "isElementDisplayed": "read",
+    "getElementAttribute": "read",
+    "getElementProperty": "read",
+    "getElementValueOfCssProperty": "read",
+    "getCurrentUrl": "read",
+    "getTitle": "read",
+}
+
+
+class Recorder:
+    """Collects test phases and command timings for one process"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.tests = {}
+        self.commands = []
+        self.write_on_exit = True
+        self._test = None
+        self._phase = None
+        self._phase_started = None
+        self._registered = False
+
+    def _now(self):
+        return time.perf_counter() - self.started
+
+    def begin_test(self, test_id):
+        if self._test is not None:
+            self.end_test()
+        if not self._registered and self.write_on_exit and REPORT_PATH:
+            atexit.register(_write_at_exit)
+            self._registered = True
+        self._test = test_id
+        self.tests[test_id] = {"started": round(self._now(), 4), "phases": {}, "commands": 0, "duration": 0.0}
+        self.set_phase("setUp")
+
+    def set_phase(self, phase):
+        now = self._now()
+        if self._test is not None and self._phase is not None:
+            phases = self.tests[self._test]["phases"]
+            phases[self._phase] = round(phases.get(self._phase, 0.0) + now - self._phase_started, 4)
+        self._phase = phase
+        self._phase_started = now
+
+    def end_test(self):
+        if self._test is None:
+            return
+        self.set_phase(None)
+        entry = self.tests[self._test]
+        entry["duration"] = round(sum(entry["phases"].values()), 4)
+        self._test = None
+
+    def record(self, name, category, started, duration):
+        self.commands.append({
+            "test": self._test,
+            "phase": self._phase,
+            "command": name,
+            "category": category,
+            "at": round(started - self.started, 4),
+            "duration": round(duration, 5),
+        })
+        if self._test is not None:
+            self.tests[self._test]["commands"] += 1
+
+    @contextmanager
+    def span(self, name):
+        """Time a multi-command step such as acquiring a driver or logging in"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, "span", started, time.perf_counter() - started)
+
+    def as_dict(self):
+        return {"tests": self.tests, "commands": self.commands}
+
+
+recorder = Recorder()
+
+
+def instrument(driver):
+    """Time every WebDriver command the driver sends (idempotent)"""
+    if getattr(driver, "sandboxpro_instrumented", False):
+        return driver
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        started = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            name = driver_command
+            if driver_command == "executeCdpCommand" and params:
+                name = f"cdp:{params.get('cmd')}"
+            recorder.record(name, COMMAND_CATEGORIES.get(driver_command, "other"),
+                            started, time.perf_counter() - started)
+
+    driver.execute = timed_execute
+    driver.sandboxpro_instrumented = True
+    return driver
+
+
+def build_report(data, top_n=TOP_N):
+    """Add per-category totals and top-N summaries to raw recorder data"""
+    categories = {}
+    for command in data["commands"]:
+        if command["category"] == "span":
+            continue
+        totals = categories.setdefault(command["category"], {"count": 0, "total_s": 0.0})
+        totals["count"] += 1
+        totals["total_s"] = round(totals["total_s"] + command["duration"], 4)
+
+    slowest_tests = sorted(data["tests"].items(), key=lambda item: -item[1]["duration"])[:top_n]
+    slowest_commands = sorted((command for command in data["commands"] if command["category"] != "span"),
+                              key=lambda command: -command["duration"])[:top_n]
+    return {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "total_test_time_s": round(sum(test["duration"] for test in data["tests"].values()), 3),
+        "categories": categories,
+        "slowest_tests": [{"test": test_id, **entry} for test_id, entry in slowest_tests],
+        "slowest_commands": slowest_commands,
+        "tests": data["tests"],
+        "commands": data["commands"],
+    }
+
+
+def merge(datasets):
+    """Combine recorder data of several worker processes"""
+    merged = {"tests": {}, "commands": []}
+    for data in datasets:
+        merged["tests"].update(data["tests"])
+        merged["commands"].extend(data["commands"])
+    return merged
+
+
+def summary(report):
+    lines = [f"slowest tests (of {len(report['tests'])}, {report['total_test_time_s']:.2f}s total):"]
+    for entry in report["slowest_tests"]:
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in entry["phases"].items())
+        lines.append(f"  {entry['duration']:7.2f}s  {entry['test']}  ({phases})")
+    lines.append("slowest commands:")
+    for command in report["slowest_commands"]:
+        lines.append(f"  {command['duration']:7.3f}s  {command['command']:<28} {command['phase'] or '-':<9} {command['test']}")
+    return "\n".join(lines)
+
+
+def check_thresholds(report, thresholds):
+    """Return a message for every test that is slower than its baseline allows"""
+    default_tolerance = thresholds.get("default_tolerance_pct", DEFAULT_TOLERANCE_PCT)
+    regressions = []
+    for test_id, limit in thresholds.get("tests", {}).items():
+        entry = report["tests"].get(test_id)
+        if entry is None:
+            continue
+        tolerance = limit.get("tolerance_pct", default_tolerance)
+        allowed = limit["baseline_s"] * (1 + tolerance / 100)
+        if entry["duration"] > allowed:
+            change = (entry["duration"] / limit["baseline_s"] - 1) * 100 if limit["baseline_s"] else float("inf")
+            regressions.append(f"{test_id}: {entry['duration']:.2f}s vs baseline {limit['baseline_s']:.2f}s "
+                               f"(+{change:.0f}%, allowed +{tolerance}%)")
+    return regressions
+
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    if not path:
+        return None
+    with open(path) as thresholds:
+        return json.load(thresholds)
+
+
+def write_report(report, path=REPORT_PATH):
+    with open(path, "w") as out:
+        json.dump(report, out, indent=2)
+
+
+def _write_at_exit():
+    recorder.end_test()
+    report = build_report(recorder.as_dict())
+    write_report(report)
+    print(summary(report), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("check", "baseline"))
+    parser.add_argument("report")
+    parser.add_argument("thresholds")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE_PCT,
+                        help="allowed slowdown in percent when writing a baseline")
+    args = parser.parse_args(argv)
+
+    with open(args.report) as report_file:
+        report = json.load(report_file)
+
+    if args.command == "baseline":
+        thresholds = {
+            "default_tolerance_pct": args.tolerance,
+            "tests": {test_id: {"baseline_s": entry["duration"]} for test_id, entry in sorted(report["tests"].items())},
+        }
+        with open(args.thresholds, "w") as out:
+            json.dump(thresholds, out, indent=2)
+        print(f"Wrote baselines for {len(thresholds['tests'])} tests to {args.thresholds}")
+        return 0
+
+    regressions = check_thresholds(report, load_thresholds(args.thresholds))
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Primed Chrome profile template copied into new browsers
+
+A browser started with an empty profile finds its HTTP cache empty. The
+template is a profile whose disk cache and V8 code cache were filled by
+loading login.html, dashboard.html and index.html once. Only the cache
+directories and Local State are kept, so no cookies, storage or login
+session leak into the tests.
+
+What the cache can serve depends on the browser using it:
+- CDN assets only hit in browsers that do not intercept them. The CDN
+  cache (cdn_cache.py) answers them with Fetch.fulfillRequest before
+  Chrome's HTTP cache is consulted, so pooled browsers with
+  SANDBOXPRO_CDN_CACHE on never read them from the template. The load
+  test's browsers, and pooled ones with SANDBOXPRO_CDN_CACHE=0, do. The
+  template is built without interception when online for that reason.
+- Local pages are cached under the server's origin, so they only hit
+  when the server keeps its port (SANDBOXPRO_SERVER_PORT) or
+  SANDBOXPRO_BASE_URL is set. They are served with no-cache, so a hit is
+  a 304 revalidation that keeps the compiled scripts.
+
+A browser for which neither applies gets no copy, since it would only pay
+for the copying. By default (interception on, random port) the pool does
+not use the template. bench_startup.py counts the HTTP cache hits of each
+mode, so the gain is measured rather than assumed.
+
+Copies are cloned with FICLONE where the filesystem supports
+copy-on-write (btrfs, XFS, bcachefs), which costs no data copying;
+elsewhere they are copied. The template is built on first use and
+rebuilt after MAX_AGE_DAYS.
+
+Usage:
+    python selenium_tests/profile_template.py build
+    python selenium_tests/profile_template.py show
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # no flock or FICLONE on Windows
+    fcntl = None
+
+import cdn_cache
+import static_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Where the template lives; empty disables it and browsers start with an empty profile
+TEMPLATE_DIR = os.environ.get("SANDBOXPRO_PROFILE_TEMPLATE", os.path.join(HERE, ".profile_template"))
+
+# Rebuild the template when it is older than this, so the CDN assets in it stay current
+MAX_AGE_DAYS = 7
+
+PAGES = ("login.html", "dashboard.html", "index.html")
+
+# Profile entries copied into the template, relative to the user data dir
+KEEP = ("Local State", os.path.join("Default", "Cache"), os.path.join("Default", "Code Cache"))
+
+# ioctl number of FICLONE on Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+FONTS_READY_JS = "const done = arguments[arguments.length - 1]; document.fonts.ready.then(() => done(true));"
+
+stats = {"clones": 0, "reflinked": 0, "copied": 0, "clone_s": 0.0, "built": 0, "failed": False}
+
+_reflink = fcntl is not None and sys.platform.startswith("linux")
+
+
+def _clone_file(source, destination):
+    """copytree copy function: a copy-on-write clone when the filesystem allows, a copy otherwise"""
+    global _reflink
+    if _reflink:
+        try:
+            with open(source, "rb") as src, open(destination, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, destination)
+            stats["reflinked"] += 1
+            return destination
+        except OSError:
+            # EOPNOTSUPP, EXDEV, EINVAL: this filesystem cannot clone, stop trying
+            _reflink = False
+    shutil.copy2(source, destination)
+    stats["copied"] += 1
+    return destination
+
+
+def _strip(profile):
+    """Keep only the KEEP entries of a profile directory"""
+    kept = os.path.join(os.path.dirname(profile), "kept")
+    for entry in KEEP:
+        source = os.path.join(profile, entry)
+        if os.path.exists(source):
+            os.makedirs(os.path.dirname(os.path.join(kept, entry)), exist_ok=True)
+            os.rename(source, os.path.join(kept, entry))
+    shutil.rmtree(profile)
+    os.makedirs(kept, exist_ok=True)
+    os.rename(kept, profile)
+
+
+def load(template_dir=TEMPLATE_DIR):
+    """Metadata of the template, or None when there is none"""
+    try:
+        with open(os.path.join(template_dir, "template.json")) as metadata:
+            return json.load(metadata)
+    except (OSError, ValueError):
+        return None
+
+
+def build(template_dir=TEMPLATE_DIR):
+    """Load the pages in a fresh browser and store its caches as the template"""
+    # Imported here: driver_pool imports this module
+    from selenium import webdriver
+
+    import auth
+    import driver_pool
+    from base import CREDENTIALS
+
+    # CDN requests answered by the CDN cache never reach the HTTP cache: prime it from the network when online
+    intercept = cdn_cache.OFFLINE
+    parent = os.path.dirname(os.path.abspath(template_dir))
+    os.makedirs(parent, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=".profile-build-", dir=parent)
+    profile = os.path.join(workdir, "profile")
+    try:
+        driver = webdriver.Chrome(options=driver_pool.chrome_options(profile))
+        try:
+            if intercept:
+                cdn_cache.install(driver)
+            driver.set_script_timeout(30)
+            base_url = static_server.base_url()
+            admin = CREDENTIALS["admin"]
+            for page in PAGES:
+                if page == "dashboard.html":
+                    auth.seed_session(driver, base_url, auth.session_user(admin["email"], admin["name"], "admin"))
+                else:
+                    driver.get(f"{base_url}/{page}")
+                driver.execute_async_script(FONTS_READY_JS)
+            version = driver.capabilities.get("browserVersion")
+        finally:
+            if intercept:
+                cdn_cache.uninstall(driver)
+            # A clean shutdown flushes the cache index to disk
+            driver.quit()
+        _strip(profile)
+        with open(os.path.join(workdir, "template.json"), "w") as metadata:
+            json.dump({"built": time.time(), "chrome": version, "origin": base_url, "pages": list(PAGES),
+                       "cdn_primed": not intercept}, metadata, indent=2)
+        old = f"{template_dir}.old-{os.getpid()}"
+        if os.path.exists(template_dir):
+            os.rename(template_dir, old)
+        os.rename(workdir, template_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    stats["built"] += 1
+    return load(template_dir)
+
+
+def _stale(metadata):
+    return metadata is None or time.time() - metadata["built"] > MAX_AGE_DAYS * 86400
+
+
+def ensure(template_dir=TEMPLATE_DIR):
+    """Build the template if it is missing or stale; returns its metadata, None if it cannot be built"""
+    if not template_dir or stats["failed"]:
+        return None
+    metadata = load(template_dir)
+    if not _stale(metadata):
+        return metadata
+    os.makedirs(os.path.dirname(os.path.abspath(template_dir)), exist_ok=True)
+    with open(f"{template_dir}.lock", "w") as lock:
+        # Parallel workers wait for the first one's build instead of building their own
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        metadata = load(template_dir)
+        if not _stale(metadata):
+            return metadata
+        try:
+            return build(template_dir)
+        except Exception as error:
+            # Whatever went wrong (driver, DevTools channel, server), not worth failing the tests over:
+            # they start with an empty profile, as before
+            stats["failed"] = True
+            print(f"profile template: could not build {template_dir}: {error}", file=sys.stderr)
+            return None
+
+
+def _fixed_origin():
+    """Whether the local pages are served from the same origin in every run"""
+    return bool(static_server.BASE_URL_OVERRIDE or static_server.SERVER_PORT)
+
+
+def clone(template_dir=TEMPLATE_DIR, build_missing=True, intercepted=cdn_cache.ENABLED):
+    """A new profile directory copied from the template, or None when its cache could not serve anything
+
+    `intercepted` says whether the browser answers the CDN requests through cdn_cache.
+    """
+    if not template_dir or (intercepted and not _fixed_origin()):
+        return None
+    metadata = ensure(template_dir) if build_missing else load(template_dir)
+    if metadata is None or (intercepted and metadata["origin"] != static_server.base_url()):
+        return None
+    if not stats["clones"]:
+        atexit.register(_report)
+    started = time.perf_counter()
+    directory = tempfile.mkdtemp(prefix="sandboxpro-profile-")
+    try:
+        shutil.copytree(os.path.join(template_dir, "profile"), directory, dirs_exist_ok=True,
+                        copy_function=_clone_file)
+    except (OSError, shutil.Error) as error:
+        # The template was being rebuilt underneath us
+        print(f"profile template: could not copy {template_dir}: {error}", file=sys.stderr)
+        discard(directory)
+        return None
+    stats["clones"] += 1
+    stats["clone_s"] += time.perf_counter() - started
+    return directory
+
+
+def discard(directory):
+    """Remove a cloned profile once its browser has quit"""
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def profile_size(template_dir=TEMPLATE_DIR):
+    total = files = 0
+    for directory, _, names in os.walk(os.path.join(template_dir, "profile")):
+        for name in names:
+            total += os.path.getsize(os.path.join(directory, name))
+            files += 1
+    return files, total
+
+
+def _report():
+    mean_ms = stats["clone_s"] / stats["clones"] * 1000 if stats["clones"] else 0.0
+    print(f"profile template: {stats['clones']} profiles cloned (mean {mean_ms:.1f}ms), "
+          f"{stats['reflinked']} files reflinked, {stats['copied']} copied", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="build the template now, replacing the current one")
+    commands.add_parser("show", help="print the template's metadata and size")
+    args = parser.parse_args(argv)
+
+    if not TEMPLATE_DIR:
+        parser.error("SANDBOXPRO_PROFILE_TEMPLATE is empty, the template is disabled")
+    metadata = build() if args.command == "build" else load()
+    if metadata is None:
+        print(f"no template in {TEMPLATE_DIR}")
+        return 1
+    files, total = profile_size()
+    print(json.dumps(metadata, indent=2))
+    print(f"{files} files, {total / 1e6:.1f} MB in {TEMPLATE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
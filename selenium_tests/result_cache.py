@@ -0,0 +1,210 @@
+"""Skip tests whose inputs have not changed since they last passed
+
+A test's key is a hash of
+- the source of the test method,
+- every helper it reaches through `self.<name>(...)` calls, plus setUp/tearDown,
+- the local harness modules its test module imports (base, auth, waits, ...),
+- the page assets (HTML, JS, CSS, images) the browser requested during
+  its last run, read back from Chrome's performance (network) log.
+
+When a test passes, its key and asset list are stored in
+.result_cache/<sha1 of test id>.json. On the next run setUp recomputes the
+key with the current files and, if it matches, skips the test as
+"cached-pass" before a browser is acquired. Set SANDBOXPRO_FORCE_RUN=1
+(or pass --force-run to pytest, --force to the parallel runner) to run
+everything. Tests against a remote SANDBOXPRO_BASE_URL are never cached
+since the served files cannot be hashed.
+"""
+import ast
+import atexit
+import hashlib
+import inspect
+import json
+import os
+import sys
+import textwrap
+import unittest
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+import static_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+CACHE_DIR = os.environ.get("SANDBOXPRO_RESULT_CACHE", os.path.join(HERE, ".result_cache"))
+
+# Run every test even when its key is unchanged
+FORCE = os.environ.get("SANDBOXPRO_FORCE_RUN") == "1"
+
+CACHED_PASS = "cached-pass"
+
+# Run for every test even though the test never calls them itself
+IMPLICIT_METHODS = ("setUp", "tearDown", "setUpClass", "tearDownClass")
+
+stats = {"cached": 0, "recorded": 0}
+
+
+def _sha(data):
+    return hashlib.sha256(data if isinstance(data, bytes) else data.encode()).hexdigest()
+
+
+def _self_calls(function):
+    """Names of the methods called as self.<name>(...) in `function`"""
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(function)))
+    except (OSError, TypeError, SyntaxError):
+        return set()
+    return {
+        node.func.attr
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name) and node.func.value.id in ("self", "cls")
+    }
+
+
+def helper_sources(test_case):
+    """Source of the test method and every class method it reaches, by qualified name"""
+    cls = type(test_case)
+    pending = [test_case._testMethodName, *IMPLICIT_METHODS]
+    sources = {}
+    while pending:
+        name = pending.pop()
+        function = inspect.getattr_static(cls, name, None)
+        if isinstance(function, (classmethod, staticmethod)):
+            function = function.__func__
+        # unittest's own methods (assertEqual, skipTest, ...) are not part of the key
+        if not inspect.isfunction(function) or function.__module__ == unittest.case.__name__:
+            continue
+        if function.__qualname__ in sources:
+            continue
+        sources[function.__qualname__] = inspect.getsource(function)
+        pending.extend(_self_calls(function))
+    return sources
+
+
+def local_modules(module_name, seen=None):
+    """Content hashes of the harness modules `module_name` imports, transitively"""
+    seen = {} if seen is None else seen
+    path = os.path.join(HERE, f"{module_name}.py")
+    if module_name in seen or not os.path.exists(path):
+        return seen
+    with open(path, "rb") as source:
+        data = source.read()
+    seen[module_name] = _sha(data)
+    for node in ast.walk(ast.parse(data)):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            local_modules(name.split(".")[0], seen)
+    return seen
+
+
+def asset_digests(assets):
+    """Content hash of every recorded asset path (relative to the repository root)"""
+    digests = {}
+    for asset in assets:
+        path = os.path.join(ROOT, asset)
+        try:
+            with open(path, "rb") as data:
+                digests[asset] = _sha(data.read())
+        except OSError:
+            digests[asset] = None
+    return digests
+
+
+def compute_key(test_case, assets):
+    module_name = type(test_case).__module__
+    material = {
+        "test": test_case.id(),
+        "sources": helper_sources(test_case),
+        "modules": local_modules(module_name),
+        "assets": asset_digests(assets),
+    }
+    return _sha(json.dumps(material, sort_keys=True))
+
+
+def _entry_path(test_id):
+    return os.path.join(CACHE_DIR, hashlib.sha1(test_id.encode()).hexdigest() + ".json")
+
+
+def _enabled():
+    return bool(CACHE_DIR) and not static_server.BASE_URL_OVERRIDE
+
+
+def is_cached_pass(test_case):
+    """True when the test passed before and none of its inputs changed since"""
+    if FORCE or not _enabled():
+        return False
+    try:
+        with open(_entry_path(test_case.id())) as entry_file:
+            entry = json.load(entry_file)
+    except (OSError, ValueError):
+        return False
+    if entry.get("key") != compute_key(test_case, entry.get("assets", [])):
+        return False
+    if not any(stats.values()):
+        atexit.register(_report)
+    stats["cached"] += 1
+    return True
+
+
+def record(test_case, passed, assets):
+    """Store the key of a passing test, forget a failing one"""
+    if not _enabled():
+        return
+    path = _entry_path(test_case.id())
+    if not passed or assets is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    entry = {"test": test_case.id(), "key": compute_key(test_case, assets), "assets": sorted(assets)}
+    # Workers of the parallel runner write concurrently; replace atomically
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as out:
+        json.dump(entry, out, indent=2)
+    os.replace(temporary, path)
+    if not any(stats.values()):
+        atexit.register(_report)
+    stats["recorded"] += 1
+
+
+def start_capture(driver):
+    """Drop network events left in the log by earlier tests on this driver"""
+    try:
+        driver.get_log("performance")
+    except WebDriverException:
+        pass
+
+
+def loaded_assets(messages, base_url, extra_urls=()):
+    """Repository paths of the files the browser requested from the local server, or None
+
+    `messages` are the performance log messages of the test (network_trace.performance_messages);
+    `extra_urls` are requests made outside the driver's own pages, e.g. by a RoleMatrix.
+    """
+    if messages is None:
+        return None
+    urls = list(extra_urls)
+    urls.extend(message["params"]["request"]["url"] for message in messages
+                if message.get("method") == "Network.requestWillBeSent")
+    prefix = base_url.rstrip("/") + "/"
+    assets = set()
+    for url in urls:
+        if not url.startswith(prefix):
+            continue
+        path = urlsplit(url).path[len(urlsplit(prefix).path):] or "index.html"
+        if path.endswith("/"):
+            path += "index.html"
+        assets.add(path)
+    return assets
+
+
+def _report():
+    print(f"result cache: {stats['cached']} cached passes, {stats['recorded']} results recorded", file=sys.stderr)
@@ -0,0 +1,222 @@
+"""Drive every role at once in isolated browser contexts of one Chrome
+
+Covering each role with its own test used to cost one browser per role.
+RoleMatrix opens one browser context per role with
+Target.createBrowserContext inside the Chrome of the test's pooled driver.
+Each context has its own cookies, localStorage and sessionStorage, like an
+incognito window. All contexts are driven concurrently over one CDP
+channel, so logging every role in through the form pays login.js's ~3.5 s
+of simulated delays once, in a single browser process.
+
+The contexts need the browser's DevTools endpoint, which a browser on a
+remote WebDriver node (grid.py) does not expose; tests that open a
+matrix are skipped there.
+
+The URLs the contexts request (and, with SANDBOXPRO_COVERAGE_INDEX=1,
+their JS coverage) are handed back to the test case so the result cache
+and the coverage index see the pages the matrix loaded.
+"""
+import json
+
+import trio
+
+import auth
+from cdp import CdpChannel
+
+ROLES = ("admin", "user", "demo", "test")
+
+# What updateStatsForUser in dashboard.js shows for each role
+ROLE_STATS = {
+    "admin": {"active_sandboxes": "15", "storage_used": "4.2 GB", "team_members": "12", "uptime": "99.9%"},
+    "user": {"active_sandboxes": "8", "storage_used": "2.1 GB", "team_members": "6", "uptime": "99.8%"},
+    "demo": {"active_sandboxes": "3", "storage_used": "0.8 GB", "team_members": "2", "uptime": "99.7%"},
+    "test": {"active_sandboxes": "5", "storage_used": "1.5 GB", "team_members": "4", "uptime": "99.6%"},
+}
+
+READ_DASHBOARD_JS = """({
+    url: location.href,
+    welcome: document.getElementById('welcomeUserName').textContent,
+    active_sandboxes: document.getElementById('activeSandboxes').textContent,
+    storage_used: document.getElementById('storageUsed').textContent,
+    team_members: document.getElementById('teamMembers').textContent,
+    uptime: document.getElementById('uptime').textContent,
+})"""
+
+# Fill and submit the form the way typing would; reports whether the spinner came up
+SUBMIT_LOGIN_JS = """(() => {{
+    for (const [id, value] of [['email', {email}], ['password', {password}]]) {{
+        const field = document.getElementById(id);
+        field.value = value;
+        field.dispatchEvent(new Event('input', {{ bubbles: true }}));
+    }}
+    document.getElementById('loginForm').requestSubmit();
+    return !document.getElementById('spinner').classList.contains('hidden');
+}})()"""
+
+
+class RoleContext:
+    """One role's browser context, its page and the DevTools session attached to it"""
+
+    def __init__(self, role):
+        self.role = role
+        self.context_id = None
+        self.target_id = None
+        self.session_id = None
+        self.loaded = trio.Event()
+
+
+class RoleMatrix:
+    """Isolated browser contexts, one per role, in the browser behind `driver`"""
+
+    def __init__(self, driver, base_url, roles=ROLES, timeout=30, coverage=False):
+        self.driver = driver
+        self.base_url = base_url
+        self.contexts = [RoleContext(role) for role in roles]
+        self.timeout = timeout
+        self.coverage = coverage
+        self.requested = set()
+        self.scripts = []
+        self.channel = None
+        self._owns_channel = False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        # Share the channel the CDN interceptor already keeps open to this browser
+        self.channel = getattr(self.driver, "sandboxpro_cdn_channel", None)
+        if self.channel is None:
+            self.channel = CdpChannel.for_driver(self.driver)
+            self._owns_channel = True
+        self.channel.on("Page.loadEventFired", self._on_load)
+        self.channel.on("Network.requestWillBeSent", self._on_request)
+        try:
+            self.channel.run(self._each, self._open_context)
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        """Dispose of every context; safe to call more than once"""
+        if self.channel is None:
+            return
+        try:
+            self.channel.run(self._each, self._close_context)
+        finally:
+            self.channel.off("Page.loadEventFired", self._on_load)
+            self.channel.off("Network.requestWillBeSent", self._on_request)
+            if self._owns_channel:
+                self.channel.close()
+            self.channel = None
+
+    def login(self, credentials):
+        """Log every role in through login.html and return {role: dashboard reading}
+
+        Each reading also says whether the loading spinner showed after submitting.
+        """
+        return self.channel.run(self._each, self._login, credentials)
+
+    def open_dashboard(self, credentials, storage="local"):
+        """Open dashboard.html in every context already logged in, skipping the form"""
+        return self.channel.run(self._each, self._seed, credentials, storage)
+
+    def read_dashboard(self):
+        """{role: {url, welcome, active_sandboxes, storage_used, team_members, uptime}}"""
+        return self.channel.run(self._each, self._read_dashboard)
+
+    async def _each(self, async_fn, *args):
+        """Run `async_fn(context, *args)` for all contexts concurrently, results by role"""
+        results = {}
+
+        async def one(context):
+            results[context.role] = await async_fn(context, *args)
+
+        async with trio.open_nursery() as nursery:
+            for context in self.contexts:
+                nursery.start_soon(one, context)
+        return results
+
+    async def _open_context(self, context):
+        execute = self.channel.execute
+        # Disposed by Chrome as well should the channel drop before close()
+        created = await execute("Target.createBrowserContext", {"disposeOnDetach": True})
+        context.context_id = created["browserContextId"]
+        target = await execute("Target.createTarget", {"url": "about:blank", "browserContextId": context.context_id})
+        context.target_id = target["targetId"]
+        attached = await execute("Target.attachToTarget", {"targetId": context.target_id, "flatten": True})
+        context.session_id = attached["sessionId"]
+        await execute("Page.enable", None, context.session_id)
+        await execute("Network.enable", None, context.session_id)
+        if self.coverage:
+            await execute("Profiler.enable", None, context.session_id)
+            await execute("Profiler.startPreciseCoverage", {"callCount": True, "detailed": False}, context.session_id)
+
+    async def _close_context(self, context):
+        if context.context_id is None:
+            return
+        if self.coverage and context.session_id is not None:
+            coverage = await self.channel.execute("Profiler.takePreciseCoverage", None, context.session_id)
+            self.scripts.extend(coverage["result"])
+        await self.channel.execute("Target.disposeBrowserContext", {"browserContextId": context.context_id})
+        context.context_id = context.target_id = context.session_id = None
+
+    async def _on_load(self, _params, session_id):
+        for context in self.contexts:
+            if context.session_id == session_id:
+                context.loaded.set()
+
+    async def _on_request(self, params, session_id):
+        if any(context.session_id == session_id for context in self.contexts):
+            self.requested.add(params["request"]["url"])
+
+    async def _evaluate(self, context, expression):
+        result = await self.channel.execute("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+        }, context.session_id)
+        if "exceptionDetails" in result:
+            raise AssertionError(f"{context.role}: {result['exceptionDetails'].get('text')}")
+        return result["result"].get("value")
+
+    async def _wait_for_page(self, context, page):
+        """Wait until `page` has fired its load event in the context"""
+        with trio.fail_after(self.timeout):
+            while True:
+                await context.loaded.wait()
+                context.loaded = trio.Event()
+                # A load event of the previous document may still have been queued
+                if (await self._evaluate(context, "location.pathname")).endswith("/" + page):
+                    return
+
+    async def _navigate(self, context, page):
+        context.loaded = trio.Event()
+        await self.channel.execute("Page.navigate", {"url": f"{self.base_url}/{page}"}, context.session_id)
+        await self._wait_for_page(context, page)
+
+    async def _login(self, context, credentials):
+        account = credentials[context.role]
+        await self._navigate(context, "login.html")
+        spinner = await self._evaluate(context, SUBMIT_LOGIN_JS.format(
+            email=json.dumps(account["email"]), password=json.dumps(account["password"])))
+        await self._wait_for_page(context, "dashboard.html")
+        return {"spinner": spinner, **await self._read_dashboard(context)}
+
+    async def _seed(self, context, credentials, storage):
+        account = credentials[context.role]
+        user = auth.session_user(account["email"], account["name"], context.role)
+        source = auth.storage_script(self.base_url, user, storage)
+        script = await self.channel.execute("Page.addScriptToEvaluateOnNewDocument", {"source": source},
+                                            context.session_id)
+        try:
+            await self._navigate(context, "dashboard.html")
+        finally:
+            await self.channel.execute("Page.removeScriptToEvaluateOnNewDocument",
+                                       {"identifier": script["identifier"]}, context.session_id)
+        return await self._read_dashboard(context)
+
+    async def _read_dashboard(self, context):
+        return await self._evaluate(context, READ_DASHBOARD_JS)
@@ -0,0 +1,184 @@
+"""Soak test: keep a logged-in dashboard open and watch it for leaks
+
+dashboard.js starts setInterval loops that are never cleared (updateStats,
+startSandboxMonitoring, the performance charts and the team chat) and
+showToast keeps appending to document.body, while the dashboard is left
+open on wall displays for days. This harness opens the dashboard,
+samples CDP Performance.getMetrics at a fixed interval (after forcing a
+garbage collection so only retained memory counts) and writes the time
+series as JSON. The run fails when the heap, DOM node or event listener
+count grows faster than the leak budget.
+
+With --virtual the page runs on the virtual clock and each sample
+advances it by the interval instead of waiting, so a day of dashboard
+time takes minutes.
+
+Usage:
+    python selenium_tests/soak.py --duration 8h --interval 60 [--virtual] [--role admin]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import auth
+import driver_pool
+import static_server
+from base import CREDENTIALS
+from bench_stats import slope
+from virtual_clock import VirtualClock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TRACKED_METRICS = (
+    "JSHeapUsedSize",
+    "JSHeapTotalSize",
+    "Nodes",
+    "JSEventListeners",
+    "Documents",
+    "LayoutCount",
+    "RecalcStyleCount",
+)
+
+# Allowed growth per hour of dashboard time; the counters only describe work done and are not budgeted
+DEFAULT_BUDGETS = {
+    "JSHeapUsedSize": 1024 * 1024,
+    "Nodes": 200,
+    "JSEventListeners": 20,
+}
+
+# Samples at the start of the run that only show the page settling
+WARMUP_SAMPLES = 2
+
+
+def parse_duration(value):
+    """'90', '90s', '15m', '8h' or '2d' to seconds"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd]?)", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value!r}")
+    number, unit = match.groups()
+    return float(number) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[unit]
+
+
+def read_metrics(driver, collect_garbage=True):
+    if collect_garbage:
+        driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+    metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    values = {metric["name"]: metric["value"] for metric in metrics}
+    return {name: values.get(name) for name in TRACKED_METRICS}
+
+
+def evaluate(samples, budgets, warmup=WARMUP_SAMPLES):
+    """Growth per hour of every tracked metric and the budgets it exceeds"""
+    steady = samples[warmup:] if len(samples) > warmup + 1 else samples
+    growth = {}
+    for metric in TRACKED_METRICS:
+        points = [(sample["t"] / 3600, sample[metric]) for sample in steady if sample.get(metric) is not None]
+        if points:
+            growth[metric] = {
+                "first": points[0][1],
+                "last": points[-1][1],
+                "per_hour": slope(points),
+            }
+    violations = [
+        f"{metric} grows by {growth[metric]['per_hour']:.0f}/h, budget {budget}/h"
+        for metric, budget in budgets.items()
+        if metric in growth and growth[metric]["per_hour"] > budget
+    ]
+    return growth, violations
+
+
+def soak(duration, interval, role="admin", virtual=False, collect_garbage=True, progress=None):
+    """Keep the dashboard open for `duration` seconds and return the samples"""
+    driver = driver_pool.acquire()
+    clock = None
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        driver.set_script_timeout(120)
+        if virtual:
+            clock = VirtualClock(driver)
+            clock.install()
+        credentials = CREDENTIALS[role]
+        auth.seed_session(driver, static_server.base_url(),
+                          auth.session_user(credentials["email"], credentials["name"], role))
+
+        samples = []
+        started = time.monotonic()
+        elapsed = 0.0
+        while True:
+            sample = {"t": round(elapsed, 3), "wall": round(time.monotonic() - started, 3)}
+            sample.update(read_metrics(driver, collect_garbage))
+            samples.append(sample)
+            if progress:
+                progress(sample)
+            if elapsed >= duration:
+                break
+            step = min(interval, duration - elapsed)
+            if clock is not None:
+                if clock.advance(int(step * 1000)) is None:
+                    raise RuntimeError("the dashboard navigated away during the soak run")
+                elapsed += step
+            else:
+                time.sleep(step)
+                elapsed = time.monotonic() - started
+        return samples
+    finally:
+        if clock is not None:
+            clock.uninstall()
+        driver.execute_cdp_cmd("Performance.disable", {})
+        driver_pool.release(driver)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=parse_duration, default=parse_duration("10m"),
+                        help="how long to keep the dashboard open (e.g. 600, 30m, 8h, 2d)")
+    parser.add_argument("--interval", type=parse_duration, default=30.0, help="seconds between samples")
+    parser.add_argument("--role", choices=sorted(CREDENTIALS), default="admin")
+    parser.add_argument("--virtual", action="store_true", help="advance the virtual clock instead of waiting")
+    parser.add_argument("--no-gc", action="store_true", help="do not force a garbage collection before sampling")
+    parser.add_argument("--heap-budget", type=float, default=DEFAULT_BUDGETS["JSHeapUsedSize"] / 1024 / 1024,
+                        help="allowed JS heap growth in MB per hour")
+    parser.add_argument("--nodes-budget", type=float, default=DEFAULT_BUDGETS["Nodes"],
+                        help="allowed DOM node growth per hour")
+    parser.add_argument("--listeners-budget", type=float, default=DEFAULT_BUDGETS["JSEventListeners"],
+                        help="allowed event listener growth per hour")
+    parser.add_argument("--output", default=os.path.join(HERE, "soak_report.json"), help="time series output")
+    args = parser.parse_args(argv)
+
+    budgets = {
+        "JSHeapUsedSize": args.heap_budget * 1024 * 1024,
+        "Nodes": args.nodes_budget,
+        "JSEventListeners": args.listeners_budget,
+    }
+
+    def progress(sample):
+        print(f"  t={sample['t']:>9.0f}s heap={sample['JSHeapUsedSize'] / 1024 / 1024:7.2f}MB "
+              f"nodes={sample['Nodes']:>6.0f} listeners={sample['JSEventListeners']:>5.0f}", file=sys.stderr)
+
+    samples = soak(args.duration, args.interval, args.role, args.virtual, not args.no_gc, progress)
+    growth, violations = evaluate(samples, budgets)
+    with open(args.output, "w") as out:
+        json.dump({
+            "role": args.role,
+            "duration_s": args.duration,
+            "interval_s": args.interval,
+            "virtual_clock": args.virtual,
+            "budgets_per_hour": budgets,
+            "growth": growth,
+            "violations": violations,
+            "samples": samples,
+        }, out, indent=2)
+
+    for metric, stats in growth.items():
+        print(f"{metric:<18} {stats['first']:>14.0f} -> {stats['last']:>14.0f}  ({stats['per_hour']:+.1f}/h)")
+    for violation in violations:
+        print(f"LEAK: {violation}")
+    print(f"Wrote {len(samples)} samples to {args.output}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Parsed copies of the pages for the tier-0 tests
+
+Pages are parsed with lxml straight from the working tree; each file is
+parsed once per run (and again only if it changes on disk).
+"""
+import os
+
+import lxml.html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = ("login.html", "dashboard.html", "index.html")
+
+_parsed = {}
+
+
+def page(name):
+    """Parsed document of a page in the repository root"""
+    path = os.path.join(ROOT, name)
+    stamp = os.stat(path).st_mtime_ns
+    cached = _parsed.get(name)
+    if cached is None or cached[0] != stamp:
+        with open(path, "rb") as source:
+            cached = _parsed[name] = (stamp, lxml.html.document_fromstring(source.read()))
+    return cached[1]
+
+
+def source(name):
+    with open(os.path.join(ROOT, name), encoding="utf-8") as text:
+        return text.read()
+
+
+def ids(document):
+    """Every id attribute in document order, duplicates included"""
+    return [element.get("id") for element in document.iter() if isinstance(element.tag, str) and element.get("id")]
+
+
+def text(element):
+    """Whitespace-normalised text content, as innerText would roughly show it"""
+    return " ".join(element.text_content().split())
+
+
+def local_references(document):
+    """src/href values of scripts, stylesheets and images that point into the repository"""
+    references = []
+    for element in document.xpath("//script[@src] | //link[@href] | //img[@src]"):
+        value = element.get("src") or element.get("href")
+        if element.tag == "link" and "preconnect" in (element.get("rel") or ""):
+            continue
+        if "://" in value or value.startswith(("#", "data:", "mailto:", "//")):
+            continue
+        references.append(value.split("?")[0].split("#")[0])
+    return references
@@ -0,0 +1,310 @@
+"""Local HTTP server that serves the working tree to the Selenium tests
+
+The tests used to load every page from GitHub Pages, which is slow, flaky
+and impossible on air-gapped build agents. This server is started once per
+test session on an ephemeral port and serves the repository root with
+HTTP/1.1 keep-alive, ETag/304 revalidation and precompressed gzip/brotli
+variants of the text assets. Every request is timed so server time can be
+told apart from browser time.
+
+Set SANDBOXPRO_BASE_URL to run against another deployment instead, e.g.
+SANDBOXPRO_BASE_URL=https://looseitp.github.io/looseitpcursor.io
+
+With --run the server is started in the background and COMMAND is run
+through the shell with SANDBOXPRO_BASE_URL pointing at it (unless already
+set); the server stops when COMMAND exits, with COMMAND's exit status.
+The npm test:cypress* scripts run Cypress this way.
+
+Usage:
+    python selenium_tests/static_server.py [--port 8000] [--root DIR] [--run COMMAND]
+"""
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import subprocess
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# Use an already running deployment instead of the embedded server
+BASE_URL_OVERRIDE = os.environ.get("SANDBOXPRO_BASE_URL")
+
+# Port of the embedded server; 0 picks a free one
+SERVER_PORT = int(os.environ.get("SANDBOXPRO_SERVER_PORT", "0"))
+
+# Optional path the per-request latency log is written to as JSON on exit
+SERVER_LOG = os.environ.get("SANDBOXPRO_SERVER_LOG")
+
+# Where the compressed variants of the text assets are kept
+PRECOMPRESSED_DIR = os.environ.get("SANDBOXPRO_PRECOMPRESSED", os.path.join(HERE, ".precompressed"))
+
+COMPRESSIBLE = (".html", ".js", ".css", ".svg", ".json", ".txt")
+
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("text/javascript", ".js")
+
+
+def precompress(root=ROOT, out_dir=PRECOMPRESSED_DIR):
+    """Write .gz (and .br when brotli is installed) variants of the text assets under out_dir"""
+    written = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".") and name != "node_modules"]
+        if os.path.abspath(dirpath).startswith(os.path.abspath(out_dir)):
+            continue
+        for filename in filenames:
+            if not filename.endswith(COMPRESSIBLE):
+                continue
+            source = os.path.join(dirpath, filename)
+            target = os.path.join(out_dir, os.path.relpath(source, root))
+            mtime = os.path.getmtime(source)
+            pending = [(".gz", gzip.compress)]
+            if brotli is not None:
+                pending.append((".br", brotli.compress))
+            for suffix, compress in pending:
+                if os.path.exists(target + suffix) and os.path.getmtime(target + suffix) >= mtime:
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(source, "rb") as src:
+                    data = compress(src.read())
+                with open(target + suffix, "wb") as dst:
+                    dst.write(data)
+                written += 1
+    return written
+
+
+class FileCache:
+    """Keeps file bodies and their ETags in memory until the file changes on disk"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None or entry[0] != key:
+            with open(path, "rb") as source:
+                body = source.read()
+            entry = (key, body, '"%s"' % hashlib.sha1(body).hexdigest())
+            with self._lock:
+                self._entries[path] = entry
+        return entry[1], entry[2]
+
+
+class StaticRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "SandBoxProStatic/1.0"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        started = time.perf_counter()
+        status, length, encoding = self._respond(send_body)
+        self.server.log_request_timing({
+            "method": self.command,
+            "path": self.path,
+            "status": status,
+            "bytes": length,
+            "encoding": encoding,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "started": time.time(),
+        })
+
+    def _respond(self, send_body):
+        path = self._translate_path(urlsplit(self.path).path)
+        if path is None or not os.path.isfile(path):
+            return self._send_empty(HTTPStatus.NOT_FOUND), 0, None
+
+        encoding, variant = self._pick_variant(path)
+        body, etag = self.server.files.get(variant)
+        if encoding:
+            etag = etag[:-1] + "-" + encoding + '"'
+
+        if etag in self._if_none_match():
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return HTTPStatus.NOT_MODIFIED, 0, encoding
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if path.endswith(COMPRESSIBLE):
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        return HTTPStatus.OK, len(body), encoding
+
+    def _translate_path(self, url_path):
+        """Map a URL path onto a file below the server root; None for hidden entries (.git, harness state)"""
+        parts = [part for part in unquote(url_path).split("/") if part and part != "."]
+        if any(part.startswith(".") for part in parts):
+            return None
+        path = os.path.join(self.server.root, *parts)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        return path
+
+    def _pick_variant(self, path):
+        """Return (content-encoding, file) of the best variant the client accepts"""
+        if not path.endswith(COMPRESSIBLE):
+            return None, path
+        accepted = {value.split(";")[0].strip() for value in self.headers.get("Accept-Encoding", "").split(",")}
+        relative = os.path.relpath(path, self.server.root)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = os.path.join(self.server.precompressed_dir, relative + suffix)
+            if os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+                return encoding, variant
+        return None, path
+
+    def _if_none_match(self):
+        header = self.headers.get("If-None-Match", "")
+        return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+    def _send_empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return status
+
+    def log_message(self, format, *args):
+        # Timings go to the request log instead of stderr
+        pass
+
+
+class StaticServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root=ROOT, port=SERVER_PORT, precompressed_dir=PRECOMPRESSED_DIR):
+        super().__init__(("127.0.0.1", port), StaticRequestHandler)
+        self.root = os.path.abspath(root)
+        self.precompressed_dir = os.path.abspath(precompressed_dir)
+        self.files = FileCache()
+        self.request_log = []
+        self._log_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def log_request_timing(self, entry):
+        with self._log_lock:
+            self.request_log.append(entry)
+
+    def start(self):
+        precompress(self.root, self.precompressed_dir)
+        self._thread = threading.Thread(target=self.serve_forever, name="static-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def latency_summary(self):
+        durations = sorted(entry["duration_ms"] for entry in self.request_log)
+        if not durations:
+            return "static server: no requests"
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return (f"static server: {len(durations)} requests, "
+                f"{sum(1 for entry in self.request_log if entry['status'] == 304)} not modified; "
+                f"server time total {sum(durations):.1f}ms, p95 {p95:.2f}ms")
+
+
+_server = None
+
+
+def get_server():
+    """Return the session-wide server, starting it on first use"""
+    global _server
+    if _server is None:
+        _server = StaticServer().start()
+        atexit.register(_shutdown)
+    return _server
+
+
+def base_url():
+    """Base URL the tests load pages from"""
+    if BASE_URL_OVERRIDE:
+        return BASE_URL_OVERRIDE.rstrip("/")
+    return get_server().base_url
+
+
+def _shutdown():
+    _server.stop()
+    print(_server.latency_summary(), file=sys.stderr)
+    if SERVER_LOG:
+        with open(SERVER_LOG, "w") as log:
+            json.dump(_server.request_log, log, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--root", default=ROOT)
+    parser.add_argument("--run", metavar="COMMAND", help="serve only while COMMAND runs and exit with its status")
+    args = parser.parse_args(argv)
+
+    # Another tree gets its own variants, so they never replace the working tree's
+    precompressed_dir = PRECOMPRESSED_DIR
+    if os.path.abspath(args.root) != ROOT:
+        precompressed_dir = os.path.join(args.root, ".precompressed")
+    server = StaticServer(args.root, args.port, precompressed_dir)
+    if args.run:
+        server.start()
+        print(f"Serving {server.root} at {server.base_url} for: {args.run}")
+        try:
+            # Tells Cypress (cypress.config.js) where the server is, unless it was pointed elsewhere
+            env = dict(os.environ)
+            env.setdefault("SANDBOXPRO_BASE_URL", server.base_url)
+            return subprocess.call(args.run, shell=True, env=env)
+        finally:
+            server.stop()
+            print(server.latency_summary())
+    precompress(server.root, server.precompressed_dir)
+    print(f"Serving {server.root} at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.latency_summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
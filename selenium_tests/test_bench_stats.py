@@ -0,0 +1,43 @@
+import unittest
+
+from bench_page_load import compare
+from bench_stats import describe, mann_whitney_u, percentile, scaling_exponent
+
+
+class BenchStatsTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        """Percentiles interpolate between the ordered samples"""
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50.5)
+        self.assertAlmostEqual(percentile(samples, 99), 99.01)
+        self.assertEqual(describe([3.0])["p95"], 3.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_mann_whitney_detects_shift(self):
+        """A clear slowdown is significant, identical runs are not"""
+        before = [100 + i % 7 for i in range(30)]
+        after = [120 + i % 7 for i in range(30)]
+        self.assertLess(mann_whitney_u(before, after)[1], 0.001)
+        self.assertGreater(mann_whitney_u(before, list(before))[1], 0.4)
+        # One-sided: getting faster is never a regression
+        self.assertGreater(mann_whitney_u(after, before)[1], 0.99)
+
+    def test_compare_flags_regressions(self):
+        """Only significant slowdowns above the minimum change are flagged"""
+        def run(load, paint):
+            return {"samples": {"login": [{"load_ms": load + i % 5, "first_paint_ms": paint + i % 5}
+                                          for i in range(20)]}}
+        rows = compare(run(200, 50), run(260, 51), alpha=0.05, min_change_pct=5)
+        flagged = {row["metric"] for row in rows if row["regressed"]}
+        self.assertEqual(flagged, {"load_ms"})
+
+    def test_scaling_exponent(self):
+        """Linear and quadratic growth are told apart"""
+        sizes = [1000, 10000, 50000]
+        self.assertAlmostEqual(scaling_exponent([(n, 0.002 * n) for n in sizes]), 1.0)
+        self.assertAlmostEqual(scaling_exponent([(n, 1e-6 * n * n) for n in sizes]), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from selenium import webdriver
+
+import driver_pool
+import static_server
+from cdn_cache import STAND_IN_CSS, AssetCache, CdnInterceptor, page_asset_urls
+from cdp import CdpChannel
+from tiers import TIER_BROWSER, tier
+
+class AssetCacheTest(unittest.TestCase):
+    def setUp(self):
+        """Create an empty offline cache"""
+        self.root = tempfile.TemporaryDirectory()
+        self.cache = AssetCache(self.root.name, offline=True)
+
+    def tearDown(self):
+        """Remove the cache directory"""
+        self.root.cleanup()
+
+    def test_identical_bodies_are_stored_once(self):
+        """Test that the cache is content addressed"""
+        css = b"body { font-family: Inter; }"
+        self.cache.store("https://fonts.googleapis.com/css2?family=Inter", 200, {"Content-Type": "text/css"}, css)
+        self.cache.store("https://fonts.googleapis.com/css2?family=Inter&v=2", 200, {"Content-Type": "text/css"}, css)
+
+        objects = [name for _, _, names in os.walk(os.path.join(self.root.name, "objects")) for name in names]
+        self.assertEqual(1, len(objects))
+        self.assertEqual((200, {"Content-Type": "text/css"}, css),
+                         self.cache.resolve("https://fonts.googleapis.com/css2?family=Inter&v=2"))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_offline_misses_get_stand_ins(self):
+        """Test that uncached assets are replaced without touching the network"""
+        status, headers, body = self.cache.resolve("https://cdn.tailwindcss.com")
+        self.assertEqual(200, status)
+        self.assertEqual("text/javascript", headers["Content-Type"])
+
+        status, headers, body = self.cache.resolve("https://placehold.co/600x400/22c55e/ffffff?text=Project+1")
+        self.assertEqual("image/svg+xml", headers["Content-Type"])
+        self.assertIn(b'width="600" height="400"', body)
+        self.assertEqual(2, self.cache.stand_ins)
+
+    def test_tailwind_stand_in_keeps_hidden_elements_hidden(self):
+        """Test that the offline Tailwind runtime still defines the utilities the page scripts toggle"""
+        _, _, script = self.cache.resolve("https://cdn.tailwindcss.com")
+        self.assertIn(".hidden{display:none!important}", STAND_IN_CSS)
+        self.assertIn(STAND_IN_CSS.encode(), script)
+
+    def test_page_asset_urls(self):
+        """Test that the CDN assets referenced by the pages are found"""
+        urls = page_asset_urls()
+        self.assertIn("https://cdn.tailwindcss.com", urls)
+        self.assertIn("https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css", urls)
+
+
+@tier(TIER_BROWSER)
+class OfflineStandInTest(unittest.TestCase):
+    """A page served entirely from stand-ins, as on a machine without network"""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        # Not from the pool: its browsers share the real cache
+        self.driver = webdriver.Chrome(options=driver_pool.chrome_options())
+        self.addCleanup(self.driver.quit)
+        channel = CdpChannel.for_driver(self.driver)
+        self.addCleanup(channel.close)
+        CdnInterceptor(channel, AssetCache(root.name, offline=True)).install()
+
+    def test_hidden_elements_stay_hidden_with_an_empty_cache(self):
+        """Test that #errorMessage is not displayed when Tailwind is only a stand-in"""
+        self.driver.get(f"{static_server.base_url()}/login.html")
+        self.assertFalse(self.driver.find_element("id", "errorMessage").is_displayed())
+        self.assertFalse(self.driver.find_element("id", "successMessage").is_displayed())
+
+if __name__ == "__main__":
+    unittest.main()
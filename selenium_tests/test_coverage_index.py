@@ -0,0 +1,84 @@
+import unittest
+
+from coverage_index import CoverageIndex, changed_lines, file_coverage, line_starts, offset_to_line
+
+DIFF = """diff --git a/dashboard.js b/dashboard.js
+index 1111111..2222222 100644
+--- a/dashboard.js
++++ b/dashboard.js
+@@ -12 +12 @@ function searchSandboxes(query) {
+-    const rows = 1;
++    const rows = 2;
+@@ -30,0 +31,2 @@ function showToast() {
++    // new
++    // lines
+diff --git a/new.js b/new.js
+new file mode 100644
+--- /dev/null
++++ b/new.js
+@@ -0,0 +1 @@
++console.log(1);
+"""
+
+
+def coverage(sha, *functions):
+    return {"dashboard.js": {"sha": sha, "functions": [list(function) for function in functions]}}
+
+
+class CoverageIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        """Two tests: one searches, one only loads the page"""
+        self.index = CoverageIndex()
+        self.index.update("t.Dashboard.test_search", coverage(
+            "v1", ("", 1, 50, 1), ("searchSandboxes", 10, 20, 3), ("showToast", 25, 40, 0)))
+        self.index.update("t.Dashboard.test_loads", coverage(
+            "v1", ("", 1, 50, 1), ("searchSandboxes", 10, 20, 0), ("showToast", 25, 40, 1)))
+
+    def test_line_mapping_counts_utf16_units(self):
+        """Characters outside the BMP count twice, as in V8 source positions"""
+        starts = line_starts("a\n\U0001F680b\nc")
+        self.assertEqual(starts, [0, 2, 6])
+        self.assertEqual(offset_to_line(starts, 5), 2)
+        self.assertEqual(offset_to_line(starts, 6), 3)
+
+    def test_file_coverage_skips_foreign_scripts_and_top_level(self):
+        result = [
+            {"url": "https://cdn.tailwindcss.com/", "functions": []},
+            {"url": "http://127.0.0.1:9/login.js", "functions": [
+                {"functionName": "", "ranges": [{"startOffset": 0, "endOffset": 10, "count": 1}]},
+                {"functionName": "validateCredentials",
+                 "ranges": [{"startOffset": 0 + 20, "endOffset": 40, "count": 2}]},
+            ]},
+        ]
+        files = file_coverage(result, "http://127.0.0.1:9")
+        self.assertEqual(list(files), ["login.js"])
+        self.assertEqual([function[0] for function in files["login.js"]["functions"]], ["validateCredentials"])
+
+    def test_changed_function_selects_only_its_tests(self):
+        """A change inside searchSandboxes selects the test that called it"""
+        self.assertEqual(self.index.tests_for_change("dashboard.js", "v1", [12]), {"t.Dashboard.test_search"})
+        self.assertEqual(self.index.tests_for_change("dashboard.js", "v1", [30]), {"t.Dashboard.test_loads"})
+
+    def test_top_level_and_unknown_versions_select_every_loader(self):
+        everyone = {"t.Dashboard.test_search", "t.Dashboard.test_loads"}
+        self.assertEqual(self.index.tests_for_change("dashboard.js", "v1", [60]), everyone)
+        self.assertEqual(self.index.tests_for_change("dashboard.js", "v0", [12]), everyone)
+        self.assertIsNone(self.index.tests_for_change("script.js", "v1", [1]))
+
+    def test_rerun_against_new_version_marks_others_stale(self):
+        """Rows recorded against an older file version are selected until those tests run again"""
+        self.index.update("t.Dashboard.test_search", coverage("v2", ("searchSandboxes", 11, 21, 1)))
+        self.assertEqual(self.index.files["dashboard.js"]["stale"], [1])
+        self.assertEqual(self.index.tests_for_change("dashboard.js", "v2", [15]),
+                         {"t.Dashboard.test_search", "t.Dashboard.test_loads"})
+        self.index.update("t.Dashboard.test_loads", coverage("v2", ("searchSandboxes", 11, 21, 0)))
+        self.assertEqual(self.index.tests_for_change("dashboard.js", "v2", [15]), {"t.Dashboard.test_search"})
+
+    def test_diff_parsing(self):
+        """Old-side lines are reported; a pure insertion covers the lines around it"""
+        self.assertEqual(changed_lines(DIFF), {"dashboard.js": [12, 30, 31], "new.js": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
+
+import driver_pool
+
+
+class FakeDriver:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def fake_reset(driver):
+    if driver.broken:
+        raise WebDriverException("browser crashed")
+
+
+class DriverPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.started = []
+        patcher = mock.patch.object(driver_pool, "reset_state", side_effect=fake_reset)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def factory(self):
+        driver = FakeDriver()
+        self.started.append(driver)
+        return driver
+
+    def test_released_driver_is_handed_out_again(self):
+        """Test that the second acquire is a hit on the driver the first one released"""
+        pool = driver_pool.DriverPool(size=2, factory=self.factory)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(first, pool.acquire())
+        self.assertIsNot(first, pool.acquire())
+
+        self.assertEqual((1, 2), (pool.stats.hits, pool.stats.misses))
+        self.assertEqual(2, len(pool.stats.startup_times))
+        self.assertEqual(0, first.quit_calls)
+
+    def test_driver_that_fails_to_reset_is_discarded(self):
+        """Test that a broken browser is quit instead of being kept, and so is one discarded by hand"""
+        pool = driver_pool.DriverPool(size=2, factory=self.factory)
+        driver = pool.acquire()
+        driver.broken = True
+        pool.release(driver)
+        other = pool.acquire()
+        pool.discard(other)
+
+        self.assertIsNot(driver, other)
+        self.assertEqual((1, 1), (driver.quit_calls, other.quit_calls))
+        self.assertEqual(2, pool.stats.discarded)
+        self.assertEqual(0, pool.stats.hits)
+
+    def test_idle_drivers_are_capped_at_the_pool_size(self):
+        """Test that releasing more drivers than the pool holds quits the extra ones"""
+        pool = driver_pool.DriverPool(size=1, factory=self.factory)
+        drivers = [pool.acquire() for _ in range(3)]
+        for driver in drivers:
+            pool.release(driver)
+
+        self.assertEqual([0, 1, 1], [driver.quit_calls for driver in drivers])
+        self.assertIs(drivers[0], pool.acquire())
+
+    def test_drain_quits_every_idle_driver(self):
+        """Test that drain empties the pool, so the next acquire starts a browser"""
+        pool = driver_pool.DriverPool(size=3, factory=self.factory)
+        drivers = [pool.acquire() for _ in range(3)]
+        for driver in drivers:
+            pool.release(driver)
+        pool.drain()
+
+        self.assertEqual([1, 1, 1], [driver.quit_calls for driver in drivers])
+        pool.acquire()
+        self.assertEqual(4, len(self.started))
+
+
+class ResetStateTest(unittest.TestCase):
+    def test_script_timeout_is_restored_for_the_next_test(self):
+        """Test that a timeout raised by a wait or benchmark does not carry over to the next borrower"""
+        driver = mock.Mock(window_handles=["main"], current_url="about:blank")
+        driver.switch_to.alert.dismiss.side_effect = NoAlertPresentException()
+        driver.set_script_timeout(300)
+        driver_pool.reset_state(driver)
+        driver.set_script_timeout.assert_called_with(driver_pool.SCRIPT_TIMEOUT)
+
+
+if __name__ == '__main__':
+    unittest.main()
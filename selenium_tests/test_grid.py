@@ -0,0 +1,122 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from cdp import DevToolsUnreachable, browser_ws_url
+from grid import GridRun, Node, WorkQueues, WorkerLost, parse_node
+from static_server import StaticServer
+
+
+class FakeNode(Node):
+    """Node whose health is a flag; it goes down after `fails_after` tests when set"""
+
+    def __init__(self, url, capacity=1, fails_after=None):
+        super().__init__(url, capacity)
+        self.up = True
+        self.fails_after = fails_after
+        self.started = 0
+        self.lock = threading.Lock()
+
+    def healthy(self):
+        return self.up
+
+
+class FakeWorker:
+    def __init__(self, node):
+        self.node = node
+
+    def run(self, test_id):
+        with self.node.lock:
+            self.node.started += 1
+            if self.node.fails_after is not None and self.node.started > self.node.fails_after:
+                self.node.up = False
+        if not self.node.up:
+            raise WorkerLost(test_id)
+        time.sleep(0.02)
+        return [{"id": test_id, "outcome": "passed", "duration": 0.0, "message": "", "worker": 0}]
+
+    def kill(self):
+        pass
+
+    def close(self):
+        return {"tests": {}, "commands": []}
+
+
+class WorkQueuesTest(unittest.TestCase):
+    def test_idle_slot_steals_from_the_most_loaded_queue(self):
+        """Test that a slot runs its own queue first, then takes the shortest test of the busiest slot"""
+        durations = {'a': 9.0, 'b': 5.0, 'c': 4.0, 'd': 1.0}
+        queues = WorkQueues(['fast', 'slow'], list(durations), durations)
+        self.assertEqual(['a', 'd'], list(queues.queues['fast']))
+        self.assertEqual(['b', 'c'], list(queues.queues['slow']))
+
+        self.assertEqual(('a', False), queues.next('fast'))
+        self.assertEqual(('d', False), queues.next('fast'))
+        self.assertEqual(('c', True), queues.next('fast'))
+        self.assertEqual(('b', False), queues.next('slow'))
+
+
+class GridRunTest(unittest.TestCase):
+    def test_tests_of_a_dead_node_are_requeued(self):
+        """Test that a node dying mid-run loses no test and runs none twice"""
+        steady = FakeNode("http://steady:9515", capacity=2)
+        doomed = FakeNode("http://doomed:9515", capacity=1, fails_after=1)
+        test_ids = [f"t{index}" for index in range(8)]
+
+        records, _ = GridRun([steady, doomed], FakeWorker, health_interval=0.05).run(test_ids, {})
+
+        self.assertEqual(sorted(test_ids), sorted(record["id"] for record in records))
+        self.assertEqual({"passed"}, {record["outcome"] for record in records})
+        self.assertFalse(doomed.alive)
+        self.assertEqual(1, doomed.requeued)
+        self.assertEqual(7, steady.completed)
+
+    def test_tests_left_when_every_node_died_are_errors(self):
+        """Test that tests no node could run are reported instead of dropped"""
+        only = FakeNode("http://only:9515", fails_after=2)
+        records, _ = GridRun([only], FakeWorker, health_interval=0.05).run(["a", "b", "c", "d"], {})
+
+        outcomes = {record["id"]: record["outcome"] for record in records}
+        self.assertEqual(["a", "b", "c", "d"], sorted(outcomes))
+        self.assertEqual(2, list(outcomes.values()).count("passed"))
+
+    def test_node_specs_and_health_check(self):
+        """Test "URL*CAPACITY" parsing and the /status readiness check"""
+        node = parse_node("http://127.0.0.1:1/*4")
+        self.assertEqual(("http://127.0.0.1:1", 4), (node.url, node.capacity))
+        self.assertFalse(node.healthy())
+
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "status"), "w") as status:
+                json.dump({"value": {"ready": True, "message": "ChromeDriver ready"}}, status)
+            server = StaticServer(root, 0, os.path.join(root, ".precompressed")).start()
+            try:
+                self.assertTrue(parse_node(server.base_url).healthy())
+            finally:
+                server.stop()
+
+
+
+class RemoteDevToolsTest(unittest.TestCase):
+    def test_devtools_of_a_remote_browser_is_unreachable(self):
+        """Test that a session whose DevTools address is on another machine raises DevToolsUnreachable"""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            closed_port = probe.getsockname()[1]
+
+        class RemoteSession:
+            def __init__(self, capabilities):
+                self.capabilities = capabilities
+
+        for capabilities in ({"goog:chromeOptions": {"debuggerAddress": f"127.0.0.1:{closed_port}"}}, {}):
+            with self.subTest(capabilities=capabilities):
+                with self.assertRaises(DevToolsUnreachable):
+                    browser_ws_url(RemoteSession(capabilities))
+
+
+if __name__ == '__main__':
+    unittest.main()
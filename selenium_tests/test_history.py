@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+import history
+
+
+def records(outcomes, attempt=1):
+    return [{"id": test_id, "outcome": outcome, "duration": 1.0, "attempt": attempt}
+            for test_id, outcome in outcomes.items()]
+
+
+class FlakinessTest(unittest.TestCase):
+    def test_recoveries_and_lone_results_are_flaky(self):
+        """Test that a pass after a rerun and a lone failure count, the last run only by its attempts"""
+        runs = [["passed"], ["failed"], ["passed"], ["failed", "passed"], ["failed"]]
+        self.assertEqual((5, 2, 0.4), history.flakiness(runs))
+
+    def test_a_broken_test_is_not_flaky(self):
+        """Test that a regression that keeps failing scores zero"""
+        runs = [["passed"]] * 4 + [["failed", "failed"]] * 3
+        self.assertEqual(0, history.flakiness(runs).flaky)
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = history.History(os.path.join(directory.name, "history.sqlite"))
+        self.addCleanup(self.store.close)
+
+    def test_durations_are_medians_of_the_runs_that_ran(self):
+        """Test that skipped and cached results do not count and old runs fall out of the window"""
+        for duration in (9.0, 2.0, 3.0, 4.0):
+            self.store.record([{"id": "a", "outcome": "passed", "duration": duration},
+                               {"id": "b", "outcome": "cached-pass", "duration": 0.0}])
+        self.assertEqual({"a": 3.0}, self.store.durations(window=3))
+
+    def test_flaky_test_is_quarantined_and_released(self):
+        """Test the way into the quarantine lane and back, and that old flakes no longer count after"""
+        for index in range(history.MIN_RUNS):
+            self.store.record(records({"flaky": "failed", "stable": "passed"}) +
+                              (records({"flaky": "passed"}, attempt=2) if index % 2 else []))
+        added, released = self.store.update_quarantine()
+        self.assertEqual(["flaky"], [test_id for test_id, _ in added])
+        self.assertEqual({"flaky"}, set(self.store.quarantined()))
+
+        for _ in range(history.RELEASE_RUNS):
+            self.store.record(records({"flaky": "passed", "stable": "passed"}))
+        self.assertEqual(([], ["flaky"]), self.store.update_quarantine())
+        self.store.record(records({"flaky": "passed"}))
+        self.assertEqual(([], []), self.store.update_quarantine())
+        self.assertEqual(0, self.store.flake_rates()["flaky"].flaky)
+
+    def test_tests_quarantined_by_hand_stay(self):
+        """Test that clean runs do not release a pinned test"""
+        self.store.quarantine(["pinned"])
+        for _ in range(history.RELEASE_RUNS):
+            self.store.record(records({"pinned": "passed"}))
+        self.store.update_quarantine()
+        self.assertIn("pinned", self.store.quarantined())
+        self.store.release(["pinned"])
+        self.assertEqual({}, self.store.quarantined())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import time
+import unittest
+
+from selenium.webdriver.common.keys import Keys
+
+from input_engine import InputScript, key_event
+
+
+class FakeDriver:
+    """Driver without a DevTools channel: every event goes through execute_cdp_cmd"""
+
+    def __init__(self):
+        self.sent = []
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self.sent.append((cmd, cmd_args, time.monotonic()))
+        return {}
+
+
+def key_downs(script):
+    return [step.params for step in script.steps
+            if step.method == "Input.dispatchKeyEvent" and step.params["type"] != "keyUp"]
+
+
+class InputScriptTest(unittest.TestCase):
+    def test_konami_code_reports_the_codes_dashboard_js_compares(self):
+        """Test that arrow keys and letters carry the KeyboardEvent.code values of a real keyboard"""
+        script = InputScript(None).keys(Keys.ARROW_UP, Keys.ARROW_UP, Keys.ARROW_DOWN, Keys.ARROW_DOWN,
+                                        Keys.ARROW_LEFT, Keys.ARROW_RIGHT, Keys.ARROW_LEFT, Keys.ARROW_RIGHT, "b", "a")
+        self.assertEqual(['ArrowUp', 'ArrowUp', 'ArrowDown', 'ArrowDown', 'ArrowLeft', 'ArrowRight',
+                          'ArrowLeft', 'ArrowRight', 'KeyB', 'KeyA'], [event["code"] for event in key_downs(script)])
+        self.assertEqual(20, len(script.steps))
+        self.assertEqual("b", key_downs(script)[8]["text"])
+
+    def test_shortcut_chord(self):
+        """Test that Ctrl+Shift+L holds both modifiers, sends key 'L' and types nothing"""
+        script = InputScript(None).chord(Keys.CONTROL, Keys.SHIFT, "l")
+        events = [(step.params["type"], step.params["key"], step.params["modifiers"]) for step in script.steps]
+        self.assertEqual([("rawKeyDown", "Control", 2), ("rawKeyDown", "Shift", 10), ("rawKeyDown", "L", 10),
+                          ("keyUp", "L", 10), ("keyUp", "Shift", 2), ("keyUp", "Control", 0)], events)
+        self.assertNotIn("text", key_event("keyDown", Keys.ENTER, 2))
+        self.assertEqual("\r", key_event("keyDown", Keys.ENTER)["text"])
+
+    def test_fallback_sends_in_order_with_delays(self):
+        """Test that without a channel every step goes through execute_cdp_cmd, after its delay"""
+        driver = FakeDriver()
+        count = InputScript(driver).focus("#email").insert("admin@sandboxpro.com").press(Keys.TAB, delay_ms=50).send()
+
+        self.assertEqual(4, count)
+        self.assertEqual(["Runtime.evaluate", "Input.insertText", "Input.dispatchKeyEvent", "Input.dispatchKeyEvent"],
+                         [cmd for cmd, _, _ in driver.sent])
+        self.assertEqual('document.querySelector("#email").focus()', driver.sent[0][1]["expression"])
+        self.assertGreaterEqual(driver.sent[2][2] - driver.sent[1][2], 0.045)
+
+
+if __name__ == '__main__':
+    unittest.main()
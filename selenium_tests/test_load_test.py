@@ -0,0 +1,39 @@
+import unittest
+
+import trio
+
+import load_test
+from cdp import CdpError
+
+
+class LoadStatsTest(unittest.TestCase):
+    def test_report_per_step(self):
+        """Test throughput, error rate and percentiles per step and overall"""
+        stats = load_test.LoadStats()
+        for milliseconds in range(1, 101):
+            stats.add("open_login", milliseconds / 1000)
+        for _ in range(3):
+            stats.add("submit_login", 3.5)
+            stats.scenario_done()
+        stats.fail("submit_login", trio.TooSlowError())
+        stats.fail("create_sandbox", CdpError("Runtime.evaluate: Session closed"))
+
+        report = stats.report(wall_time=10.0, users=4)
+        open_login = report["steps"]["open_login"]
+        self.assertEqual((100, 0, 10.0), (open_login["ok"], open_login["failed"], open_login["per_second"]))
+        self.assertEqual(50.5, open_login["latency_ms"]["p50"])
+        self.assertEqual(90.1, open_login["latency_ms"]["p90"])
+        self.assertEqual(0.25, report["steps"]["submit_login"]["error_rate"])
+        self.assertEqual({"CdpError: Runtime.evaluate: Session closed": 1}, report["steps"]["create_sandbox"]["errors"])
+        self.assertEqual(round(2 / 105, 4), report["error_rate"])
+        self.assertEqual(0.3, report["scenarios_per_second"])
+        self.assertIn("submit_login", load_test.summary(dict(report, target="http://127.0.0.1:1", browsers=1)))
+
+    def test_ramp_offsets(self):
+        """Test that users start at the ramp rate, or all at once without one"""
+        self.assertEqual([0.0, 0.25, 0.5, 0.75], load_test.start_offsets(4, 4.0))
+        self.assertEqual([0.0, 0.0, 0.0], load_test.start_offsets(3, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,44 +1,13 @@
 import unittest
-import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 
-class SandBoxProLoginTest(unittest.TestCase):
-    def setUp(self):
-        """Set up the test environment before each test"""
-        # Configure Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1280,720")
-        
-        # Initialize the driver
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.implicitly_wait(10)
-        self.wait = WebDriverWait(self.driver, 10)
-        
-        # Test credentials
-        self.credentials = {
-            'admin': {'email': 'admin@sandboxpro.com', 'password': 'admin123', 'name': 'Admin User'},
-            'user': {'email': 'user@sandboxpro.com', 'password': 'user123', 'name': 'John Doe'},
-            'demo': {'email': 'demo@sandboxpro.com', 'password': 'demo123', 'name': 'Demo User'},
-            'test': {'email': 'test@sandboxpro.com', 'password': 'test123', 'name': 'Test User'}
-        }
-        
-        # Base URL
-        self.base_url = "https://looseitp.github.io/looseitpcursor.io"
-
-    def tearDown(self):
-        """Clean up after each test"""
-        if hasattr(self, 'driver'):
-            self.driver.quit()
+import waits
+from base import SandBoxProTestCase
+from dom_batch import displayed
+from role_matrix import ROLE_STATS
 
+class SandBoxProLoginTest(SandBoxProTestCase):
     def test_login_page_loads_correctly(self):
         """Test that the login page loads with all required elements"""
         self.driver.get(f"{self.base_url}/login.html")
@@ -47,128 +16,41 @@ class SandBoxProLoginTest(unittest.TestCase):
         self.assertIn("Login - SandBox Pro", self.driver.title)
         
         # Check main elements are present
-        self.assertTrue(self.driver.find_element(By.ID, "loginForm").is_displayed())
-        self.assertTrue(self.driver.find_element(By.ID, "email").is_displayed())
-        self.assertTrue(self.driver.find_element(By.ID, "password").is_displayed())
-        self.assertTrue(self.driver.find_element(By.ID, "loginButton").is_displayed())
-        self.assertTrue(self.driver.find_element(By.ID, "togglePassword").is_displayed())
+        element_ids = ["loginForm", "email", "password", "loginButton", "togglePassword"]
+        visible = self.query({element_id: displayed(By.ID, element_id) for element_id in element_ids})
+        for element_id in element_ids:
+            self.assertTrue(visible[element_id], element_id)
         
         # Check demo credentials helper is present
         self.assertIn("Demo Credentials:", self.driver.page_source)
 
-    def test_admin_login_successful(self):
-        """Test successful login with admin credentials"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        # Enter admin credentials
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
-        
-        email_field.send_keys(self.credentials['admin']['email'])
-        password_field.send_keys(self.credentials['admin']['password'])
-        
-        # Submit form
-        self.driver.find_element(By.ID, "loginForm").submit()
-        
-        # Wait for loading state
-        self.wait.until(EC.visibility_of_element_located((By.ID, "spinner")))
-        
-        # Wait for redirect to dashboard
-        self.wait.until(lambda driver: "dashboard.html" in driver.current_url)
-        
-        # Check dashboard elements
-        self.assertIn("dashboard.html", self.driver.current_url)
-        welcome_text = self.driver.find_element(By.ID, "welcomeUserName").text
-        self.assertIn(self.credentials['admin']['name'], welcome_text)
-        
-        # Check admin-specific stats
-        active_sandboxes = self.driver.find_element(By.ID, "activeSandboxes").text
-        self.assertEqual("15", active_sandboxes)
-        
-        storage_used = self.driver.find_element(By.ID, "storageUsed").text
-        self.assertEqual("4.2 GB", storage_used)
-        
-        team_members = self.driver.find_element(By.ID, "teamMembers").text
-        self.assertEqual("12", team_members)
+    def test_role_matrix_login_successful(self):
+        """Test successful login through the form for every role, all roles at once"""
+        matrix = self.open_role_matrix()
+        dashboards = matrix.login(self.credentials)
 
-    def test_user_login_successful(self):
-        """Test successful login with user credentials"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        # Enter user credentials
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
-        
-        email_field.send_keys(self.credentials['user']['email'])
-        password_field.send_keys(self.credentials['user']['password'])
-        
-        # Submit form
-        self.driver.find_element(By.ID, "loginForm").submit()
-        
-        # Wait for redirect to dashboard
-        self.wait.until(lambda driver: "dashboard.html" in driver.current_url)
-        
-        # Check dashboard elements
-        welcome_text = self.driver.find_element(By.ID, "welcomeUserName").text
-        self.assertIn(self.credentials['user']['name'], welcome_text)
-        
-        # Check user-specific stats
-        active_sandboxes = self.driver.find_element(By.ID, "activeSandboxes").text
-        self.assertEqual("8", active_sandboxes)
-        
-        storage_used = self.driver.find_element(By.ID, "storageUsed").text
-        self.assertEqual("2.1 GB", storage_used)
-        
-        team_members = self.driver.find_element(By.ID, "teamMembers").text
-        self.assertEqual("6", team_members)
-
-    def test_demo_login_successful(self):
-        """Test successful login with demo credentials"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        # Enter demo credentials
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
-        
-        email_field.send_keys(self.credentials['demo']['email'])
-        password_field.send_keys(self.credentials['demo']['password'])
-        
-        # Submit form
-        self.driver.find_element(By.ID, "loginForm").submit()
-        
-        # Wait for redirect to dashboard
-        self.wait.until(lambda driver: "dashboard.html" in driver.current_url)
-        
-        # Check dashboard elements
-        welcome_text = self.driver.find_element(By.ID, "welcomeUserName").text
-        self.assertIn(self.credentials['demo']['name'], welcome_text)
-        
-        # Check demo-specific stats
-        active_sandboxes = self.driver.find_element(By.ID, "activeSandboxes").text
-        self.assertEqual("3", active_sandboxes)
-        
-        storage_used = self.driver.find_element(By.ID, "storageUsed").text
-        self.assertEqual("0.8 GB", storage_used)
-        
-        team_members = self.driver.find_element(By.ID, "teamMembers").text
-        self.assertEqual("2", team_members)
+        for role, expected in ROLE_STATS.items():
+            with self.subTest(role=role):
+                dashboard = dashboards[role]
+                # The loading state shows before the redirect to the dashboard
+                self.assertTrue(dashboard['spinner'])
+                self.assertIn("dashboard.html", dashboard['url'])
+                self.assertIn(self.credentials[role]['name'], dashboard['welcome'])
+                for stat, value in expected.items():
+                    self.assertEqual(value, dashboard[stat], stat)
 
     def test_invalid_credentials_error(self):
         """Test error handling for invalid credentials"""
-        self.driver.get(f"{self.base_url}/login.html")
+        login = self.open_login_page()
         
         # Enter invalid credentials
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
-        
-        email_field.send_keys("invalid@email.com")
-        password_field.send_keys("wrongpassword")
+        login.fill("invalid@email.com", "wrongpassword")
         
         # Submit form
-        self.driver.find_element(By.ID, "loginForm").submit()
+        login.login_form.submit()
         
         # Wait for error message
-        error_message = self.wait.until(EC.visibility_of_element_located((By.ID, "errorMessage")))
+        error_message = self.wait.until(waits.visible(By.ID, "errorMessage"))
         
         # Check error message
         self.assertTrue(error_message.is_displayed())
@@ -179,11 +61,10 @@ class SandBoxProLoginTest(unittest.TestCase):
 
     def test_password_visibility_toggle(self):
         """Test password visibility toggle functionality"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        password_field = self.driver.find_element(By.ID, "password")
-        toggle_button = self.driver.find_element(By.ID, "togglePassword")
-        eye_icon = self.driver.find_element(By.ID, "eyeIcon")
+        login = self.open_login_page()
+        password_field = login.password
+        toggle_button = login.toggle_password
+        eye_icon = login.eye_icon
         
         # Initially password should be hidden
         self.assertEqual("password", password_field.get_attribute("type"))
@@ -205,9 +86,7 @@ class SandBoxProLoginTest(unittest.TestCase):
 
     def test_remember_me_checkbox(self):
         """Test remember me checkbox functionality"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        remember_checkbox = self.driver.find_element(By.ID, "remember")
+        remember_checkbox = self.open_login_page().remember
         
         # Initially should not be checked
         self.assertFalse(remember_checkbox.is_selected())
@@ -222,69 +101,49 @@ class SandBoxProLoginTest(unittest.TestCase):
 
     def test_demo_credentials_helper(self):
         """Test demo credentials helper functionality"""
-        self.driver.get(f"{self.base_url}/login.html")
+        login = self.open_login_page()
         
         # Find and double-click demo credentials helper
-        demo_helper = self.driver.find_element(By.XPATH, "//div[contains(text(), 'Demo Credentials:')]")
-        self.driver.execute_script("arguments[0].dispatchEvent(new MouseEvent('dblclick', {bubbles: true}));", demo_helper)
+        self.driver.execute_script("arguments[0].dispatchEvent(new MouseEvent('dblclick', {bubbles: true}));",
+                                   login.demo_helper.element)
         
         # Check if credentials are auto-filled
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
-        remember_checkbox = self.driver.find_element(By.ID, "remember")
-        
-        self.assertEqual("admin@sandboxpro.com", email_field.get_attribute("value"))
-        self.assertEqual("admin123", password_field.get_attribute("value"))
-        self.assertTrue(remember_checkbox.is_selected())
+        self.assertEqual("admin@sandboxpro.com", login.email.get_attribute("value"))
+        self.assertEqual("admin123", login.password.get_attribute("value"))
+        self.assertTrue(login.remember.is_selected())
 
     def test_keyboard_shortcuts(self):
         """Test keyboard shortcuts functionality"""
-        self.driver.get(f"{self.base_url}/login.html")
+        login = self.open_login_page()
         
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
-        
-        # Enter credentials
-        email_field.send_keys(self.credentials['admin']['email'])
-        password_field.send_keys(self.credentials['admin']['password'])
-        
-        # Use Ctrl+Enter to submit
-        self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.CONTROL + Keys.ENTER)
+        # Enter credentials and use Ctrl+Enter to submit, in one batch
+        script = login.fill_script(self.credentials['admin']['email'], self.credentials['admin']['password'])
+        script.chord(Keys.CONTROL, Keys.ENTER).send()
         
         # Wait for redirect to dashboard
-        self.wait.until(lambda driver: "dashboard.html" in driver.current_url)
+        self.wait.until(waits.url_contains("dashboard.html"))
         self.assertIn("dashboard.html", self.driver.current_url)
 
     def test_escape_key_clears_form(self):
         """Test escape key clears the form"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        email_field = self.driver.find_element(By.ID, "email")
-        password_field = self.driver.find_element(By.ID, "password")
+        login = self.open_login_page()
         
-        # Enter some text
-        email_field.send_keys("test@email.com")
-        password_field.send_keys("testpassword")
-        
-        # Press escape key
-        self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+        # Enter some text and press escape key
+        login.fill_script("test@email.com", "testpassword").press(Keys.ESCAPE).send()
         
         # Check if fields are cleared
-        self.assertEqual("", email_field.get_attribute("value"))
-        self.assertEqual("", password_field.get_attribute("value"))
+        self.assertEqual("", login.email.get_attribute("value"))
+        self.assertEqual("", login.password.get_attribute("value"))
 
     def test_email_validation(self):
         """Test email format validation"""
-        self.driver.get(f"{self.base_url}/login.html")
-        
-        email_field = self.driver.find_element(By.ID, "email")
+        login = self.open_login_page()
         
         # Enter invalid email
-        email_field.send_keys("invalid-email")
-        email_field.send_keys(Keys.TAB)  # Trigger blur event
+        login.input().focus("#email").insert("invalid-email").press(Keys.TAB).send()  # Tab triggers blur
         
         # Check for validation error styling
-        self.assertIn("border-red-500", email_field.get_attribute("class"))
+        self.assertIn("border-red-500", login.email.get_attribute("class"))
 
 if __name__ == "__main__":
     unittest.main()
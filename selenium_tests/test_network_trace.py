@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import network_trace
+
+BASE = "http://127.0.0.1:4000"
+
+
+def document(request_id, loader_id, path, timestamp=1.0):
+    return {"method": "Network.requestWillBeSent",
+            "params": {"requestId": request_id, "loaderId": loader_id, "type": "Document",
+                       "documentURL": f"{BASE}/{path}", "timestamp": timestamp,
+                       "request": {"url": f"{BASE}/{path}", "method": "GET"}}}
+
+
+def asset(request_id, loader_id, url, kind="Script", timestamp=1.1):
+    return {"method": "Network.requestWillBeSent",
+            "params": {"requestId": request_id, "loaderId": loader_id, "type": kind, "timestamp": timestamp,
+                       "request": {"url": url, "method": "GET"}}}
+
+
+def response(request_id, status=200, mime="text/html", queued_ms=3.5, from_disk_cache=False):
+    return {"method": "Network.responseReceived",
+            "params": {"requestId": request_id,
+                       "response": {"status": status, "mimeType": mime, "fromDiskCache": from_disk_cache,
+                                    "timing": {"dnsStart": -1, "connectStart": -1, "sendStart": queued_ms}}}}
+
+
+def finished(request_id, size, timestamp=1.2):
+    return {"method": "Network.loadingFinished",
+            "params": {"requestId": request_id, "encodedDataLength": size, "timestamp": timestamp}}
+
+
+def page_load(loader_id, path, image_bytes, cached=False):
+    """Messages of one load of `path` with a stylesheet and an image of `image_bytes`"""
+    return [
+        document(f"{loader_id}.doc", loader_id, path),
+        response(f"{loader_id}.doc"),
+        finished(f"{loader_id}.doc", 8000),
+        asset(f"{loader_id}.css", loader_id, f"{BASE}/styles.css", kind="Stylesheet"),
+        response(f"{loader_id}.css", status=304 if cached else 200, mime="text/css"),
+        finished(f"{loader_id}.css", 300 if cached else 5000),
+        asset(f"{loader_id}.img", loader_id, f"{BASE}/DSC00001.JPG", kind="Image"),
+        response(f"{loader_id}.img", mime="image/jpeg", queued_ms=40.0, from_disk_cache=cached),
+        finished(f"{loader_id}.img", 0 if cached else image_bytes),
+    ]
+
+
+class NetworkTraceTest(unittest.TestCase):
+    def test_visits_group_requests_by_document_load(self):
+        """Test that each document load becomes a visit with one entry per request"""
+        messages = page_load("L1", "index.html", 2_500_000) + page_load("L2", "login.html", 0)
+        # A request of a page that loaded before the capture started is ignored
+        messages.append(asset("stray", "L0", f"{BASE}/script.js"))
+
+        index, login = network_trace.visits(messages, "test_index")
+        self.assertEqual(("index.html", "test_index"), (index["page"], index["test"]))
+        self.assertEqual([200, 200, 200], [entry["status"] for entry in index["entries"]])
+        self.assertEqual("login.html", login["page"])
+
+        totals = network_trace.visit_totals(index)
+        self.assertEqual(2_513_000, totals["bytes"])
+        self.assertEqual(3, totals["requests"])
+        self.assertEqual(47.0, totals["blocked_ms"])
+        self.assertEqual(f"{BASE}/DSC00001.JPG", totals["largest_asset"])
+        self.assertNotIn("_started", index["entries"][0])
+
+    def test_heaviest_visit_and_cache_hit_rate_per_page(self):
+        """Test that a warm reload counts towards the hit rate but not the page weight"""
+        pages = network_trace.summarize(network_trace.visits(
+            page_load("L1", "index.html", 900_000) + page_load("L2", "index.html", 900_000, cached=True)))
+
+        self.assertEqual(2, pages["index.html"]["visits"])
+        self.assertEqual(913_000, pages["index.html"]["heaviest"]["bytes"])
+        self.assertEqual(round(2 / 6, 3), pages["index.html"]["cache_hit_rate"])
+
+    def test_an_oversized_asset_breaks_the_budget(self):
+        """Test that a 2.5 MB image fails the default budget and a page override raises it"""
+        pages = network_trace.summarize(network_trace.visits(page_load("L1", "index.html", 2_500_000)))
+        budgets = {"default": {"bytes": 1_000_000, "requests": 30, "asset_bytes": 500_000}}
+
+        violations = network_trace.check_budgets(pages, budgets)
+        self.assertEqual(2, len(violations))
+        self.assertIn(f"index.html: asset_bytes 2.5e+06 > budget 500000 ({BASE}/DSC00001.JPG)", violations)
+
+        budgets["pages"] = {"index.html": {"bytes": 3_000_000, "asset_bytes": 3_000_000}}
+        self.assertEqual([], network_trace.check_budgets(pages, budgets))
+
+    def test_runs_collect_the_visits_of_every_process(self):
+        """Test that visits recorded by separate workers are read back as one run"""
+        with tempfile.TemporaryDirectory() as traces:
+            with mock.patch.object(network_trace, "TRACE_DIR", traces), \
+                    mock.patch.object(network_trace, "recorded", []), \
+                    mock.patch.dict(os.environ, {"SANDBOXPRO_NETWORK_RUN": "run-1"}):
+                network_trace.record("test_a", page_load("L1", "index.html", 1000))
+                with mock.patch("os.getpid", return_value=-1):
+                    network_trace.record("test_b", page_load("L2", "login.html", 1000))
+                network_trace.record("test_c", None)
+
+                self.assertEqual("run-1", network_trace.latest_run())
+                self.assertEqual(2, len(os.listdir(os.path.join(traces, "run-1"))))
+                self.assertEqual(["test_a", "test_b"], sorted(visit["test"] for visit in network_trace.load_run()))
+
+
+if __name__ == '__main__':
+    unittest.main()
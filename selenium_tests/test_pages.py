@@ -0,0 +1,102 @@
+import unittest
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+import pages
+
+
+class FakeElement:
+    def __init__(self, document, value):
+        self.document = document
+        self.value = value
+        self.clicks = 0
+
+    @property
+    def text(self):
+        self.check()
+        return f"{self.value} on page {self.document.page}"
+
+    def click(self):
+        self.check()
+        self.clicks += 1
+
+    def check(self):
+        if self.document.replaced:
+            raise StaleElementReferenceException(self.value)
+
+
+class FakeDocument:
+    def __init__(self, page):
+        self.page = page
+        self.replaced = False
+
+
+class FakeDriver:
+    """Answers find_element from the current document; `get` goes through execute like a real driver"""
+
+    def __init__(self):
+        self.document = FakeDocument(0)
+        self.finds = 0
+
+    def execute(self, driver_command, params=None):
+        if driver_command == "get":
+            self.replace_document()
+
+    def get(self, url):
+        self.execute("get", {"url": url})
+
+    def replace_document(self):
+        """A navigation, whether the test or the page started it"""
+        self.document.replaced = True
+        self.document = FakeDocument(self.document.page + 1)
+
+    def find_element(self, by, value):
+        self.finds += 1
+        return FakeElement(self.document, value)
+
+
+class PageObjectTest(unittest.TestCase):
+    def setUp(self):
+        self.driver = FakeDriver()
+        self.page = pages.DashboardPage(self.driver, "http://127.0.0.1:4000", self.id())
+        self.addCleanup(pages.stats.pop, self.id(), None)
+
+    def test_handles_are_reused_within_a_page_load(self):
+        """Test that repeated use of an element costs one lookup"""
+        self.page.user_menu_btn.click()
+        self.page.user_menu_btn.click()
+        self.assertEqual("userMenuBtn on page 0", self.page.user_menu_btn.text)
+
+        self.assertEqual(1, self.driver.finds)
+        self.assertEqual((2, 1), (self.page.hits, self.page.lookups))
+        self.assertEqual({"hits": 2, "lookups": 1, "stale": 0}, pages.stats[self.id()])
+
+    def test_driver_navigation_drops_the_handles(self):
+        """Test that driver.get invalidates the cache without touching the old handles"""
+        self.page.body.click()
+        self.driver.get("http://127.0.0.1:4000/login.html")
+        self.assertEqual("body on page 1", self.page.body.text)
+        self.assertEqual((0, 2, 0), (self.page.hits, self.page.lookups, self.page.stale))
+
+    def test_stale_handle_is_re_resolved_and_the_call_retried(self):
+        """Test that a navigation made by the page itself is recovered from transparently"""
+        button = self.page.create_sandbox_btn
+        button.click()
+        self.driver.replace_document()
+        button.click()
+
+        self.assertEqual(1, self.page.stale)
+        self.assertEqual(1, self.page.handles["create_sandbox_btn"].clicks)
+        self.assertEqual(1, self.page.handles["create_sandbox_btn"].document.page)
+
+    def test_declared_elements(self):
+        """Test that locators stay reachable on the class and pages share the body element"""
+        self.assertEqual((By.ID, "sandboxesTableBody"),
+                         (pages.DashboardPage.sandboxes_table_body.by, pages.DashboardPage.sandboxes_table_body.value))
+        self.assertIs(pages.Page.body, pages.LoginPage.body)
+        self.assertEqual("remember", pages.LoginPage.remember.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
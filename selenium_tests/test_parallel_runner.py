@@ -0,0 +1,70 @@
+import unittest
+
+from parallel_runner import RecordingResult, plan_shards, rerun_failures, settle
+
+
+class FailsOnce(unittest.TestCase):
+    """Run by RerunTest only: hidden from pytest by __test__, from unittest by load_tests"""
+    __test__ = False
+    runs = 0
+
+    def test_fails_the_first_time(self):
+        type(self).runs += 1
+        self.assertGreater(type(self).runs, 1)
+
+    def test_always_fails(self):
+        self.fail("broken")
+
+
+class ParallelRunnerPlanningTest(unittest.TestCase):
+    def test_longest_tests_are_spread_first(self):
+        """Test that shards are balanced longest-first"""
+        durations = {'a': 8.0, 'b': 7.0, 'c': 4.0, 'd': 3.0, 'e': 2.0}
+        shards = plan_shards(list(durations), 2, durations)
+
+        loads = sorted(sum(durations[test_id] for test_id in shard) for shard in shards)
+        self.assertEqual([11.0, 13.0], loads)
+        self.assertEqual(['a'], shards[0][:1])
+        self.assertEqual(['b'], shards[1][:1])
+
+    def test_unknown_tests_use_median_duration(self):
+        """Test that untimed tests are estimated from the known durations"""
+        durations = {'a': 1.0, 'b': 2.0, 'c': 9.0}
+        shards = plan_shards(['a', 'b', 'c', 'new'], 2, durations)
+
+        self.assertEqual(['c'], shards[0])
+        self.assertEqual(['b', 'new', 'a'], shards[1])
+
+    def test_never_more_shards_than_tests(self):
+        """Test that idle workers are not given empty shards"""
+        self.assertEqual(2, len(plan_shards(['a', 'b'], 8, {})))
+
+
+class RerunTest(unittest.TestCase):
+    def test_only_failed_tests_are_rerun(self):
+        """Test that reruns stop at the first pass and the flaky test is told apart from the broken one"""
+        FailsOnce.runs = 0
+        test_ids = [f"{__name__}.FailsOnce.test_fails_the_first_time", f"{__name__}.FailsOnce.test_always_fails"]
+        result = RecordingResult()
+        unittest.TestLoader().loadTestsFromNames(test_ids).run(result)
+        rerun_failures(result, test_ids, reruns=2)
+
+        attempts = sorted((record["id"].rsplit(".", 1)[1], record["attempt"], record["outcome"])
+                          for record in result.records)
+        self.assertEqual([("test_always_fails", 1, "failed"), ("test_always_fails", 2, "failed"),
+                          ("test_always_fails", 3, "failed"), ("test_fails_the_first_time", 1, "failed"),
+                          ("test_fails_the_first_time", 2, "passed")], attempts)
+
+        settled = {record["id"].rsplit(".", 1)[1]: record for record in settle(result.records)}
+        self.assertEqual(("flaky", 2), (settled["test_fails_the_first_time"]["outcome"],
+                                        settled["test_fails_the_first_time"]["attempts"]))
+        self.assertIn("AssertionError", settled["test_fails_the_first_time"]["message"])
+        self.assertEqual("failed", settled["test_always_fails"]["outcome"])
+
+
+def load_tests(loader, tests, pattern):
+    return unittest.TestSuite(loader.loadTestsFromTestCase(case) for case in (ParallelRunnerPlanningTest, RerunTest))
+
+
+if __name__ == "__main__":
+    unittest.main()
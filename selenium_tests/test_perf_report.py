@@ -0,0 +1,61 @@
+import unittest
+
+import perf_report
+
+
+class FakeDriver:
+    """Stands in for a WebDriver; commands take no time"""
+
+    def __init__(self):
+        self.sent = []
+
+    def execute(self, driver_command, params=None):
+        self.sent.append(driver_command)
+        return {"value": None}
+
+
+class PerfReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = perf_report.Recorder()
+        self.recorder.write_on_exit = False
+        self._global = perf_report.recorder
+        perf_report.recorder = self.recorder
+
+    def tearDown(self):
+        perf_report.recorder = self._global
+
+    def test_commands_are_tagged_with_test_and_phase(self):
+        """Every command is recorded under the running test and phase"""
+        driver = perf_report.instrument(FakeDriver())
+        perf_report.instrument(driver)
+        self.recorder.begin_test("t.Case.test_a")
+        driver.execute("get", {"url": "about:blank"})
+        self.recorder.set_phase("body")
+        driver.execute("clickElement", {"id": "x"})
+        driver.execute("executeCdpCommand", {"cmd": "Page.enable", "params": {}})
+        self.recorder.set_phase("tearDown")
+        self.recorder.end_test()
+
+        commands = self.recorder.commands
+        self.assertEqual(driver.sent, ["get", "clickElement", "executeCdpCommand"])
+        self.assertEqual([(c["phase"], c["category"]) for c in commands],
+                         [("setUp", "navigation"), ("body", "click"), ("body", "cdp")])
+        self.assertEqual(commands[2]["command"], "cdp:Page.enable")
+        test = self.recorder.tests["t.Case.test_a"]
+        self.assertEqual(test["commands"], 3)
+        self.assertEqual(set(test["phases"]), {"setUp", "body", "tearDown"})
+
+    def test_threshold_regressions(self):
+        """Only tests slower than baseline plus tolerance are reported"""
+        report = {"tests": {"a": {"duration": 1.2}, "b": {"duration": 1.6}, "c": {"duration": 9.0}}}
+        thresholds = {"default_tolerance_pct": 25,
+                      "tests": {"a": {"baseline_s": 1.0}, "b": {"baseline_s": 1.0},
+                                "c": {"baseline_s": 1.0, "tolerance_pct": 1000}, "gone": {"baseline_s": 1.0}}}
+        regressions = perf_report.check_thresholds(report, thresholds)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("b:"))
+
+
+if __name__ == '__main__':
+    unittest.main()
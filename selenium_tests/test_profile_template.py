@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import profile_template
+import static_server
+
+
+def write(path, data="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as out:
+        out.write(data)
+
+
+class ProfileTemplateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.template = os.path.join(directory.name, "template")
+        write(os.path.join(self.template, "profile", "Local State"), "{}")
+        write(os.path.join(self.template, "profile", "Default", "Cache", "Cache_Data", "index"), "cache")
+        write(os.path.join(self.template, "template.json"), json.dumps({"built": time.time()}))
+
+    def test_clone_is_a_private_copy(self):
+        """Test that every clone gets the template's files and discarding it leaves the template alone"""
+        first = profile_template.clone(self.template, intercepted=False)
+        second = profile_template.clone(self.template, intercepted=False)
+        self.assertNotEqual(first, second)
+        with open(os.path.join(first, "Default", "Cache", "Cache_Data", "index")) as index:
+            self.assertEqual("cache", index.read())
+        write(os.path.join(first, "Default", "Cache", "Cache_Data", "index"), "changed")
+        with open(os.path.join(second, "Default", "Cache", "Cache_Data", "index")) as index:
+            self.assertEqual("cache", index.read())
+
+        profile_template.discard(first)
+        profile_template.discard(second)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(os.path.join(self.template, "profile", "Local State")))
+
+    def test_only_caches_are_kept(self):
+        """Test that cookies, storage and lock files never reach the template"""
+        profile = os.path.join(os.path.dirname(self.template), "build", "profile")
+        for entry in ("Local State", "SingletonLock", "Default/Cookies", "Default/Local Storage/leveldb/000003.log",
+                      "Default/Cache/Cache_Data/index", "Default/Code Cache/js/index"):
+            write(os.path.join(profile, *entry.split("/")))
+        profile_template._strip(profile)
+
+        kept = sorted(os.path.relpath(os.path.join(directory, name), profile).replace(os.sep, "/")
+                      for directory, _, names in os.walk(profile) for name in names)
+        self.assertEqual(["Default/Cache/Cache_Data/index", "Default/Code Cache/js/index", "Local State"], kept)
+
+    def test_disabled_or_missing_template(self):
+        """Test that an empty setting or an absent template means an empty profile, without a build"""
+        self.assertIsNone(profile_template.clone("", intercepted=False))
+        self.assertIsNone(profile_template.clone(os.path.join(self.template, "missing"), build_missing=False,
+                                                 intercepted=False))
+
+    def test_no_copy_when_the_cache_could_not_hit(self):
+        """Test that an intercepting browser only gets a copy when the local pages keep their origin"""
+        with mock.patch.object(static_server, "SERVER_PORT", 0), \
+                mock.patch.object(static_server, "BASE_URL_OVERRIDE", None):
+            self.assertIsNone(profile_template.clone(self.template, intercepted=True))
+        with open(os.path.join(self.template, "template.json"), "w") as metadata:
+            json.dump({"built": time.time(), "origin": "http://127.0.0.1:8731"}, metadata)
+        with mock.patch.object(static_server, "BASE_URL_OVERRIDE", "http://127.0.0.1:8731"):
+            copy = profile_template.clone(self.template, intercepted=True)
+        self.addCleanup(profile_template.discard, copy)
+        self.assertIsNotNone(copy)
+
+    def test_failed_build_is_not_retried(self):
+        """Test that any build error leaves browsers with an empty profile and is not tried again per browser"""
+        missing = os.path.join(self.template, "missing")
+        self.addCleanup(profile_template.stats.update, failed=False)
+        with mock.patch.object(profile_template, "build", side_effect=RuntimeError("DevTools went away")) as build:
+            self.assertIsNone(profile_template.ensure(missing))
+            self.assertIsNone(profile_template.ensure(missing))
+        self.assertEqual(1, build.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+import waits
+from base import SandBoxProTestCase
+
+try:
+    from PIL import Image
+    import build_images
+except ImportError:  # Pillow comes from requirements.txt
+    Image = build_images = None
+
+needs_pillow = unittest.skipIf(build_images is None, "Pillow is not installed")
+
+# The viewports test_responsive_design checks the dashboard at
+VIEWPORTS = ((375, 667), (768, 1024), (1280, 720))
+
+INSERT_PICTURES_JS = """
+const gallery = document.createElement('div');
+gallery.id = 'responsiveGallery';
+gallery.innerHTML = arguments[0];
+// Every photo must load, not only the ones scrolled into view
+gallery.querySelectorAll('img').forEach(image => { image.loading = 'eager'; });
+document.body.prepend(gallery);
+"""
+
+IMAGE_REQUESTS_JS = """
+return performance.getEntriesByType('resource')
+    .filter(entry => entry.initiatorType === 'img')
+    .map(entry => ({url: entry.name, bytes: entry.encodedBodySize}));
+"""
+
+
+@needs_pillow
+class SandBoxProResponsiveImagesTest(SandBoxProTestCase):
+    """The photos' srcset hands every viewport its own variant instead of the camera original"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Cached by source digest: only the first run ever encodes
+        cls.manifest, _ = build_images.build()
+
+    def test_viewport_downloads_matching_variant(self):
+        """Test that each viewport downloads the variant of its width in the preferred format"""
+        images = self.manifest["images"]
+        preferred = self.manifest["formats"][0]
+        markup = "\n".join(entry["html"] for entry in images.values())
+        for width, height in VIEWPORTS:
+            with self.subTest(viewport=f"{width}x{height}"):
+                # Pin the device pixel ratio so the choice depends on the viewport alone
+                self.driver.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", {
+                    "width": width, "height": height, "deviceScaleFactor": 1, "mobile": False})
+                try:
+                    self.driver.get(f"{self.base_url}/index.html")
+                    self.driver.execute_script(INSERT_PICTURES_JS, markup)
+                    self.wait.until(waits.images_loaded("#responsiveGallery img"))
+                    requests = self.driver.execute_script(IMAGE_REQUESTS_JS)
+                finally:
+                    self.driver.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
+
+                downloaded = {os.path.basename(request["url"]): request["bytes"] for request in requests}
+                for name, entry in images.items():
+                    self.assertNotIn(name, downloaded)
+                    variants = entry["variants"][preferred]
+                    chosen = build_images.pick_width([variant["width"] for variant in variants], width)
+                    expected = next(variant for variant in variants if variant["width"] == chosen)
+                    self.assertIn(expected["file"], downloaded, f"{name} at {width}px")
+                    self.assertLess(downloaded[expected["file"]], entry["bytes"])
+                self.assertEqual(len(images), len(downloaded))
+
+
+@needs_pillow
+class BuildImagesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.output = os.path.join(self.directory.name, "images")
+        self.photo = os.path.join(self.directory.name, "DSC00001.JPG")
+        Image.new("RGB", (1600, 1200), (200, 120, 40)).save(self.photo, "JPEG")
+
+    def build(self, **options):
+        return build_images.build([self.photo], self.output, workers=1, **options)
+
+    def test_variants_and_srcset(self):
+        """Test that every format gets each width below the photo's own, never an upscaled one"""
+        manifest, encoded = self.build()
+        entry = manifest["images"]["DSC00001.JPG"]
+        self.assertEqual(1, encoded)
+        for name in manifest["formats"]:
+            self.assertEqual([400, 800, 1280], [variant["width"] for variant in entry["variants"][name]])
+        with Image.open(os.path.join(self.output, entry["variants"]["jpeg"][0]["file"])) as smallest:
+            self.assertEqual((400, 300), smallest.size)
+        self.assertIn(f'{entry["variants"]["jpeg"][1]["file"]} 800w', entry["html"])
+        self.assertIn('sizes="100vw"', entry["html"])
+
+    def test_unchanged_photo_is_not_encoded_again(self):
+        """Test that the source digest makes a rerun skip the encoder, and a new photo replaces the old variants"""
+        first, _ = self.build()
+        self.assertEqual(0, self.build()[1])
+
+        Image.new("RGB", (1600, 1200), (10, 10, 10)).save(self.photo, "JPEG")
+        second, encoded = self.build()
+        self.assertEqual(1, encoded)
+        old_file = first["images"]["DSC00001.JPG"]["variants"]["jpeg"][0]["file"]
+        self.assertNotEqual(old_file, second["images"]["DSC00001.JPG"]["variants"]["jpeg"][0]["file"])
+        self.assertFalse(os.path.exists(os.path.join(self.output, old_file)))
+
+    def test_pick_width(self):
+        """Test the srcset choice the browser check expects"""
+        self.assertEqual(400, build_images.pick_width([400, 800, 1280, 1920], 375))
+        self.assertEqual(800, build_images.pick_width([400, 800, 1280, 1920], 768))
+        self.assertEqual(1280, build_images.pick_width([400, 800, 1280, 1920], 1280))
+        self.assertEqual(1920, build_images.pick_width([400, 800, 1280, 1920], 1280, 2.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import result_cache
+
+
+class Page(unittest.TestCase):
+    """Sample test case whose sources the cache hashes"""
+
+    def setUp(self):
+        self.opened = []
+
+    def open_dashboard(self):
+        self.opened.append("dashboard.html")
+
+    def unrelated_helper(self):
+        return 42
+
+    def check_opens_dashboard(self):
+        self.open_dashboard()
+        self.assertEqual(self.opened, ["dashboard.html"])
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.root.name, "dashboard.js"), "w") as script:
+            script.write("updateStats();")
+        patches = [
+            mock.patch.object(result_cache, "ROOT", self.root.name),
+            mock.patch.object(result_cache, "CACHE_DIR", os.path.join(self.root.name, ".result_cache")),
+            mock.patch.object(result_cache, "FORCE", False),
+            mock.patch.object(result_cache.static_server, "BASE_URL_OVERRIDE", None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.root.cleanup)
+        self.test = Page("check_opens_dashboard")
+
+    def test_helpers_reached_from_the_test_are_hashed(self):
+        """The test, its self.* helpers and setUp are part of the key; other methods are not"""
+        names = set(result_cache.helper_sources(self.test))
+        self.assertEqual(names, {"Page.check_opens_dashboard", "Page.open_dashboard", "Page.setUp"})
+
+    def test_unchanged_pass_is_cached_until_an_asset_changes(self):
+        """A recorded pass is reused until a loaded asset's content changes"""
+        self.assertFalse(result_cache.is_cached_pass(self.test))
+        result_cache.record(self.test, True, {"dashboard.js"})
+        self.assertTrue(result_cache.is_cached_pass(self.test))
+
+        with open(os.path.join(self.root.name, "dashboard.js"), "w") as script:
+            script.write("updateStats(); startSandboxMonitoring();")
+        self.assertFalse(result_cache.is_cached_pass(self.test))
+
+    def test_failure_and_force_disable_the_cache(self):
+        result_cache.record(self.test, True, {"dashboard.js"})
+        with mock.patch.object(result_cache, "FORCE", True):
+            self.assertFalse(result_cache.is_cached_pass(self.test))
+        result_cache.record(self.test, False, {"dashboard.js"})
+        self.assertFalse(result_cache.is_cached_pass(self.test))
+
+    def test_assets_from_network_log(self):
+        """Only requests to the local server are mapped to repository paths"""
+        messages = [{"method": "Network.requestWillBeSent", "params": {"request": {"url": url}}} for url in [
+            "http://127.0.0.1:4000/login.html",
+            "http://127.0.0.1:4000/login.js?v=2",
+            "http://127.0.0.1:4000/",
+            "https://cdn.tailwindcss.com/",
+        ]]
+        self.assertEqual(result_cache.loaded_assets(messages, "http://127.0.0.1:4000"),
+                         {"login.html", "login.js", "index.html"})
+        self.assertIsNone(result_cache.loaded_assets(None, "http://127.0.0.1:4000"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from soak import evaluate, parse_duration
+
+
+def samples(nodes_per_hour, hours=4, steps=9):
+    """Synthetic time series with steady DOM node growth"""
+    series = []
+    for step in range(steps):
+        t = hours * 3600 * step / (steps - 1)
+        series.append({"t": t, "JSHeapUsedSize": 5_000_000, "Nodes": 800 + nodes_per_hour * t / 3600,
+                       "JSEventListeners": 40, "LayoutCount": step * 10})
+    return series
+
+
+class SoakTest(unittest.TestCase):
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("90"), 90)
+        self.assertEqual(parse_duration("15m"), 900)
+        self.assertEqual(parse_duration("2d"), 172800)
+
+    def test_growth_within_budget(self):
+        """A flat heap and slowly growing DOM stay inside the budget"""
+        growth, violations = evaluate(samples(50), {"Nodes": 200, "JSHeapUsedSize": 1024})
+        self.assertEqual(violations, [])
+        self.assertAlmostEqual(growth["Nodes"]["per_hour"], 50)
+        self.assertAlmostEqual(growth["JSHeapUsedSize"]["per_hour"], 0)
+
+    def test_leak_exceeds_budget(self):
+        """Node growth beyond the budget is reported"""
+        _, violations = evaluate(samples(500), {"Nodes": 200})
+        self.assertEqual(len(violations), 1)
+        self.assertTrue(violations[0].startswith("Nodes"))
+
+
+if __name__ == '__main__':
+    unittest.main()
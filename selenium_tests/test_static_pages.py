@@ -0,0 +1,110 @@
+import os
+import re
+import unittest
+
+from role_matrix import ROLE_STATS
+from static_pages import ROOT, PAGES, ids, local_references, page, source, text
+from tiers import TIER_STATIC, tier
+
+
+@tier(TIER_STATIC)
+class SandBoxProStaticTest(unittest.TestCase):
+    """Markup checks that need no browser"""
+
+    def test_login_page_structure(self):
+        """Test that login.html contains the login form and its controls"""
+        document = page("login.html")
+        self.assertIn("Login - SandBox Pro", document.findtext(".//title"))
+
+        for element_id in ["loginForm", "email", "password", "loginButton", "togglePassword", "remember"]:
+            self.assertIn(element_id, ids(document))
+        self.assertEqual("email", document.get_element_by_id("email").get("type"))
+        self.assertEqual("password", document.get_element_by_id("password").get("type"))
+        self.assertEqual("checkbox", document.get_element_by_id("remember").get("type"))
+
+        # The demo credentials helper is rendered by login.js
+        self.assertIn("login.js", local_references(document))
+        self.assertIn("Demo Credentials:", source("login.js"))
+
+    def test_login_script_targets_exist(self):
+        """Test that every element login.js looks up by id is in login.html"""
+        looked_up = set(re.findall(r"getElementById\('([^']+)'\)", source("login.js")))
+        self.assertEqual(set(), looked_up - set(ids(page("login.html"))))
+
+    def test_dashboard_page_structure(self):
+        """Test that dashboard.html contains the stats, navigation and wired controls"""
+        document = page("dashboard.html")
+        self.assertIn("Dashboard - SandBox Pro", document.findtext(".//title"))
+
+        # Elements dashboard.js reads or binds on DOMContentLoaded
+        element_ids = [
+            "welcomeUserName", "userName", "activeSandboxes", "storageUsed", "teamMembers", "uptime",
+            "notificationsBtn", "userMenuBtn", "userDropdown", "logoutBtn", "createSandboxBtn",
+            "inviteTeamBtn", "viewAnalyticsBtn", "settingsBtn", "refreshActivity", "searchSandboxes",
+            "createSandboxModal", "createSandboxForm", "sandboxName", "sandboxTemplate", "cancelCreate",
+        ]
+        for element_id in element_ids:
+            self.assertIn(element_id, ids(document))
+        self.assertIn("dashboard.js", local_references(document))
+
+        templates = [option.get("value") for option in document.get_element_by_id("sandboxTemplate").iter("option")]
+        self.assertEqual(["react", "node", "python", "vue", "angular"], templates)
+
+    def test_system_status_text(self):
+        """Test system status services and indicators"""
+        body = text(page("dashboard.html").body)
+        for service in ["API Services", "Database", "CDN", "Monitoring"]:
+            self.assertIn(service, body)
+        self.assertIn("Online", body)
+        self.assertIn("Warning", body)
+
+    def test_seeded_sandboxes_table(self):
+        """Test the three sandboxes the table starts with"""
+        rows = page("dashboard.html").get_element_by_id("sandboxesTableBody").findall("tr")
+        self.assertEqual(3, len(rows))
+        names = [text(row.xpath("./td[1]//span")[0]) for row in rows]
+        self.assertEqual(["React-App", "Node-API", "Python-Data"], names)
+        statuses = {text(row.xpath("./td[2]//span")[0]) for row in rows}
+        self.assertIn("Running", statuses)
+        self.assertIn("Stopped", statuses)
+
+    def test_role_stats_match_dashboard_script(self):
+        """Test that the role matrix expects what updateStatsForUser shows for every role"""
+        table = re.search(r"function updateStatsForUser.*?const stats = \{(.*?)\n    \};", source("dashboard.js"), re.S)
+        shown = {
+            role: {"active_sandboxes": sandboxes, "storage_used": storage, "team_members": team, "uptime": uptime}
+            for role, sandboxes, storage, team, uptime in re.findall(
+                r"(\w+): \{ sandboxes: (\d+), storage: '([^']+)', team: (\d+), uptime: '([^']+)' \}", table.group(1))
+        }
+        self.assertEqual(ROLE_STATS, shown)
+
+    def test_index_page_structure(self):
+        """Test the showcase page sections"""
+        document = page("index.html")
+        self.assertTrue(document.findtext(".//title").strip())
+        for element_id in ["features", "contact"]:
+            self.assertIn(element_id, ids(document))
+
+    def test_ids_are_unique(self):
+        """Test that no page reuses an id"""
+        for name in PAGES:
+            page_ids = ids(page(name))
+            duplicates = sorted({element_id for element_id in page_ids if page_ids.count(element_id) > 1})
+            self.assertEqual([], duplicates, name)
+
+    def test_local_references_exist(self):
+        """Test that every local script, stylesheet and image a page references is in the repository"""
+        for name in PAGES:
+            for reference in local_references(page(name)):
+                self.assertTrue(os.path.isfile(os.path.join(ROOT, reference)), f"{name}: {reference}")
+
+    def test_labels_point_at_fields(self):
+        """Test that every label[for] names an element on the same page"""
+        for name in PAGES:
+            document = page(name)
+            for label in document.xpath("//label[@for]"):
+                self.assertIn(label.get("for"), ids(document), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import gzip
+import http.client
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from static_server import StaticServer, main, precompress
+
+class StaticServerTest(unittest.TestCase):
+    def setUp(self):
+        """Serve a small temporary tree on a free port"""
+        self.root = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.root.name, "index.html"), "w") as page:
+            page.write("<html><body>" + "SandBox Pro " * 200 + "</body></html>")
+        with open(os.path.join(self.root.name, "photo.jpg"), "wb") as photo:
+            photo.write(b"\xff\xd8" + b"\x00" * 64)
+        self.server = StaticServer(self.root.name, 0, os.path.join(self.root.name, ".precompressed")).start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+
+    def tearDown(self):
+        """Stop the server"""
+        self.connection.close()
+        self.server.stop()
+        self.root.cleanup()
+
+    def get(self, path, headers=None):
+        self.connection.request("GET", path, headers=headers or {})
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_etag_revalidation_on_keep_alive_connection(self):
+        """Test that a matching If-None-Match gets a 304 on the same connection"""
+        response, body = self.get("/index.html")
+        self.assertEqual(200, response.status)
+        self.assertIn(b"SandBox Pro", body)
+        etag = response.getheader("ETag")
+
+        response, body = self.get("/index.html", {"If-None-Match": etag})
+        self.assertEqual(304, response.status)
+        self.assertEqual(b"", body)
+
+    def test_precompressed_gzip_variant(self):
+        """Test that gzip clients get the precompressed variant"""
+        response, body = self.get("/", {"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual("gzip", response.getheader("Content-Encoding"))
+        self.assertIn(b"SandBox Pro", gzip.decompress(body))
+        self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+
+    def test_binary_assets_are_not_compressed(self):
+        """Test that images are served as they are"""
+        response, body = self.get("/photo.jpg", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual("image/jpeg", response.getheader("Content-Type"))
+        self.assertEqual(66, len(body))
+
+    def test_missing_file_and_path_traversal(self):
+        """Test that unknown paths and paths outside the root are not found"""
+        self.assertEqual(404, self.get("/missing.html")[0].status)
+        self.assertEqual(404, self.get("/../../etc/passwd")[0].status)
+
+    def test_hidden_entries_are_not_served(self):
+        """Test that dotfiles and dot directories (.git, harness state) are not found"""
+        os.makedirs(os.path.join(self.root.name, ".git"))
+        with open(os.path.join(self.root.name, ".git", "config"), "w") as config:
+            config.write("[core]")
+        self.assertEqual(404, self.get("/.git/config")[0].status)
+        self.assertEqual(404, self.get("/%2egit/config")[0].status)
+        self.assertEqual(404, self.get("/.precompressed/index.html.gz")[0].status)
+
+    def test_precompress_skips_fresh_variants(self):
+        """Test that variants are only rewritten when the source changes"""
+        self.assertEqual(0, precompress(self.root.name, os.path.join(self.root.name, ".precompressed")))
+
+    def test_run_serves_while_the_command_runs(self):
+        """Test that --run points the command at the server and exits with its status"""
+        fetch = ("import os, sys, urllib.request; "
+                 "body = urllib.request.urlopen(os.environ['SANDBOXPRO_BASE_URL'] + '/index.html').read(); "
+                 "sys.exit(3 if b'SandBox Pro' in body else 1)")
+        environ = {key: value for key, value in os.environ.items() if key != "SANDBOXPRO_BASE_URL"}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            status = main(["--port", "0", "--root", self.root.name, "--run", f'"{sys.executable}" -c "{fetch}"'])
+        self.assertEqual(3, status)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from selenium.webdriver.common.by import By
+
+import waits
+from base import SandBoxProTestCase
+from role_matrix import ROLES
+
+try:
+    import numpy
+    import visual
+except ImportError:  # numpy and Pillow come from requirements.txt
+    numpy = visual = None
+
+needs_numpy = unittest.skipIf(visual is None, "numpy and Pillow are not installed")
+
+
+@needs_numpy
+class SandBoxProVisualTest(SandBoxProTestCase):
+    """Screenshots of key page states compared with the stored baselines"""
+
+    virtual_clock = True
+
+    # A changed baseline must rerun the tests
+    cache_inputs = (visual.BaselineStore().index_path,) if visual else ()
+
+    def assert_screen(self, state):
+        comparison = visual.check(self.driver, state)
+        if comparison.outcome == "missing":
+            self.skipTest(comparison.message)
+        if not comparison.passed:
+            self.fail(comparison.message)
+
+    def test_login_page(self):
+        """Test the login page against its baseline"""
+        self.driver.get(f"{self.base_url}/login.html")
+        self.wait.until(waits.visible(By.ID, "loginForm"))
+        self.assert_screen("login")
+
+    def test_role_stats(self):
+        """Test the dashboard of every role against its baseline"""
+        for role in ROLES:
+            with self.subTest(role=role):
+                self.login_as(role)
+                self.assert_screen(f"dashboard-{role}")
+
+    def test_create_sandbox_modal(self):
+        """Test the open create sandbox modal against its baseline"""
+        self.login_as('admin')
+        self.driver.find_element(By.ID, "createSandboxBtn").click()
+        self.wait.until(waits.visible(By.ID, "createSandboxModal"))
+        self.assert_screen("dashboard-create-sandbox-modal")
+
+    def test_notifications_popup(self):
+        """Test the notifications popup against its baseline"""
+        self.login_as('admin')
+        self.driver.find_element(By.ID, "notificationsBtn").click()
+        self.wait.until(waits.visible(By.XPATH, "//h4[text()='Notifications']"))
+        self.assert_screen("dashboard-notifications")
+
+
+@needs_numpy
+class VisualCompareTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = visual.BaselineStore(os.path.join(self.directory.name, "baselines"))
+        self.diffs = os.path.join(self.directory.name, "diffs")
+        self.screen = numpy.zeros((120, 200, 3), dtype=numpy.uint8)
+        self.screen[20:60, 30:170] = (90, 60, 200)
+
+    def compare(self, state, pixels, update=False):
+        return visual.compare(self.store, state, pixels, update=update, diff_dir=self.diffs)
+
+    def record(self, state, pixels):
+        self.assertEqual("recorded", self.compare(state, pixels, update=True).outcome)
+
+    def test_missing_baseline_is_not_recorded_without_update(self):
+        """Test that a state without a baseline is reported missing instead of passing against itself"""
+        comparison = self.compare("login", self.screen)
+        self.assertEqual("missing", comparison.outcome)
+        self.assertIn("SANDBOXPRO_VISUAL_UPDATE=1", comparison.message)
+        self.assertEqual({}, self.store.index())
+
+    def test_unchanged_screen_is_recorded_once_and_matched_by_hash(self):
+        """Test that an update records the baseline and an identical capture skips the diff"""
+        self.record("login", self.screen)
+        self.assertEqual("unchanged", self.compare("login", self.screen.copy()).outcome)
+
+    def test_identical_states_share_one_object(self):
+        """Test that baselines are deduplicated by content"""
+        self.record("dashboard-user", self.screen)
+        self.record("dashboard-demo", self.screen)
+        self.assertEqual(2, len(self.store.index()))
+        self.assertEqual(1, len(list(self.store.objects())))
+
+    def test_noise_passes_and_a_real_change_fails_with_a_diff_image(self):
+        """Test the per-pixel tolerance and the changed-pixel ratio"""
+        self.record("modal", self.screen)
+
+        noisy = self.screen.copy()
+        noisy[20:60, 30:170] += 4
+        self.assertEqual("within-tolerance", self.compare("modal", noisy).outcome)
+
+        changed = self.screen.copy()
+        changed[70:110, 30:170] = (255, 255, 255)
+        comparison = self.compare("modal", changed)
+        self.assertEqual("failed", comparison.outcome)
+        self.assertAlmostEqual(40 * 140 / (120 * 200), comparison.ratio)
+        self.assertTrue(os.path.exists(os.path.join(self.diffs, "modal.diff.png")))
+
+    def test_masked_regions_are_ignored(self):
+        """Test that a volatile region does not count once it is masked"""
+        bars = [(30, 20, 140, 40)]
+        self.record("perf", visual.apply_masks(self.screen, bars))
+
+        redrawn = self.screen.copy()
+        redrawn[20:60, 30:170] = (10, 250, 10)
+        self.assertEqual("unchanged", self.compare("perf", visual.apply_masks(redrawn, bars)).outcome)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Test tiers: what a test needs in order to run
+
+Tier 0 tests check the static files (parsed HTML, scripts on disk) and
+finish in milliseconds; tier 1 tests drive a real browser. The parallel
+runner and the pytest hooks run the whole tier-0 set before any browser
+is started, so broken markup is reported within a second.
+
+    @tier(TIER_STATIC)
+    class SandBoxProStaticTest(unittest.TestCase):
+        ...
+"""
+import unittest
+
+TIER_STATIC = 0
+TIER_BROWSER = 1
+
+
+def tier(level):
+    """Class or method decorator declaring the tier a test needs"""
+    def decorate(target):
+        target.tier = level
+        return target
+    return decorate
+
+
+def tier_of(test):
+    """Tier of a TestCase instance; tests that do not declare one need no browser"""
+    method = getattr(test, test._testMethodName, None)
+    return getattr(method, "tier", getattr(type(test), "tier", TIER_STATIC))
+
+
+def split_by_tier(suite):
+    """Flatten a unittest suite into {tier: [test, ...]}"""
+    tiers = {}
+    pending = [suite]
+    while pending:
+        item = pending.pop(0)
+        if isinstance(item, unittest.TestSuite):
+            pending[:0] = list(item)
+        else:
+            tiers.setdefault(tier_of(item), []).append(item)
+    return tiers
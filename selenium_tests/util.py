@@ -0,0 +1,28 @@
+"""Helpers shared by the harness modules"""
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows
+    fcntl = None
+
+
+@contextmanager
+def locked(path):
+    """Serialise updates of a file shared by parallel workers (through `path`.lock)"""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def page_name(url):
+    """File name of the page at `url`, index.html for a directory"""
+    path = urlsplit(url).path
+    return path.rsplit("/", 1)[-1] or "index.html"
@@ -0,0 +1,146 @@
+"""Controllable fake clock for the timers of the app under test
+
+The pages are built around artificial delays (refreshActivity, createSandbox,
+the showToast chain, the login delays) and setInterval loops. With the
+clock installed, setTimeout/setInterval/Date in the page run on virtual
+time that only moves when the test calls advance(), so a test can jump
+over a 2 s delay in a single call instead of sleeping.
+
+Timers created by the third-party CDN scripts (Tailwind, Font Awesome)
+keep running on real time so styling is not affected.
+"""
+from selenium.common.exceptions import JavascriptException
+
+CLOCK_SCRIPT = r"""
+(() => {
+    if (window.__sandboxClock) return;
+    const realSetTimeout = window.setTimeout.bind(window);
+    const realSetInterval = window.setInterval.bind(window);
+    const realClearTimeout = window.clearTimeout.bind(window);
+    const RealDate = window.Date;
+    const start = RealDate.now();
+    const thirdParty = /https?:\/\/(cdn\.tailwindcss\.com|cdnjs\.cloudflare\.com)\//;
+    const timers = new Map();
+    let now = 0;
+    let nextId = 1;
+
+    function fromThirdParty() {
+        return thirdParty.test(new Error().stack || '');
+    }
+
+    function schedule(callback, delay, args, repeat) {
+        const id = nextId++;
+        const wait = Math.max(0, Number(delay) || 0);
+        timers.set(id, { callback, args, at: now + wait, every: repeat ? Math.max(1, wait) : null });
+        return id;
+    }
+
+    window.setTimeout = function (callback, delay, ...args) {
+        if (fromThirdParty()) return -realSetTimeout(callback, delay, ...args);
+        return schedule(callback, delay, args, false);
+    };
+    window.setInterval = function (callback, delay, ...args) {
+        if (fromThirdParty()) return -realSetInterval(callback, delay, ...args);
+        return schedule(callback, delay, args, true);
+    };
+    window.clearTimeout = window.clearInterval = function (id) {
+        // Real timers are handed out as negative ids
+        if (id < 0) realClearTimeout(-id); else timers.delete(id);
+    };
+
+    class VirtualDate extends RealDate {
+        constructor(...args) {
+            if (args.length) super(...args); else super(start + now);
+        }
+        static now() {
+            return start + now;
+        }
+    }
+    window.Date = VirtualDate;
+
+    // One macrotask turn, so promise continuations can schedule their own timers
+    function settle() {
+        return new Promise(resolve => {
+            const channel = new MessageChannel();
+            channel.port1.onmessage = () => resolve();
+            channel.port2.postMessage(null);
+        });
+    }
+
+    function runNext(target) {
+        let dueId = null;
+        let next = null;
+        for (const [id, timer] of timers) {
+            if (timer.at <= target && (next === null || timer.at < next.at)) {
+                dueId = id;
+                next = timer;
+            }
+        }
+        if (next === null) return false;
+
+        now = Math.max(now, next.at);
+        if (next.every !== null) next.at += next.every; else timers.delete(dueId);
+        try {
+            const callback = typeof next.callback === 'function' ? next.callback : new Function(next.callback);
+            callback.apply(window, next.args);
+        } catch (error) {
+            realSetTimeout(() => { throw error; });
+        }
+        return true;
+    }
+
+    window.__sandboxClock = {
+        now: () => now,
+        pending: () => timers.size,
+        realSetTimeout,
+        realClearTimeout,
+        async advance(ms) {
+            const target = now + ms;
+            let fired = 0;
+            await settle();
+            while (runNext(target)) {
+                fired++;
+                await settle();
+            }
+            now = target;
+            return fired;
+        },
+    };
+})();
+"""
+
+ADVANCE_SCRIPT = """
+const done = arguments[arguments.length - 1];
+window.__sandboxClock.advance(arguments[0]).then(done, () => done(null));
+"""
+
+
+class VirtualClock:
+    """Installs the fake clock in every document the driver loads until uninstalled"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._identifier = None
+
+    def install(self):
+        """Must be called before the page under test is loaded"""
+        result = self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": CLOCK_SCRIPT})
+        self._identifier = result["identifier"]
+
+    def uninstall(self):
+        if self._identifier is not None:
+            self.driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": self._identifier})
+            self._identifier = None
+
+    def advance(self, ms):
+        """Move virtual time forward by `ms`, running every timer that falls due
+
+        Returns the number of timer callbacks run, or None when one of them
+        navigated away from the page.
+        """
+        try:
+            fired = self.driver.execute_async_script(ADVANCE_SCRIPT, ms)
+        except JavascriptException:
+            # A timer changed window.location; the document went away mid-call
+            return None
+        return fired
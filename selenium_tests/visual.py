@@ -0,0 +1,330 @@
+"""Visual regression checks for key states of login.html and dashboard.html
+
+A state (login page, create-sandbox modal, notifications, the stats of a
+role, ...) is captured as a full-page screenshot through CDP
+Page.captureScreenshot with transitions, animations and the caret turned
+off. Regions that change on every load are blacked out before anything is
+hashed or compared: the LIVE indicator, the randomly filled performance
+bars and the random cost figures.
+
+Comparison against the stored baseline goes from cheap to expensive:
+- the SHA-256 of the masked pixels equals the baseline's: unchanged, the
+  baseline is not even decoded
+- otherwise the 64-bit difference hash (dHash) distance is computed for the
+  report and the baseline is diffed pixel by pixel with NumPy; a pixel
+  counts as changed when a channel moves by more than PIXEL_TOLERANCE and
+  the state fails when more than MAX_DIFF_RATIO of the pixels changed.
+  The diff image (changed pixels in red) is written to visual_diffs/.
+
+Baselines are stored content-addressed as optimised PNGs under
+visual_baselines/objects/, so states that render identically share one
+file, with visual_baselines/index.json mapping each state to its object.
+SANDBOXPRO_VISUAL_UPDATE=1 records every state that is checked as its
+baseline. Without it a state that has no baseline is reported as
+"missing" and its test is skipped, so a fresh checkout never passes by
+comparing a capture with itself. The index is one of the result cache
+inputs of the visual tests, so a changed baseline reruns them.
+
+Usage:
+    python selenium_tests/visual.py stats
+    python selenium_tests/visual.py gc      # drop objects no state refers to
+"""
+import argparse
+import atexit
+import base64
+import hashlib
+import io
+import json
+import os
+import sys
+
+import numpy
+from PIL import Image
+
+from util import locked, page_name
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BASELINE_DIR = os.environ.get("SANDBOXPRO_VISUAL_BASELINES", os.path.join(HERE, "visual_baselines"))
+
+DIFF_DIR = os.environ.get("SANDBOXPRO_VISUAL_DIFFS", os.path.join(HERE, "visual_diffs"))
+
+# Record the current rendering as the baseline of every checked state
+UPDATE = os.environ.get("SANDBOXPRO_VISUAL_UPDATE") == "1"
+
+# Channel difference below which a pixel counts as unchanged (anti-aliasing, font hinting)
+PIXEL_TOLERANCE = int(os.environ.get("SANDBOXPRO_VISUAL_PIXEL_TOLERANCE", "16"))
+
+# Share of changed pixels a state may have before it fails
+MAX_DIFF_RATIO = float(os.environ.get("SANDBOXPRO_VISUAL_MAX_DIFF", "0.001"))
+
+# Regions that differ on every load, per page: elements matching `selector`
+# (widened to their `closest` ancestor, filtered by a `text` regex)
+VOLATILE_REGIONS = {
+    "dashboard.html": [
+        # LIVE indicator added to the header by addRealTimeIndicators
+        {"selector": "header > .absolute"},
+        # Performance bars and their percentages, random on load and every 3 s
+        {"selector": ".transition-all.duration-1000", "closest": ".flex.items-center"},
+        # Cost tracking amounts, random on load
+        {"selector": "main div, main span", "text": r"^\$\d"},
+    ],
+    "login.html": [],
+}
+
+FREEZE_CSS = """
+*, *::before, *::after {
+    transition: none !important;
+    animation: none !important;
+    caret-color: transparent !important;
+}
+"""
+
+# Resolves with the page rectangles (CSS pixels) of the volatile regions once fonts are loaded
+PREPARE_SCRIPT = r"""
+const [css, regions] = arguments;
+const done = arguments[arguments.length - 1];
+let style = document.getElementById('sandboxpro-visual-freeze');
+if (!style) {
+    style = document.createElement('style');
+    style.id = 'sandboxpro-visual-freeze';
+    style.textContent = css;
+    document.head.appendChild(style);
+}
+document.fonts.ready.then(() => requestAnimationFrame(() => {
+    const rects = [];
+    for (const region of regions) {
+        const pattern = region.text ? new RegExp(region.text) : null;
+        for (let element of document.querySelectorAll(region.selector)) {
+            if (pattern && !(element.children.length === 0 && pattern.test(element.textContent.trim()))) continue;
+            if (region.closest) element = element.closest(region.closest) || element;
+            const rect = element.getBoundingClientRect();
+            if (rect.width && rect.height) {
+                rects.push([rect.left + scrollX, rect.top + scrollY, rect.width, rect.height]);
+            }
+        }
+    }
+    done({ rects, ratio: devicePixelRatio });
+}));
+"""
+
+stats = {"unchanged": 0, "diffed": 0, "failed": 0, "recorded": 0, "missing": 0}
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def apply_masks(pixels, rects, ratio=1.0):
+    """Copy of an (H, W, 3) image with the page rectangles blacked out"""
+    masked = pixels.copy()
+    height, width = masked.shape[:2]
+    for left, top, rect_width, rect_height in rects:
+        x0, y0 = max(0, int(left * ratio)), max(0, int(top * ratio))
+        x1 = min(width, int(numpy.ceil((left + rect_width) * ratio)))
+        y1 = min(height, int(numpy.ceil((top + rect_height) * ratio)))
+        if x1 > x0 and y1 > y0:
+            masked[y0:y1, x0:x1] = 0
+    return masked
+
+
+def pixel_digest(pixels):
+    """Exact content hash of an image, including its size"""
+    return _sha(f"{pixels.shape}".encode() + numpy.ascontiguousarray(pixels).tobytes())
+
+
+def dhash(pixels):
+    """64-bit difference hash: is each cell of a 9x8 grey thumbnail brighter than its left neighbour"""
+    thumbnail = numpy.asarray(Image.fromarray(pixels).convert("L").resize((9, 8), Image.BILINEAR), dtype=numpy.int16)
+    bits = numpy.packbits((thumbnail[:, 1:] > thumbnail[:, :-1]).ravel())
+    return bits.tobytes().hex()
+
+
+def hamming(first, second):
+    return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+
+def changed_pixels(baseline, current, tolerance=PIXEL_TOLERANCE):
+    """Boolean (H, W) map of the pixels whose largest channel difference exceeds `tolerance`"""
+    delta = numpy.abs(baseline.astype(numpy.int16) - current.astype(numpy.int16))
+    return delta.max(axis=2) > tolerance
+
+
+def diff_image(baseline, changed):
+    """Dimmed baseline with the changed pixels in red"""
+    image = baseline // 3
+    image[changed] = (255, 0, 0)
+    return image
+
+
+def decode_png(data):
+    return numpy.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def encode_png(pixels):
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as out:
+        out.write(data)
+    os.replace(temporary, path)
+
+
+class BaselineStore:
+    """Content-addressed PNG baselines and the index of states that refer to them"""
+
+    def __init__(self, root=BASELINE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest + ".png")
+
+    def index(self):
+        try:
+            with open(self.index_path) as index:
+                return json.load(index)
+        except (OSError, ValueError):
+            return {}
+
+    def entry(self, state):
+        return self.index().get(state)
+
+    def save(self, state, pixels, digest, phash):
+        """Store `pixels` as the baseline of `state`; identical images share one object"""
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            _atomic_write(path, encode_png(pixels))
+        os.makedirs(self.root, exist_ok=True)
+        with locked(self.index_path):
+            index = self.index()
+            index[state] = {"digest": digest, "dhash": phash, "size": [pixels.shape[1], pixels.shape[0]]}
+            _atomic_write(self.index_path, json.dumps(index, indent=2, sort_keys=True).encode())
+
+    def image(self, entry):
+        with open(self._object_path(entry["digest"]), "rb") as data:
+            return decode_png(data.read())
+
+    def objects(self):
+        directory = os.path.join(self.root, "objects")
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith(".png"):
+                    yield os.path.join(dirpath, filename)
+
+    def gc(self):
+        """Remove objects no state refers to and return how many were removed"""
+        referenced = {self._object_path(entry["digest"]) for entry in self.index().values()}
+        removed = 0
+        for path in list(self.objects()):
+            if path not in referenced:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+class Comparison:
+    """Outcome of checking one state against its baseline"""
+
+    def __init__(self, state, outcome, message="", ratio=0.0, distance=0):
+        self.state = state
+        self.outcome = outcome
+        self.message = message
+        self.ratio = ratio
+        self.distance = distance
+
+    @property
+    def passed(self):
+        return self.outcome != "failed"
+
+
+def compare(store, state, pixels, update=UPDATE, diff_dir=DIFF_DIR):
+    """Compare a masked capture with the baseline of `state`, or record it as the baseline when `update`"""
+    if not any(stats.values()):
+        atexit.register(_report)
+    digest = pixel_digest(pixels)
+    entry = store.entry(state)
+    if entry is not None and entry["digest"] == digest and not update:
+        stats["unchanged"] += 1
+        return Comparison(state, "unchanged")
+
+    phash = dhash(pixels)
+    if update:
+        store.save(state, pixels, digest, phash)
+        stats["recorded"] += 1
+        return Comparison(state, "recorded")
+    if entry is None:
+        stats["missing"] += 1
+        return Comparison(state, "missing", f"{state}: no baseline in {store.root}; "
+                                            "record one with SANDBOXPRO_VISUAL_UPDATE=1")
+
+    distance = hamming(entry["dhash"], phash)
+    baseline = store.image(entry)
+    stats["diffed"] += 1
+    if baseline.shape != pixels.shape:
+        stats["failed"] += 1
+        return Comparison(state, "failed", f"{state}: size {pixels.shape[1]}x{pixels.shape[0]}, "
+                                           f"baseline {baseline.shape[1]}x{baseline.shape[0]}", 1.0, distance)
+    changed = changed_pixels(baseline, pixels)
+    ratio = float(changed.mean())
+    if ratio <= MAX_DIFF_RATIO:
+        return Comparison(state, "within-tolerance", ratio=ratio, distance=distance)
+
+    stats["failed"] += 1
+    os.makedirs(diff_dir, exist_ok=True)
+    Image.fromarray(diff_image(baseline, changed)).save(os.path.join(diff_dir, f"{state}.diff.png"))
+    Image.fromarray(pixels).save(os.path.join(diff_dir, f"{state}.actual.png"))
+    return Comparison(state, "failed", f"{state}: {ratio:.2%} of the pixels changed (dHash distance {distance}), "
+                                       f"see {os.path.join(diff_dir, state + '.diff.png')}", ratio, distance)
+
+
+def capture(driver, regions=None):
+    """Full-page screenshot of the current page with its volatile regions blacked out"""
+    if regions is None:
+        regions = VOLATILE_REGIONS.get(page_name(driver.current_url), [])
+    prepared = driver.execute_async_script(PREPARE_SCRIPT, FREEZE_CSS, regions)
+    size = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})["cssContentSize"]
+    shot = driver.execute_cdp_cmd("Page.captureScreenshot", {
+        "format": "png",
+        "captureBeyondViewport": True,
+        "clip": {"x": 0, "y": 0, "width": size["width"], "height": size["height"], "scale": 1},
+    })
+    pixels = decode_png(base64.b64decode(shot["data"]))
+    return apply_masks(pixels, prepared["rects"], prepared["ratio"])
+
+
+def check(driver, state, store=None):
+    """Capture the current page and compare it with the baseline of `state`"""
+    return compare(store or BaselineStore(), state, capture(driver))
+
+
+def _report():
+    print(f"visual: {stats['unchanged']} unchanged, {stats['diffed']} diffed, {stats['failed']} failed, "
+          f"{stats['recorded']} recorded, {stats['missing']} without baseline", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("stats", "gc"))
+    args = parser.parse_args(argv)
+
+    store = BaselineStore()
+    if args.command == "gc":
+        print(f"Removed {store.gc()} unreferenced baseline objects")
+        return 0
+    index = store.index()
+    objects = list(store.objects())
+    size = sum(os.path.getsize(path) for path in objects)
+    print(f"{len(index)} states, {len(objects)} objects, {size / 1024:.1f} KiB in {store.root}")
+    for state, entry in sorted(index.items()):
+        print(f"  {state}: {entry['size'][0]}x{entry['size'][1]} {entry['digest'][:12]} dhash {entry['dhash']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
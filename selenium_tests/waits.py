@@ -0,0 +1,187 @@
+"""Event-driven waits that block on the page instead of polling it
+
+WebDriverWait re-runs its condition every 500 ms, and on top of the
+implicit wait every negative check can stall for the full timeout. A
+Waiter sends one async script per wait: the script checks its condition
+whenever the DOM mutates, a transition or animation ends, or the URL
+changes, and answers as soon as it holds. When the page unloads the
+script reports it and the wait resumes in the next document.
+
+    self.wait.until(waits.url_contains("dashboard.html"))
+    error = self.wait.until(waits.visible(By.ID, "errorMessage"))
+"""
+import atexit
+import bisect
+import sys
+import time
+from collections import namedtuple
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from dom_batch import ELEMENT_JS
+
+Condition = namedtuple("Condition", "kind script args description")
+
+WAIT_SCRIPT = ELEMENT_JS + r"""
+const [source, args, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const predicate = new Function('args', 'find', 'isDisplayed', source);
+// The virtual clock must not be able to hold up a wait
+const clock = window.__sandboxClock;
+const schedule = clock ? clock.realSetTimeout : window.setTimeout.bind(window);
+const cancel = clock ? clock.realClearTimeout : window.clearTimeout.bind(window);
+const events = ['transitionend', 'animationend', 'hashchange', 'popstate', 'load'];
+// Image and script load/error events reach the document but not the window
+const documentEvents = ['load', 'error'];
+let finished = false;
+let observer = null;
+let timer = null;
+
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    if (timer !== null) cancel(timer);
+    events.forEach(name => window.removeEventListener(name, check, true));
+    documentEvents.forEach(name => document.removeEventListener(name, check, true));
+    window.removeEventListener('pagehide', leave, true);
+    window.removeEventListener('beforeunload', leave, true);
+    done(result);
+}
+
+function check() {
+    let value;
+    try {
+        value = predicate(args, find, isDisplayed);
+    } catch (error) {
+        return;
+    }
+    if (value) finish({ status: 'ok', value });
+}
+
+function leave() {
+    finish({ status: 'navigating' });
+}
+
+check();
+if (!finished) {
+    observer = new MutationObserver(check);
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    events.forEach(name => window.addEventListener(name, check, true));
+    documentEvents.forEach(name => document.addEventListener(name, check, true));
+    window.addEventListener('pagehide', leave, true);
+    window.addEventListener('beforeunload', leave, true);
+    timer = schedule(() => finish({ status: 'timeout' }), timeoutMs);
+}
+"""
+
+
+def url_contains(fragment):
+    return Condition("url", "return location.href.includes(args.fragment);",
+                     {"fragment": fragment}, f"URL to contain {fragment!r}")
+
+
+def visible(by, value):
+    """Resolves to the element once it is displayed"""
+    return Condition("visible", "const element = find(args.by, args.value);"
+                                "return element && isDisplayed(element) ? element : false;",
+                     {"by": by, "value": value}, f"{by}={value!r} to be visible")
+
+
+def invisible(by, value):
+    """Holds when the element is hidden or gone"""
+    return Condition("invisible", "const element = find(args.by, args.value);"
+                                  "return !element || !isDisplayed(element);",
+                     {"by": by, "value": value}, f"{by}={value!r} to be invisible")
+
+
+def toast(message=None):
+    """Resolves to the showToast notification, optionally one with the given text"""
+    return Condition("toast", "return Array.from(document.querySelectorAll('body > div.fixed.bottom-4.right-4.z-50'))"
+                              ".find(node => !args.message || node.textContent.includes(args.message)) || false;",
+                     {"message": message}, f"toast {message!r} to appear")
+
+
+def modal_closed(by, value):
+    """Holds when a modal (e.g. createSandboxModal) has been hidden or removed"""
+    condition = invisible(by, value)
+    return condition._replace(kind="modal_closed", description=f"modal {by}={value!r} to close")
+
+
+def images_loaded(selector):
+    """Holds once every image matching the CSS selector has finished loading"""
+    return Condition("images", "const images = Array.from(document.querySelectorAll(args.selector));"
+                               "return images.length > 0 && images.every(image => image.complete && image.currentSrc);",
+                     {"selector": selector}, f"images {selector!r} to load")
+
+
+def text_present(text):
+    return Condition("text", "return document.body !== null && document.body.innerText.includes(args.text);",
+                     {"text": text}, f"text {text!r} to appear")
+
+
+class LatencyHistogram:
+    """Wait latencies per condition kind, in fixed millisecond buckets"""
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = {}
+        self.totals = {}
+
+    def add(self, kind, seconds):
+        counts = self.counts.setdefault(kind, [0] * (len(self.BUCKETS_MS) + 1))
+        counts[bisect.bisect_left(self.BUCKETS_MS, seconds * 1000)] += 1
+        self.totals[kind] = self.totals.get(kind, 0.0) + seconds
+
+    def as_dict(self):
+        labels = [f"<={bucket}ms" for bucket in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {kind: dict(zip(labels, counts)) for kind, counts in self.counts.items()}
+
+    def summary(self):
+        lines = ["wait latency histogram:"]
+        for kind, counts in sorted(self.counts.items()):
+            total = sum(counts)
+            buckets = " ".join(f"<={bucket}ms:{count}" for bucket, count in zip(self.BUCKETS_MS, counts) if count)
+            if counts[-1]:
+                buckets += f" >{self.BUCKETS_MS[-1]}ms:{counts[-1]}"
+            lines.append(f"  {kind:<12} n={total:<4} mean={self.totals[kind] / total * 1000:.1f}ms  {buckets}")
+        return "\n".join(lines)
+
+
+histogram = LatencyHistogram()
+
+
+class Waiter:
+    """Blocks until a Condition holds in the page, without polling"""
+
+    def __init__(self, driver, timeout=10):
+        self.driver = driver
+        self.timeout = timeout
+
+    def until(self, condition, timeout=None):
+        if not isinstance(condition, Condition):
+            raise TypeError("Waiter.until() takes a waits.Condition, not %r" % (condition,))
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        self.driver.set_script_timeout(timeout + 5)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result = self.driver.execute_async_script(
+                    WAIT_SCRIPT, condition.script, condition.args, int(remaining * 1000))
+            except JavascriptException:
+                # The document was torn down before the script could answer
+                result = {"status": "navigating"}
+            if result["status"] == "ok":
+                if not histogram.counts:
+                    atexit.register(lambda: print(histogram.summary(), file=sys.stderr))
+                histogram.add(condition.kind, time.monotonic() - started)
+                return result["value"]
+            if result["status"] == "timeout":
+                break
+            # "navigating": the next command runs once the new document has loaded
+        raise TimeoutException(f"Timed out after {timeout}s waiting for {condition.description}")